@@ -0,0 +1,352 @@
+# async_repo.py
+"""
+Асинхронный доступ к данным для web_app (режим WEB_ASYNC_DRIVERS).
+
+Здесь те же запросы, что и в mysql_repo.py / mongo.py, но через
+неблокирующие драйверы:
+- MySQL: aiomysql (параметры %s - те же SQL-константы из queries.py)
+- MongoDB: pymongo AsyncMongoClient (pymongo >= 4.13)
+
+Оба драйвера необязательны: модуль импортируется и без них,
+ошибка будет только при попытке включить async-режим.
+
+Кэши (справочники, результаты поиска) и каталог жанров/лет в памяти
+общие с sync-версией: используются те же объекты из mysql_repo.py и те же ключи.
+"""
+
+import asyncio
+import time
+
+from Project import mongo, mysql_repo, queries
+from Project.cache import MISSING
+from Project.metrics import observe
+from Project.keyword_search import get_keyword_backend, has_like_wildcards, FULLTEXT_MIN_KEYWORD
+from Project.local_settings import MONGODB_URL_EDIT, dbconfig
+from Project.mysql_repo import (
+    QUERY_NAMES,
+    genre_catalog,
+    record_if_slow,
+    ReferenceData,
+    SearchPage,
+    result_cache,
+    split_total,
+    MYSQL_POOL_SIZE
+)
+
+try:
+    import aiomysql
+except ImportError:  # pragma: no cover - зависит от окружения
+    aiomysql = None
+
+try:
+    from pymongo import AsyncMongoClient
+except ImportError:  # pragma: no cover - зависит от окружения
+    AsyncMongoClient = None
+
+# Ключи dbconfig (mysql.connector) -> аргументы aiomysql
+_AIOMYSQL_KEYS = {
+    "host": "host",
+    "port": "port",
+    "user": "user",
+    "password": "password",
+    "database": "db",
+    "db": "db",
+    "charset": "charset",
+    "unix_socket": "unix_socket",
+}
+
+_mysql_pool = None
+_mysql_pool_lock: asyncio.Lock | None = None
+_mongo_client = None
+_reference_load: asyncio.Future | None = None
+
+
+def check_drivers() -> None:
+    """Проверяет, что async-драйверы установлены (вызывается при старте в async-режиме)."""
+    missing = []
+    if aiomysql is None:
+        missing.append("aiomysql")
+    if AsyncMongoClient is None:
+        missing.append("pymongo>=4.13")
+    if missing:
+        raise RuntimeError(f"WEB_ASYNC_DRIVERS requires: {', '.join(missing)}")
+
+
+# -------------------------
+# MySQL
+# -------------------------
+
+async def get_mysql_pool():
+    """Пул aiomysql (создаётся в текущем event loop при первом запросе)."""
+    global _mysql_pool, _mysql_pool_lock
+    if _mysql_pool is None:
+        if _mysql_pool_lock is None:
+            _mysql_pool_lock = asyncio.Lock()
+        async with _mysql_pool_lock:
+            if _mysql_pool is None:
+                params = {_AIOMYSQL_KEYS[k]: v for k, v in dbconfig.items() if k in _AIOMYSQL_KEYS}
+                _mysql_pool = await aiomysql.create_pool(
+                    minsize=1, maxsize=MYSQL_POOL_SIZE, autocommit=True, **params
+                )
+    return _mysql_pool
+
+
+async def fetch_all(sql: str, params: tuple = ()) -> list[dict]:
+    """Выполняет запрос и возвращает строки как список словарей."""
+    pool = await get_mysql_pool()
+    async with pool.acquire() as conn:
+        async with conn.cursor() as cursor:
+            name = QUERY_NAMES.get(sql, "other")
+            started = time.perf_counter()
+            with observe("mysql", name):
+                await cursor.execute(sql, params)
+                rows = await cursor.fetchall()
+            record_if_slow(name, sql, params, time.perf_counter() - started)
+            cols = [d[0] for d in cursor.description]
+    return [dict(zip(cols, row)) for row in rows]
+
+
+async def fetch_count(sql: str, params: tuple) -> int:
+    rows = await fetch_all(sql, params)
+    return int(next(iter(rows[0].values())))
+
+
+async def get_reference_data() -> ReferenceData:
+    """
+    Жанры и границы лет - из общего кэша справочников или из MySQL.
+    Одновременные запросы при пустом кэше ждут одну общую загрузку.
+    """
+    global _reference_load
+    cached = mysql_repo._reference_cache.peek()
+    if cached is not MISSING:
+        return cached
+
+    if _reference_load is None or _reference_load.done():
+        _reference_load = asyncio.ensure_future(_load_reference_data())
+    return await asyncio.shield(_reference_load)
+
+
+async def _load_reference_data() -> ReferenceData:
+    # Оба справочных запроса независимы - выполняем одновременно
+    genre_rows, bounds_rows = await asyncio.gather(
+        fetch_all(queries.SHOW_GENRES), fetch_all(queries.MIN_MAX_YEAR)
+    )
+    genres = tuple(r["name"] for r in genre_rows)
+    bounds = bounds_rows[0]
+    ref = ReferenceData(genres, frozenset(genres), int(bounds["min_y"]), int(bounds["max_y"]))
+    mysql_repo._reference_cache.set(ref)
+    return ref
+
+
+# ----- жанр и годы -----
+
+@genre_catalog.serves_async("search_by_genre_years")
+@result_cache.cached_async("search_by_genre_years")
+async def search_by_genre_years(genre, year_from, year_to, limit, offset=0, after=None):
+    if after is None:
+        return await fetch_all(queries.SEARCH_BY_GENRE_YEARS, (genre, year_from, year_to, limit, offset))
+    return await fetch_all(queries.SEARCH_BY_GENRE_YEARS_AFTER, (genre, year_from, year_to, *after, limit))
+
+
+@genre_catalog.serves_async("search_by_years_all_genres")
+@result_cache.cached_async("search_by_years_all_genres")
+async def search_by_years_all_genres(year_from, year_to, limit, offset=0, after=None):
+    if after is None:
+        return await fetch_all(queries.SEARCH_BY_YEARS_ALL_GENRES, (year_from, year_to, limit, offset))
+    return await fetch_all(queries.SEARCH_BY_YEARS_ALL_GENRES_AFTER, (year_from, year_to, *after, limit))
+
+
+@genre_catalog.serves_async("count_by_genre_years")
+@result_cache.cached_async("count_by_genre_years")
+async def count_by_genre_years(genre, year_from, year_to):
+    return await fetch_count(queries.COUNT_BY_GENRE_YEARS, (genre, year_from, year_to))
+
+
+@genre_catalog.serves_async("count_by_years_all_genres")
+@result_cache.cached_async("count_by_years_all_genres")
+async def count_by_years_all_genres(year_from, year_to):
+    return await fetch_count(queries.COUNT_BY_YEARS_ALL_GENRES, (year_from, year_to))
+
+
+@genre_catalog.serves_async("count_rows_by_years_all_genres")
+@result_cache.cached_async("count_rows_by_years_all_genres")
+async def count_rows_by_years_all_genres(year_from, year_to):
+    return await fetch_count(queries.COUNT_ROWS_BY_YEARS_ALL_GENRES, (year_from, year_to))
+
+
+@genre_catalog.serves_async("search_by_genre_years_with_total")
+@result_cache.cached_async("search_by_genre_years_with_total")
+async def search_by_genre_years_with_total(genre, year_from, year_to, limit, offset=0):
+    rows, total, _ = split_total(await fetch_all(
+        queries.SEARCH_BY_GENRE_YEARS_WITH_TOTAL, (genre, year_from, year_to, limit, offset)
+    ))
+    if total is None:
+        total = await count_by_genre_years(genre, year_from, year_to) if offset else 0
+    return SearchPage(rows, total, total)
+
+
+@genre_catalog.serves_async("search_by_years_all_genres_with_total")
+@result_cache.cached_async("search_by_years_all_genres_with_total")
+async def search_by_years_all_genres_with_total(year_from, year_to, limit, offset=0):
+    rows, total, total_films = split_total(await fetch_all(
+        queries.SEARCH_BY_YEARS_ALL_GENRES_WITH_TOTAL, (year_from, year_to, limit, offset)
+    ))
+    if total is None:
+        total = await count_rows_by_years_all_genres(year_from, year_to) if offset else 0
+        total_films = await count_by_years_all_genres(year_from, year_to) if offset else 0
+    return SearchPage(rows, total, total_films)
+
+
+# ----- ключевое слово -----
+#
+# Backend "ngram" работает в памяти - его вызываем в отдельном потоке
+# (индекс может строиться при первом обращении). Backend-ы "sql" и
+# "fulltext" идут в MySQL через aiomysql.
+
+def _in_memory_backend():
+    backend = get_keyword_backend()
+    return backend if backend.name == "ngram" else None
+
+
+def _use_fulltext(keyword: str) -> bool:
+    """Повторяет правила FulltextBackend: когда можно идти в FULLTEXT-индекс."""
+    return (
+            get_keyword_backend().name == "fulltext"
+            and len(keyword) >= FULLTEXT_MIN_KEYWORD
+            and not has_like_wildcards(keyword)
+            and '"' not in keyword
+    )
+
+
+@result_cache.cached_async("search_by_keyword")
+async def _search_by_keyword_like(keyword, limit, offset=0, after=None):
+    like_value = f"%{keyword.lower()}%"
+    if after is None:
+        return await fetch_all(queries.SEARCH_BY_KEYWORD, (like_value, limit, offset))
+    return await fetch_all(queries.SEARCH_BY_KEYWORD_AFTER, (like_value, *after, limit))
+
+
+@result_cache.cached_async("search_by_keyword_fulltext")
+async def _search_by_keyword_fulltext(keyword, limit, offset=0, after=None):
+    phrase, like_value = f'"{keyword.lower()}"', f"%{keyword.lower()}%"
+    if after is None:
+        return await fetch_all(queries.SEARCH_BY_KEYWORD_FULLTEXT, (phrase, like_value, limit, offset))
+    return await fetch_all(queries.SEARCH_BY_KEYWORD_FULLTEXT_AFTER, (phrase, like_value, *after, limit))
+
+
+@result_cache.cached_async("count_by_keyword")
+async def _count_by_keyword_like(keyword):
+    return await fetch_count(queries.COUNT_BY_KEYWORD, (f"%{keyword.lower()}%",))
+
+
+@result_cache.cached_async("count_by_keyword_fulltext")
+async def _count_by_keyword_fulltext(keyword):
+    return await fetch_count(queries.COUNT_BY_KEYWORD_FULLTEXT, (f'"{keyword.lower()}"', f"%{keyword.lower()}%"))
+
+
+@result_cache.cached_async("search_by_keyword_with_total")
+async def _search_by_keyword_like_with_total(keyword, limit, offset=0):
+    rows, total, _ = split_total(await fetch_all(
+        queries.SEARCH_BY_KEYWORD_WITH_TOTAL, (f"%{keyword.lower()}%", limit, offset)
+    ))
+    if total is None:
+        total = await _count_by_keyword_like(keyword) if offset else 0
+    return SearchPage(rows, total, total)
+
+
+@result_cache.cached_async("search_by_keyword_fulltext_with_total")
+async def _search_by_keyword_fulltext_with_total(keyword, limit, offset=0):
+    rows, total, _ = split_total(await fetch_all(
+        queries.SEARCH_BY_KEYWORD_FULLTEXT_WITH_TOTAL,
+        (f'"{keyword.lower()}"', f"%{keyword.lower()}%", limit, offset),
+    ))
+    if total is None:
+        total = await _count_by_keyword_fulltext(keyword) if offset else 0
+    return SearchPage(rows, total, total)
+
+
+async def search_titles(keyword, limit, offset=0, after=None):
+    backend = _in_memory_backend()
+    if backend is not None:
+        return await asyncio.to_thread(backend.search, keyword, limit, offset, after)
+    if _use_fulltext(keyword):
+        return await _search_by_keyword_fulltext(keyword, limit, offset=offset, after=after)
+    return await _search_by_keyword_like(keyword, limit, offset=offset, after=after)
+
+
+async def search_titles_with_total(keyword, limit, offset=0):
+    backend = _in_memory_backend()
+    if backend is not None:
+        return await asyncio.to_thread(backend.search_with_total, keyword, limit, offset)
+    if _use_fulltext(keyword):
+        return await _search_by_keyword_fulltext_with_total(keyword, limit, offset=offset)
+    return await _search_by_keyword_like_with_total(keyword, limit, offset=offset)
+
+
+async def count_titles(keyword):
+    backend = _in_memory_backend()
+    if backend is not None:
+        return await asyncio.to_thread(backend.count, keyword)
+    if _use_fulltext(keyword):
+        return await _count_by_keyword_fulltext(keyword)
+    return await _count_by_keyword_like(keyword)
+
+
+# -------------------------
+# MongoDB (статистика)
+# -------------------------
+
+def get_mongo_collection(name: str = mongo.COLLECTION_NAME):
+    """Коллекция через общий AsyncMongoClient (настройки - как у sync-клиента)."""
+    global _mongo_client
+    if _mongo_client is None:
+        _mongo_client = AsyncMongoClient(
+            MONGODB_URL_EDIT,
+            maxPoolSize=mongo.MONGO_MAX_POOL_SIZE,
+            serverSelectionTimeoutMS=mongo.MONGO_SERVER_SELECTION_TIMEOUT_MS,
+            connectTimeoutMS=mongo.MONGO_CONNECT_TIMEOUT_MS,
+            socketTimeoutMS=mongo.MONGO_SOCKET_TIMEOUT_MS,
+            tz_aware=True,
+        )
+    return _mongo_client[mongo.DB_NAME][name]
+
+
+async def _aggregate(pipeline: list[dict]) -> list[dict]:
+    cursor = await get_mongo_collection().aggregate(pipeline)
+    return await cursor.to_list()
+
+
+async def stats_top5_frequency() -> list[dict]:
+    if mongo.STATS_SOURCE == "counters":
+        col = get_mongo_collection(mongo.COUNTERS_COLLECTION_NAME)
+        return await col.find().sort(mongo.TOP_COUNTERS_SORT).limit(5).to_list()
+    return await _aggregate(mongo.top_frequency_pipeline(5))
+
+
+async def stats_last5_unique() -> list[dict]:
+    if mongo.STATS_SOURCE == "counters":
+        col = get_mongo_collection(mongo.COUNTERS_COLLECTION_NAME)
+        return await col.find({}, {"count": 0}).sort(mongo.LAST_COUNTERS_SORT).limit(5).to_list()
+    return await _aggregate(mongo.last_unique_pipeline(5))
+
+
+async def stats_top_and_last(limit: int = 5) -> tuple[list[dict], list[dict]]:
+    """Top N и Last N unique одним $facet (см. mongo.stats_top_and_last)."""
+    result = await _aggregate(mongo.stats_facet_pipeline(limit))
+    return result[0]["top"], result[0]["last"]
+
+
+# -------------------------
+# Остановка
+# -------------------------
+
+async def close() -> None:
+    """Закрывает async-пулы (вызывается при остановке приложения)."""
+    global _mysql_pool, _mongo_client
+    if _mysql_pool is not None:
+        _mysql_pool.close()
+        await _mysql_pool.wait_closed()
+        _mysql_pool = None
+    if _mongo_client is not None:
+        await _mongo_client.close()
+        _mongo_client = None
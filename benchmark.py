@@ -0,0 +1,451 @@
+# benchmark.py
+"""
+Воспроизводимый бенчмарк горячих путей поиска и статистики.
+
+Что замеряется (каждый сценарий - iterations вызовов после warmup):
+- функции mysql_repo (страницы поиска, COUNT, страница + total, справочники)
+- поиск по ключевому слову через in-memory индекс n-грамм (keyword_search)
+- поиск по жанру и годам из каталога в памяти (catalog.py)
+- статистика mongo (счётчики, агрегация по логам, $facet)
+- маршруты web_app целиком (через TestClient: роутинг, шаблоны, JSON)
+
+Реальные базы не нужны - используются локальные заменители:
+- Sakila в SQLite (film / category / film_category, см. datagen.py), подключённая к
+  общему пулу mysql_repo через адаптер с курсором в стиле mysql.connector
+  (плейсхолдеры %s, with conn.cursor(), fetchmany)
+- MongoDB - mongomock, заполненный логами запросов и счётчиками (datagen.load_mongo)
+
+Для каждого сценария считаются пропускная способность (ops/s) и задержки
+p50 / p95 / p99. Результат дописывается строкой JSON в
+BENCHMARK_RESULTS_FILE вместе с коммитом git - при следующем запуске
+каждый сценарий сравнивается с последним запуском на тех же параметрах,
+а рост p95 больше BENCHMARK_REGRESSION_THRESHOLD помечается как регрессия.
+
+Запуск:
+    python -m Project.benchmark
+    python -m Project.benchmark --films 5000 --iterations 500 --only route
+"""
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, NamedTuple
+
+import mongomock
+
+from Project import datagen, keyword_search, local_settings, mongo, mysql_repo
+from Project.mysql_pool import MySQLPool
+from Project.suggest import suggest_index
+
+BASE_DIR = Path(__file__).resolve().parent
+
+# Куда дописывать результаты запусков (JSON Lines, одна строка - один запуск)
+BENCHMARK_RESULTS_FILE = getattr(local_settings, "BENCHMARK_RESULTS_FILE", str(BASE_DIR / "benchmark_results.jsonl"))
+
+# Во сколько раз (доля) может вырасти p95 сценария, прежде чем это считается регрессией
+BENCHMARK_REGRESSION_THRESHOLD = getattr(local_settings, "BENCHMARK_REGRESSION_THRESHOLD", 0.25)
+
+# Размер фикстуры и число замеров по умолчанию
+BENCHMARK_FILMS = 1000
+BENCHMARK_LOGS = 500
+BENCHMARK_ITERATIONS = 200
+BENCHMARK_WARMUP = 20
+
+# Размер страницы - как в web_app / flows
+PAGE_SIZE = 10
+
+# Параметры поиска, по кругу подставляемые в сценарии
+KEYWORDS = ("love", "academy", "an", "dragon", "moon", "zzz")
+GENRE_RANGES = (("Action", 2000, 2010), ("Comedy", 1990, 2025), ("Drama", 2015, 2016), ("All", 2005, 2008))
+
+
+# -------------------------
+# SQLite вместо MySQL
+# -------------------------
+
+class SqliteCursor:
+    """Курсор SQLite с интерфейсом курсора mysql.connector (%s, with, fetchmany)."""
+
+    _translated: dict[str, str] = {}
+
+    def __init__(self, conn: sqlite3.Connection):
+        self._cursor = conn.cursor()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+    @property
+    def description(self):
+        return self._cursor.description
+
+    def execute(self, sql: str, params=()):
+        query = self._translated.get(sql)
+        if query is None:
+            query = self._translated[sql] = sql.strip().rstrip(";").replace("%s", "?")
+        self._cursor.execute(query, tuple(params))
+
+    def fetchall(self):
+        return self._cursor.fetchall()
+
+    def fetchone(self):
+        return self._cursor.fetchone()
+
+    def fetchmany(self, size: int):
+        return self._cursor.fetchmany(size)
+
+    def close(self) -> None:
+        self._cursor.close()
+
+
+class SqliteConnection:
+    """Соединение SQLite для MySQLPool (ping, cursor(buffered=...), unread_result)."""
+
+    unread_result = False
+
+    def __init__(self, path: str):
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+
+    def cursor(self, buffered=None) -> SqliteCursor:
+        return SqliteCursor(self._conn)
+
+    def consume_results(self) -> None:
+        pass
+
+    def ping(self, reconnect: bool = False) -> None:
+        self._conn.execute("SELECT 1")
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+@contextmanager
+def patched(*changes):
+    """Временно подменяет атрибуты модулей: patched((module, "NAME", value), ...)."""
+    saved = [(obj, name, getattr(obj, name)) for obj, name, _ in changes]
+    for obj, name, value in changes:
+        setattr(obj, name, value)
+    try:
+        yield
+    finally:
+        for obj, name, value in reversed(saved):
+            setattr(obj, name, value)
+
+
+@contextmanager
+def stand_ins(films: int = BENCHMARK_FILMS, logs: int = BENCHMARK_LOGS, seed: int = 42):
+    """
+    Подключает mysql_repo к SQLite-фикстуре, а mongo - к mongomock.
+    Отдаёт путь к файлу SQLite (для тестов, которые меняют данные).
+    По выходу возвращает прежние пул, коллекции и backend поиска.
+    """
+    workdir = tempfile.mkdtemp(prefix="sakila-bench-")
+    path = os.path.join(workdir, "sakila.db")
+    datagen.load_sqlite(path, films, seed)
+    pool = MySQLPool(lambda: SqliteConnection(path), size=mysql_repo.MYSQL_POOL_SIZE)
+
+    db = mongomock.MongoClient()[mongo.DB_NAME]
+
+    def get_collection(name: str = mongo.COLLECTION_NAME):
+        return db[name]
+
+    try:
+        with patched(
+            (mysql_repo, "_pool", pool),
+            (mongo, "get_mongo_collection", get_collection),
+            (keyword_search, "_backend", keyword_search.NgramIndexBackend()),
+        ):
+            mysql_repo.invalidate_reference_cache()
+            mysql_repo.result_cache.clear()
+            mysql_repo.genre_catalog.clear()
+            suggest_index.clear()
+            datagen.load_mongo(logs, seed, films=films, collection=mongo.COLLECTION_NAME)
+            keyword_search.build_keyword_index()
+            yield path
+            mongo.flush_query_log()
+    finally:
+        pool.close_all()
+        mysql_repo.invalidate_reference_cache()
+        mysql_repo.result_cache.clear()
+        mysql_repo.genre_catalog.clear()
+        suggest_index.clear()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+# -------------------------
+# Сценарии
+# -------------------------
+
+class Scenario(NamedTuple):
+    """
+    name - имя в отчёте ("группа: что"), run(i) - один вызов (i - номер итерации),
+    cached - оставить включённым кэш результатов (иначе каждый вызов идёт в базу),
+    changes - подмены настроек на время сценария (как в patched),
+    max_iterations - предел замеров для медленных заменителей (агрегации mongomock
+    идут в Python и на порядки медленнее настоящей MongoDB).
+    """
+    name: str
+    run: Callable[[int], object]
+    cached: bool = False
+    changes: tuple = ()
+    max_iterations: int | None = None
+
+
+def _pick(values: tuple, i: int):
+    return values[i % len(values)]
+
+
+def build_scenarios(client) -> list[Scenario]:
+    """Все сценарии; client - TestClient приложения web_app."""
+
+    def genre_search(i):
+        genre, y1, y2 = _pick(GENRE_RANGES, i)
+        if genre == "All":
+            return mysql_repo.search_by_years_all_genres_with_total(y1, y2, PAGE_SIZE, 0)
+        return mysql_repo.search_by_genre_years_with_total(genre, y1, y2, PAGE_SIZE, 0)
+
+    def genre_params(i):
+        genre, y1, y2 = _pick(GENRE_RANGES, i)
+        return {"genre": genre, "year_from": y1, "year_to": y2}
+
+    def get(path, params=None):
+        def run(i):
+            resp = client.get(path, params=params(i) if params else None)
+            if resp.status_code != 200:
+                raise RuntimeError(f"{path}: HTTP {resp.status_code}")
+            return resp
+        return run
+
+    def keyword_params(i):
+        return {"keyword": _pick(KEYWORDS, i)}
+
+    log_stats = ((mongo, "STATS_SOURCE", "log"),)
+    in_catalog = ((mysql_repo.genre_catalog, "enabled", True),)
+
+    return [
+        Scenario("mysql: reference_data", lambda i: mysql_repo.load_reference_data()),
+        Scenario("mysql: search_by_keyword", lambda i: mysql_repo.search_by_keyword(_pick(KEYWORDS, i), PAGE_SIZE, 0)),
+        Scenario("mysql: count_by_keyword", lambda i: mysql_repo.count_by_keyword(_pick(KEYWORDS, i))),
+        Scenario(
+            "mysql: search_by_keyword_with_total",
+            lambda i: mysql_repo.search_by_keyword_with_total(_pick(KEYWORDS, i), PAGE_SIZE, 0),
+        ),
+        Scenario("mysql: search_genre_with_total", genre_search),
+        Scenario("mysql: search_genre_with_total (cached)", genre_search, cached=True),
+        Scenario("catalog: search_genre_with_total", genre_search, changes=in_catalog),
+        Scenario(
+            "mysql: iter_search_by_genre_years (All)",
+            lambda i: sum(1 for _ in mysql_repo.iter_search_by_genre_years("All", 1990, 2025)),
+        ),
+        Scenario(
+            "ngram: search_titles_with_total",
+            lambda i: keyword_search.search_titles_with_total(_pick(KEYWORDS, i), PAGE_SIZE, 0),
+        ),
+        Scenario("suggest: prefix", lambda i: suggest_index.suggest(_pick(KEYWORDS, i)[:3])),
+        Scenario("mongo: top5 (counters)", lambda i: mongo.stats_top5_frequency()),
+        Scenario("mongo: last5 (counters)", lambda i: mongo.stats_last5_unique()),
+        Scenario("mongo: top5 (log)", lambda i: mongo.stats_top5_frequency(), changes=log_stats, max_iterations=20),
+        Scenario("mongo: last5 (log)", lambda i: mongo.stats_last5_unique(), changes=log_stats, max_iterations=20),
+        Scenario(
+            "mongo: top_and_last (log, $facet)",
+            lambda i: mongo.stats_top_and_last(),
+            changes=log_stats,
+            max_iterations=20,
+        ),
+        Scenario("route: /", get("/")),
+        Scenario("route: /search/keyword", get("/search/keyword", keyword_params)),
+        Scenario("route: /search/genre", get("/search/genre", genre_params)),
+        Scenario("route: /api/search/genre", get("/api/search/genre", genre_params)),
+        Scenario("route: /api/search/genre (cached)", get("/api/search/genre", genre_params), cached=True),
+        Scenario("route: /api/search/genre (catalog)", get("/api/search/genre", genre_params), changes=in_catalog),
+        Scenario("route: /api/suggest", get("/api/suggest", lambda i: {"prefix": _pick(KEYWORDS, i)[:3]})),
+        Scenario("route: /stats", get("/stats")),
+    ]
+
+
+# -------------------------
+# Замеры и отчёт
+# -------------------------
+
+def percentile(sorted_values: list[float], q: float) -> float:
+    """Перцентиль q (0..100) по уже отсортированным значениям (nearest rank)."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, -(-len(sorted_values) * q // 100))
+    return sorted_values[int(rank) - 1]
+
+
+def measure(scenario: Scenario, iterations: int, warmup: int) -> dict:
+    """Выполняет сценарий и возвращает ops/s и задержки в миллисекундах."""
+    if scenario.max_iterations is not None:
+        iterations = min(iterations, scenario.max_iterations)
+        warmup = min(warmup, scenario.max_iterations)
+    backend = mysql_repo.result_cache.backend
+    mysql_repo.result_cache.clear()
+    with patched((mysql_repo.result_cache, "backend", backend if scenario.cached else None), *scenario.changes):
+        for i in range(warmup):
+            scenario.run(i)
+
+        timings = []
+        started = time.perf_counter()
+        for i in range(iterations):
+            t0 = time.perf_counter()
+            scenario.run(warmup + i)
+            timings.append(time.perf_counter() - t0)
+        elapsed = time.perf_counter() - started
+
+    timings.sort()
+    return {
+        "iterations": iterations,
+        "ops_per_sec": round(iterations / elapsed, 1) if elapsed else 0.0,
+        "mean_ms": round(sum(timings) / len(timings) * 1000, 4) if timings else 0.0,
+        "p50_ms": round(percentile(timings, 50) * 1000, 4),
+        "p95_ms": round(percentile(timings, 95) * 1000, 4),
+        "p99_ms": round(percentile(timings, 99) * 1000, 4),
+    }
+
+
+def run_suite(
+        films: int = BENCHMARK_FILMS,
+        logs: int = BENCHMARK_LOGS,
+        iterations: int = BENCHMARK_ITERATIONS,
+        warmup: int = BENCHMARK_WARMUP,
+        only: str = "",
+) -> dict:
+    """Прогоняет сценарии (only - подстрока имени) и возвращает {имя: замеры}."""
+    from fastapi.testclient import TestClient
+    from Project import web_app
+
+    results = {}
+    with stand_ins(films, logs):
+        client = TestClient(web_app.app)
+        for scenario in build_scenarios(client):
+            if only and only not in scenario.name:
+                continue
+            results[scenario.name] = measure(scenario, iterations, warmup)
+            # Логи маршрутов пишутся в фоне - дописываем до следующего сценария
+            mongo.flush_query_log()
+    return results
+
+
+def git_commit() -> str:
+    """Текущий коммит (с пометкой -dirty, если есть незакоммиченные изменения)."""
+    try:
+        out = subprocess.run(
+            ["git", "describe", "--always", "--dirty"],
+            cwd=BASE_DIR, capture_output=True, text=True, timeout=10,
+        )
+        return out.stdout.strip() or "unknown"
+    except (OSError, subprocess.SubprocessError):
+        return "unknown"
+
+
+def load_history(path: str = BENCHMARK_RESULTS_FILE) -> list[dict]:
+    """Все сохранённые запуски (старые первыми)."""
+    if not os.path.exists(path):
+        return []
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def save_run(run: dict, path: str = BENCHMARK_RESULTS_FILE) -> None:
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(run, ensure_ascii=False) + "\n")
+
+
+def find_baseline(history: list[dict], config: dict) -> dict | None:
+    """Последний запуск с теми же параметрами (размер фикстуры, число итераций)."""
+    for run in reversed(history):
+        if run.get("config") == config:
+            return run
+    return None
+
+
+def compare_results(current: dict, baseline: dict, threshold: float = BENCHMARK_REGRESSION_THRESHOLD) -> dict:
+    """
+    Изменения относительно базового запуска по каждому общему сценарию:
+    {имя: {"p50": доля, "p95": доля, "ops_per_sec": доля, "regression": bool}}.
+    """
+    diff = {}
+    for name, now in current.items():
+        before = baseline.get(name)
+        if not before:
+            continue
+        change = {
+            key: (now[f"{key}_ms"] - before[f"{key}_ms"]) / before[f"{key}_ms"] if before[f"{key}_ms"] else 0.0
+            for key in ("p50", "p95")
+        }
+        change["ops_per_sec"] = (
+            (now["ops_per_sec"] - before["ops_per_sec"]) / before["ops_per_sec"] if before["ops_per_sec"] else 0.0
+        )
+        change["regression"] = change["p95"] > threshold
+        diff[name] = change
+    return diff
+
+
+def format_report(results: dict, diff: dict | None = None, baseline_commit: str = "") -> str:
+    """Таблица результатов (и изменений p95 относительно baseline_commit)."""
+    width = max((len(name) for name in results), default=10)
+    header = f"{'scenario':<{width}}  {'ops/s':>9}  {'p50 ms':>9}  {'p95 ms':>9}  {'p99 ms':>9}"
+    if diff is not None:
+        header += f"  p95 vs {baseline_commit}"
+    lines = [header, "-" * len(header)]
+    for name, r in results.items():
+        line = (
+            f"{name:<{width}}  {r['ops_per_sec']:>9.1f}  {r['p50_ms']:>9.3f}"
+            f"  {r['p95_ms']:>9.3f}  {r['p99_ms']:>9.3f}"
+        )
+        change = (diff or {}).get(name)
+        if change is not None:
+            line += f"  {change['p95']:+.1%}" + ("  REGRESSION" if change["regression"] else "")
+        lines.append(line)
+    return "\n".join(lines)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark search and stats hot paths on local stand-ins.")
+    parser.add_argument("--films", type=int, default=BENCHMARK_FILMS)
+    parser.add_argument("--logs", type=int, default=BENCHMARK_LOGS)
+    parser.add_argument("--iterations", type=int, default=BENCHMARK_ITERATIONS)
+    parser.add_argument("--warmup", type=int, default=BENCHMARK_WARMUP)
+    parser.add_argument("--only", default="", help="run only scenarios whose name contains this text")
+    parser.add_argument("--results", default=BENCHMARK_RESULTS_FILE, help="JSON Lines file with run history")
+    parser.add_argument("--no-save", action="store_true", help="do not append this run to the history")
+    parser.add_argument("--fail-on-regression", action="store_true", help="exit with code 1 on p95 regression")
+    args = parser.parse_args(argv)
+
+    config = {"films": args.films, "logs": args.logs, "iterations": args.iterations, "warmup": args.warmup}
+    results = run_suite(args.films, args.logs, args.iterations, args.warmup, args.only)
+
+    baseline = find_baseline(load_history(args.results), config)
+    diff = compare_results(results, baseline["results"]) if baseline else None
+    print(format_report(results, diff, baseline["commit"] if baseline else ""))
+
+    if not args.no_save:
+        save_run({
+            "commit": git_commit(),
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "config": config,
+            "results": results,
+        }, args.results)
+
+    regressions = [name for name, change in (diff or {}).items() if change["regression"]]
+    return 1 if regressions and args.fail_on_regression else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,373 @@
+# cache.py
+"""
+Кэши в памяти процесса.
+
+CachedValue - одно значение с временем жизни (TTL) и ручной инвалидацией.
+Используется для справочных данных (жанры, границы лет в mysql_repo.py),
+которые меняются крайне редко, но раньше запрашивались из MySQL
+на каждой странице и при каждой валидации поиска.
+
+ResultCache - кэш результатов поисковых запросов (страницы и COUNT)
+с вытеснением LRU, TTL и ограничением по памяти. Хранилище подключаемое:
+сейчас это MemoryLRUBackend (в памяти процесса), но любой объект
+с методами get / set / delete / delete_where / clear / stats (см. CacheBackend)
+можно подставить вместо него - например, Redis.
+При промахе одинаковые одновременные вызовы объединяются (SingleFlight,
+singleflight.py): в базу идёт только один из них.
+"""
+
+import functools
+import inspect
+import sys
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+
+from Project.singleflight import SingleFlight
+
+# Признак "в кэше нет значения" (None - допустимое значение)
+MISSING = object()
+
+
+class CachedValue:
+    """
+    Значение, которое загружается функцией loader и хранится ttl секунд.
+
+    - get() возвращает закэшированное значение или загружает новое
+    - invalidate() сбрасывает значение (следующий get() загрузит заново)
+    - одновременные get() после истечения TTL вызывают loader только один раз
+    """
+
+    def __init__(self, loader, ttl: float):
+        self._loader = loader
+        self.ttl = ttl
+        self._value = None
+        self._expires_at = 0.0
+        self._loaded = False
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+
+    def get(self):
+        if self._loaded and time.monotonic() < self._expires_at:
+            self.hits += 1
+            return self._value
+
+        with self._lock:
+            # Пока ждали блокировку, значение мог загрузить другой поток
+            if self._loaded and time.monotonic() < self._expires_at:
+                self.hits += 1
+                return self._value
+
+            self.misses += 1
+            value = self._loader()
+            self._value = value
+            self._expires_at = time.monotonic() + self.ttl
+            self._loaded = True
+            return value
+
+    def peek(self):
+        """Значение, если оно есть и не устарело, иначе MISSING (без загрузки)."""
+        if self._loaded and time.monotonic() < self._expires_at:
+            self.hits += 1
+            return self._value
+        return MISSING
+
+    def set(self, value) -> None:
+        """Кладёт готовое значение (например, после обновления данных)."""
+        with self._lock:
+            self._value = value
+            self._expires_at = time.monotonic() + self.ttl
+            self._loaded = True
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._value = None
+            self._loaded = False
+            self._expires_at = 0.0
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses, "loaded": self._loaded, "ttl": self.ttl}
+
+
+# -------------------------
+# Кэш результатов поиска
+# -------------------------
+
+def approx_size(value) -> int:
+    """Приблизительный размер значения в байтах (строки результата - dict/list/str/int)."""
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(approx_size(k) + approx_size(v) for k, v in value.items())
+    elif isinstance(value, (list, tuple)):
+        size += sum(approx_size(v) for v in value)
+    return size
+
+
+class CacheBackend(ABC):
+    """Интерфейс хранилища для ResultCache."""
+
+    @abstractmethod
+    def get(self, key):
+        """Значение по ключу или MISSING."""
+
+    @abstractmethod
+    def set(self, key, value, ttl: float) -> None:
+        ...
+
+    @abstractmethod
+    def delete(self, key) -> None:
+        ...
+
+    @abstractmethod
+    def clear(self) -> None:
+        ...
+
+    def delete_where(self, predicate) -> int:
+        """
+        Удаляет ключи, для которых predicate(key) истинно; возвращает их число.
+        По умолчанию (хранилище не умеет перебирать ключи) сбрасывает всё.
+        """
+        self.clear()
+        return 0
+
+    def stats(self) -> dict:
+        return {}
+
+
+class MemoryLRUBackend(CacheBackend):
+    """
+    Хранилище в памяти процесса: LRU + TTL.
+
+    max_entries - максимальное количество ключей
+    max_bytes - ограничение суммарного (приблизительного) размера значений
+    При превышении любого лимита вытесняются давно не использованные ключи.
+    """
+
+    def __init__(self, max_entries: int = 1000, max_bytes: int = 16 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._data: OrderedDict = OrderedDict()  # key -> (value, expires_at, size)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return MISSING
+            value, expires_at, size = item
+            if time.monotonic() >= expires_at:
+                del self._data[key]
+                self._bytes -= size
+                self.expirations += 1
+                return MISSING
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl: float) -> None:
+        size = approx_size(value)
+        if size > self.max_bytes:
+            return  # слишком большое значение не кэшируем вовсе
+
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None:
+                self._bytes -= old[2]
+
+            self._data[key] = (value, time.monotonic() + ttl, size)
+            self._bytes += size
+
+            while len(self._data) > self.max_entries or self._bytes > self.max_bytes:
+                _, (_, _, old_size) = self._data.popitem(last=False)
+                self._bytes -= old_size
+                self.evictions += 1
+
+    def delete(self, key) -> None:
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None:
+                self._bytes -= old[2]
+
+    def delete_where(self, predicate) -> int:
+        with self._lock:
+            keys = [key for key in self._data if predicate(key)]
+            for key in keys:
+                self._bytes -= self._data.pop(key)[2]
+        return len(keys)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._data),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+
+class ResultCache:
+    """
+    Кэш результатов функций-запросов (декоратор cached).
+
+    Ключ - имя запроса + аргументы вызова, приведённые к сигнатуре функции
+    (значения по умолчанию подставлены, позиционные и именованные аргументы
+    не различаются), например для search_by_genre_years("Action", 2005, 2010, 10):
+        ("search_by_genre_years", ("Action", 2005, 2010, 10, 0, None), ())
+
+    single_flight - объединение одновременных вызовов с одним ключом
+    (работает и при выключенном хранилище); None - каждый вызов выполняется сам.
+    """
+
+    def __init__(self, backend: CacheBackend | None, ttl: float = 60.0,
+                 single_flight: SingleFlight | None = None):
+        self.backend = backend
+        self.ttl = ttl
+        self.single_flight = single_flight
+        self.hits = 0
+        self.misses = 0
+
+    def set_backend(self, backend: CacheBackend | None) -> None:
+        """Подключает другое хранилище (None - кэш выключен)."""
+        self.backend = backend
+
+    def cached(self, name: str):
+        """Декоратор: результат функции кэшируется по (name, args, kwargs)."""
+
+        def decorator(func):
+            make_key = _key_builder(name, func)
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                backend = self.backend
+                if backend is None and self.single_flight is None:
+                    return func(*args, **kwargs)
+
+                key = make_key(args, kwargs)
+                if backend is not None:
+                    value = backend.get(key)
+                    if value is not MISSING:
+                        self.hits += 1
+                        return _copy_rows(value)
+                    self.misses += 1
+
+                def load():
+                    result = func(*args, **kwargs)
+                    if backend is not None:
+                        backend.set(key, result, self.ttl)
+                    return result
+
+                if self.single_flight is None:
+                    return _copy_rows(load())
+                return _copy_rows(self.single_flight.do(key, load))
+
+            return wrapper
+
+        return decorator
+
+    def cached_async(self, name: str):
+        """
+        То же, что cached, но для async-функций.
+        Ключи совпадают с sync-версией при том же name и той же сигнатуре - кэш общий.
+        """
+
+        def decorator(func):
+            make_key = _key_builder(name, func)
+
+            @functools.wraps(func)
+            async def wrapper(*args, **kwargs):
+                backend = self.backend
+                if backend is None and self.single_flight is None:
+                    return await func(*args, **kwargs)
+
+                key = make_key(args, kwargs)
+                if backend is not None:
+                    value = backend.get(key)
+                    if value is not MISSING:
+                        self.hits += 1
+                        return _copy_rows(value)
+                    self.misses += 1
+
+                async def load():
+                    result = await func(*args, **kwargs)
+                    if backend is not None:
+                        backend.set(key, result, self.ttl)
+                    return result
+
+                if self.single_flight is None:
+                    return _copy_rows(await load())
+                return _copy_rows(await self.single_flight.do_async(key, load))
+
+            return wrapper
+
+        return decorator
+
+    def invalidate(self, predicate) -> int:
+        """
+        Удаляет результаты, для которых predicate(name, args) истинно
+        (ключи другого вида удаляются всегда). Возвращает число удалённых.
+        """
+        if self.backend is None:
+            return 0
+
+        def matches(key) -> bool:
+            if isinstance(key, tuple) and len(key) == 3 and isinstance(key[0], str):
+                return predicate(key[0], key[1])
+            return True
+
+        return self.backend.delete_where(matches)
+
+    def clear(self) -> None:
+        if self.backend is not None:
+            self.backend.clear()
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        result = {
+            "enabled": self.backend is not None,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+            "ttl": self.ttl,
+        }
+        if self.backend is not None:
+            result.update(self.backend.stats())
+        if self.single_flight is not None:
+            result["single_flight"] = self.single_flight.stats()
+        return result
+
+
+def _key_builder(name: str, func):
+    """
+    make_key(args, kwargs) -> ключ кэша: аргументы приводятся к сигнатуре func,
+    поэтому f(x, 10), f(x, 10, 0) и f(x, 10, offset=0) дают один ключ.
+    """
+    signature = inspect.signature(func)
+
+    def make_key(args: tuple, kwargs: dict) -> tuple:
+        bound = signature.bind(*args, **kwargs)
+        bound.apply_defaults()
+        return name, bound.args, tuple(sorted(bound.kwargs.items()))
+
+    return make_key
+
+
+def _copy_rows(value):
+    """Строки из кэша отдаём копиями, чтобы вызывающий код не испортил кэш."""
+    if isinstance(value, list):
+        return [dict(v) if isinstance(v, dict) else v for v in value]
+    if hasattr(value, "_replace") and hasattr(value, "rows"):
+        # NamedTuple со строками (например, mysql_repo.SearchPage)
+        return value._replace(rows=_copy_rows(value.rows))
+    return value
@@ -0,0 +1,325 @@
+# catalog.py
+"""
+Каталог фильмов в памяти для поиска по жанру и диапазону лет.
+
+SEARCH_BY_GENRE_YEARS / SEARCH_BY_YEARS_ALL_GENRES соединяют film,
+film_category и category на каждой странице (и ещё раз в COUNT).
+Каталог хранит те же данные в колонках и отвечает без MySQL:
+
+- каждая пара (фильм, жанр) кодируется одним целым ключом
+      key = (release_year * F + title_rank) * G + genre_code
+  где title_rank - позиция фильма в ORDER BY title, film_id (порядок берётся
+  из MySQL, как в индексе n-грамм), genre_code - позиция жанра в ORDER BY name,
+  F и G - число фильмов и жанров
+- ключи отсортированы, поэтому порядок колонки совпадает с ORDER BY
+  release_year, title, film_id[, genre] из queries.py
+- диапазон лет и курсор keyset-пагинации - двоичный поиск по ключам,
+  страница по OFFSET - срез, количество строк - разность позиций
+- для каждого жанра - своя колонка ключей; для "All genres" -
+  префиксные суммы "первых строк фильма" (COUNT(DISTINCT film_id))
+
+Колонки - массивы NumPy, если пакет установлен, иначе array из стандартной
+библиотеки (поиск через bisect): результат одинаковый, NumPy компактнее
+и быстрее строит каталог.
+
+Снимок каталога неизменяемый и заменяется целиком при перестроении.
+Включается настройкой GENRE_CATALOG (см. mysql_repo.genre_catalog).
+
+Каталог строится при старте приложения. Если его там нет (ошибка MySQL),
+поиск идёт в MySQL, а каталог строится повторно не чаще раза в
+retry_interval секунд: sync-функции - в потоке запроса, async-функции -
+в фоновом потоке (event loop загрузкой не блокируется). Ошибка загрузки
+не превращается в ошибку поиска.
+"""
+
+import functools
+import logging
+import threading
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+
+from Project.pagination import SearchPage
+
+logger = logging.getLogger(__name__)
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - зависит от окружения
+    np = None
+
+
+def _column(values: list[int]):
+    """Колонка 64-битных целых (NumPy или array)."""
+    if np is not None:
+        return np.asarray(values, dtype=np.int64)
+    return array("q", values)
+
+
+def _search(column, value: int, side: str = "left") -> int:
+    """Позиция вставки value в отсортированную колонку (как numpy.searchsorted)."""
+    if np is not None:
+        return int(np.searchsorted(column, value, side=side))
+    return (bisect_left if side == "left" else bisect_right)(column, value)
+
+
+class CatalogSnapshot:
+    """
+    Неизменяемый снимок каталога.
+
+    films - строки (film_id, title, release_year) в порядке ORDER BY title, film_id,
+    film_genres - строки (film_id, genre) из film_category,
+    genres - жанры в порядке ORDER BY name.
+
+    Методы повторяют сигнатуры функций mysql_repo. Если ответить нельзя
+    (курсор ссылается на фильм или жанр, которого нет в снимке), возвращается
+    None - тогда запрос выполняется в MySQL.
+    """
+
+    def __init__(self, films: list[dict], film_genres: list[dict], genres: list[str]):
+        self.films = films
+        self.genres = list(genres)
+        self.rank = {film["film_id"]: pos for pos, film in enumerate(films)}
+        self.code = {genre: code for code, genre in enumerate(self.genres)}
+        self.f = max(len(films), 1)
+        self.g = max(len(self.genres), 1)
+
+        keys = []
+        for row in film_genres:
+            pos = self.rank.get(row["film_id"])
+            code = self.code.get(row["genre"])
+            if pos is None or code is None:
+                continue
+            year = films[pos]["release_year"]
+            if year is None:
+                # BETWEEN не находит NULL - такие фильмы в поиск не попадают
+                continue
+            keys.append((int(year) * self.f + pos) * self.g + code)
+        keys.sort()
+
+        # Строки одного фильма стоят подряд (отличаются только жанром):
+        # first_prefix[i] - сколько фильмов начинается в keys[0:i]
+        first_prefix = [0]
+        prev = None
+        for key in keys:
+            film_part = key // self.g
+            first_prefix.append(first_prefix[-1] + (film_part != prev))
+            prev = film_part
+
+        by_genre: list[list[int]] = [[] for _ in self.genres]
+        for key in keys:
+            by_genre[key % self.g].append(key)
+
+        self.keys = _column(keys)
+        self.first_prefix = _column(first_prefix)
+        self.genre_keys = {code: _column(genre_keys) for code, genre_keys in enumerate(by_genre)}
+        self.pairs = len(keys)
+
+    # ---------- общие части ----------
+
+    def _year_range(self, keys, year_from: int, year_to: int) -> tuple[int, int]:
+        span = self.f * self.g
+        return _search(keys, year_from * span), _search(keys, (year_to + 1) * span)
+
+    def _after_key(self, year: int, film_id: int, genre: str) -> int | None:
+        pos = self.rank.get(film_id)
+        code = self.code.get(genre)
+        if pos is None or code is None:
+            return None
+        return (int(year) * self.f + pos) * self.g + code
+
+    def _rows(self, keys, start: int, stop: int) -> list[dict]:
+        rows = []
+        for key in keys[start:stop]:
+            key = int(key)
+            film = self.films[(key // self.g) % self.f]
+            rows.append({
+                "film_id": film["film_id"],
+                "title": film["title"],
+                "release_year": film["release_year"],
+                "genre": self.genres[key % self.g],
+            })
+        return rows
+
+    def _page(self, keys, genre: str, year_from: int, year_to: int, limit: int, offset: int, after):
+        lo, hi = self._year_range(keys, year_from, year_to)
+        if after is None:
+            start = lo + offset
+        else:
+            after_key = self._after_key(after[0], after[2], after[3] if len(after) > 3 else genre)
+            if after_key is None:
+                return None
+            start = max(lo, _search(keys, after_key, "right"))
+        return self._rows(keys, start, min(start + limit, hi))
+
+    # ---------- конкретный жанр ----------
+
+    def search_by_genre_years(self, genre, year_from, year_to, limit, offset=0, after=None):
+        keys = self.genre_keys.get(self.code.get(genre))
+        if keys is None:
+            return []
+        return self._page(keys, genre, year_from, year_to, limit, offset, after)
+
+    def count_by_genre_years(self, genre, year_from, year_to):
+        keys = self.genre_keys.get(self.code.get(genre))
+        if keys is None:
+            return 0
+        lo, hi = self._year_range(keys, year_from, year_to)
+        return hi - lo
+
+    def search_by_genre_years_with_total(self, genre, year_from, year_to, limit, offset=0):
+        rows = self.search_by_genre_years(genre, year_from, year_to, limit, offset)
+        # Как в SQL-версии: для пустой первой страницы total = 0
+        total = self.count_by_genre_years(genre, year_from, year_to) if rows or offset else 0
+        return SearchPage(rows, total, total)
+
+    # ---------- все жанры ----------
+
+    def search_by_years_all_genres(self, year_from, year_to, limit, offset=0, after=None):
+        return self._page(self.keys, "", year_from, year_to, limit, offset, after)
+
+    def count_by_years_all_genres(self, year_from, year_to):
+        lo, hi = self._year_range(self.keys, year_from, year_to)
+        return int(self.first_prefix[hi]) - int(self.first_prefix[lo])
+
+    def count_rows_by_years_all_genres(self, year_from, year_to):
+        lo, hi = self._year_range(self.keys, year_from, year_to)
+        return hi - lo
+
+    def search_by_years_all_genres_with_total(self, year_from, year_to, limit, offset=0):
+        rows = self.search_by_years_all_genres(year_from, year_to, limit, offset)
+        if not rows and not offset:
+            # Как в SQL-версии: для пустой первой страницы total = 0
+            return SearchPage(rows, 0, 0)
+        return SearchPage(
+            rows,
+            self.count_rows_by_years_all_genres(year_from, year_to),
+            self.count_by_years_all_genres(year_from, year_to),
+        )
+
+
+class GenreCatalog:
+    """
+    Каталог жанров/лет процесса: снимок + загрузка из MySQL.
+
+    load() -> (films, film_genres, genres) - данные для CatalogSnapshot.
+    enabled - отвечать ли из каталога (иначе декорированные функции идут в MySQL).
+    """
+
+    def __init__(self, load, enabled: bool = False, retry_interval: float = 30.0):
+        self._load = load
+        self.enabled = enabled
+        self.retry_interval = retry_interval
+        self._snapshot: CatalogSnapshot | None = None
+        self._lock = threading.Lock()
+        self._failed_at: float | None = None
+        self._builder: threading.Thread | None = None
+
+    def build(self, data: tuple | None = None) -> None:
+        """
+        (Пере)строит снимок; поиск во время перестроения видит старый снимок.
+        data - готовые (films, film_genres, genres); если не переданы - load().
+        """
+        self._snapshot = CatalogSnapshot(*(data if data is not None else self._load()))
+        self._failed_at = None
+
+    def _may_retry(self) -> bool:
+        failed_at = self._failed_at
+        return failed_at is None or time.monotonic() - failed_at >= self.retry_interval
+
+    def _try_build(self) -> None:
+        """
+        Ленивое построение: ошибка загрузки только логируется, следующая
+        попытка - не раньше retry_interval. Если каталог уже строит другой
+        поток, не ждёт его (запрос уйдёт в MySQL).
+        """
+        if not self._lock.acquire(blocking=False):
+            return
+        try:
+            if self._snapshot is None and self._may_retry():
+                self.build()
+        except Exception:
+            self._failed_at = time.monotonic()
+            logger.warning("Genre catalog was not built, next attempt in %ss", self.retry_interval, exc_info=True)
+        finally:
+            self._lock.release()
+
+    def snapshot(self) -> CatalogSnapshot | None:
+        """
+        Текущий снимок или None (каталог выключен или ещё не построен).
+        Снимка нет - пробует построить его здесь же (с учётом retry_interval).
+        """
+        if not self.enabled:
+            return None
+        if self._snapshot is None and self._may_retry():
+            self._try_build()
+        return self._snapshot
+
+    def build_in_background(self) -> None:
+        """Запускает построение в фоновом потоке, если снимка нет и оно ещё не идёт."""
+        if self._snapshot is not None or not self._may_retry():
+            return
+        builder = self._builder
+        if builder is None or not builder.is_alive():
+            self._builder = threading.Thread(target=self._try_build, name="genre-catalog-build", daemon=True)
+            self._builder.start()
+
+    def clear(self) -> None:
+        self._snapshot = None
+
+    def stats(self) -> dict:
+        snapshot = self._snapshot
+        return {
+            "enabled": self.enabled,
+            "built": snapshot is not None,
+            "films": len(snapshot.films) if snapshot else 0,
+            "pairs": snapshot.pairs if snapshot else 0,
+            "genres": len(snapshot.genres) if snapshot else 0,
+            "numpy": np is not None,
+        }
+
+    def serves(self, method: str):
+        """
+        Декоратор функции mysql_repo: если каталог включён, ответ берёт
+        CatalogSnapshot.<method> с теми же аргументами (кэш результатов и MySQL
+        не используются). Пока снимка нет (в том числе после ошибки загрузки) -
+        отвечает func.
+        """
+
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                snapshot = self.snapshot()
+                if snapshot is not None:
+                    result = getattr(snapshot, method)(*args, **kwargs)
+                    if result is not None:
+                        return result
+                return func(*args, **kwargs)
+
+            return wrapper
+
+        return decorator
+
+    def serves_async(self, method: str):
+        """
+        То же, что serves, но для async-функций (async_repo).
+        Снимок здесь не строится: пока его нет, отвечает func, а каталог
+        строится в фоновом потоке (build_in_background).
+        """
+
+        def decorator(func):
+            @functools.wraps(func)
+            async def wrapper(*args, **kwargs):
+                snapshot = self._snapshot if self.enabled else None
+                if snapshot is None and self.enabled:
+                    # Загрузка из MySQL - не в event loop; пока её нет, отвечает func
+                    self.build_in_background()
+                if snapshot is not None:
+                    result = getattr(snapshot, method)(*args, **kwargs)
+                    if result is not None:
+                        return result
+                return await func(*args, **kwargs)
+
+            return wrapper
+
+        return decorator
@@ -0,0 +1,455 @@
+# datagen.py
+"""
+Генератор синтетических данных Sakila и логов поиска для нагрузочных тестов.
+
+В настоящей Sakila всего 1000 фильмов (и у всех release_year = 2006),
+поэтому проблемы масштаба SEARCH_BY_KEYWORD, SEARCH_BY_YEARS_ALL_GENRES
+и агрегаций статистики на ней не видны. Здесь создаются:
+- film / category / film_category любого размера (например, 1M фильмов)
+- документы логов поиска в формате mongo.log_query (например, 10M)
+
+Распределения приближены к реальным:
+- названия - два слова в стиле Sakila ("ACADEMY DINOSAUR"); частота слов
+  убывает по закону Ципфа, поэтому популярные слова ("LOVE", "MOON")
+  встречаются в тысячах названий, а редкие - в единицах
+- жанры - 16 жанров Sakila с весами по их реальному количеству фильмов,
+  у части фильмов (MULTI_GENRE_SHARE) второй жанр
+- годы - YEAR_MIN..YEAR_MAX, новых фильмов больше, чем старых
+- логи - популярные слова ищут чаще (тот же закон Ципфа), бывают
+  начала слов и опечатки (запросы без результатов), более свежие
+  запросы встречаются чаще
+
+Данные генерируются потоком и пишутся пачками - весь объём в памяти
+не держится. Генерация детерминирована (seed).
+
+Загрузка:
+    python -m Project.datagen mysql --films 1000000 --database sakila_scale
+    python -m Project.datagen sqlite --path sakila_scale.db --films 1000000
+    python -m Project.datagen mongo --logs 10000000 --collection search_logs_scale
+
+MySQL: загружать в отдельную базу (--database), а не в настоящую Sakila -
+таблицы создаются в упрощённом виде (только колонки, которые читает
+приложение, без внешних ключей), а в непустую таблицу film загрузка
+не выполняется (--replace пересоздаёт три таблицы и работает только
+вместе с --database, отличной от базы приложения).
+
+MongoDB: логи пишутся в отдельную коллекцию (--collection, по умолчанию
+DATAGEN_COLLECTION_NAME) и её счётчики, а не в рабочий лог приложения;
+в непустую коллекцию загрузка не выполняется (--replace удаляет её логи
+и счётчики).
+"""
+
+import argparse
+import itertools
+import random
+import sqlite3
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Iterable, Iterator
+
+import mysql.connector
+
+from Project import mongo
+from Project.local_settings import dbconfig
+
+# Границы годов выпуска
+YEAR_MIN = 1990
+YEAR_MAX = 2025
+
+# Доля фильмов со вторым жанром (в настоящей Sakila - 0)
+MULTI_GENRE_SHARE = 0.1
+
+# Показатель закона Ципфа для частоты слов (больше - сильнее перекос к популярным)
+TITLE_ZIPF_S = 0.9
+
+# Сколько строк / документов писать одной пачкой
+LOAD_BATCH_SIZE = 5000
+
+# Коллекция MongoDB для синтетических логов по умолчанию (не рабочий лог приложения)
+DATAGEN_COLLECTION_NAME = f"{mongo.COLLECTION_NAME}_datagen"
+
+# Жанры Sakila (category_id - по алфавиту, как в Sakila) и количество их фильмов в Sakila
+GENRE_WEIGHTS = {
+    "Action": 64, "Animation": 66, "Children": 60, "Classics": 57,
+    "Comedy": 58, "Documentary": 68, "Drama": 62, "Family": 69,
+    "Foreign": 73, "Games": 61, "Horror": 56, "Music": 51,
+    "New": 63, "Sci-Fi": 61, "Sports": 74, "Travel": 57,
+}
+GENRES = tuple(GENRE_WEIGHTS)
+
+# Слова названий в стиле Sakila, от самых частых к редким.
+# Если нужно больше слов (большой каталог), словарь дополняется
+# искусственными словами из слогов (см. title_vocabulary).
+TITLE_WORDS = (
+    "LOVE", "MOON", "DRAGON", "ACADEMY", "DINOSAUR", "GOLDFINGER", "ALIEN", "ANGELS", "BRIDE",
+    "CHICAGO", "JUNGLE", "TITANIC", "WESTWARD", "ZORRO", "AMERICAN", "APOCALYPSE", "ARMAGEDDON",
+    "BLADE", "BLOOD", "CIRCUS", "FANTASY", "HOLIDAY", "NORTH", "PRIDE", "RANGER", "SPLASH",
+    "ACE", "ADAPTATION", "AFFAIR", "AFRICAN", "AGENT", "AIRPLANE", "ALADDIN", "ALAMO", "ALI",
+    "ALLEY", "AMADEUS", "ANACONDA", "ANNIE", "ANTHEM", "ARABIA", "ATTACKS", "BABY", "BALLOON",
+    "BANG", "BEAST", "BED", "BEHAVIOR", "BILKO", "BIRDS", "BLANKET", "BOONDOCK", "BOUND", "CABIN",
+    "CANDLES", "CAPER", "CASABLANCA", "CHAMPION", "CLUE", "EGG", "GUN", "OCTOBER", "CONFIDENTIAL",
+    "DANCING", "DARKNESS", "DESTINY", "DETECTIVE", "DOCTOR", "DUCK", "EAGLES", "EXPRESS", "FEVER",
+    "FIRE", "FLASH", "FOREVER", "FRONTIER", "GHOST", "GRAFFITI", "HARRY", "HEAVEN", "HUNTER",
+    "ICE", "INDIAN", "ISLAND", "JEDI", "KING", "KISS", "LADY", "LEGEND", "MADNESS", "MAGIC",
+    "MALTESE", "MIDNIGHT", "MUMMY", "MUSKETEERS", "NATURAL", "OPUS", "PANTHER", "PARADISE",
+    "PATIENT", "PIRATES", "PRINCESS", "RAINBOW", "REBEL", "ROCKY", "SAINTS", "SECRET", "SHANGHAI",
+    "SPIRIT", "STAR", "STORM", "SUNSET", "TEXAS", "THIEF", "TRAIN", "TROJAN", "TWISTED", "VAMPIRE",
+    "VANISHING", "WAR", "WEDDING", "WILD", "WOMEN", "WONDERLAND", "YOUTH",
+)
+
+# Слоги для искусственных слов
+_SYLLABLES = ("BA", "KO", "RI", "MEN", "TAL", "VOR", "SI", "DA", "LUN", "PER", "GO", "XA", "NEL", "TRI", "QUE", "ZEN")
+
+
+# -------------------------
+# Распределения
+# -------------------------
+
+def title_vocabulary(size: int) -> list[str]:
+    """Словарь из size слов: сначала TITLE_WORDS, затем искусственные слова из слогов."""
+    words = list(TITLE_WORDS[:size])
+    known = set(words)
+    for length in itertools.count(2):
+        if len(words) >= size:
+            break
+        for parts in itertools.product(_SYLLABLES, repeat=length):
+            word = "".join(parts)
+            if word not in known:
+                words.append(word)
+                known.add(word)
+                if len(words) >= size:
+                    break
+    return words
+
+
+def vocabulary_size(films: int) -> int:
+    """Размер словаря для каталога: растёт как корень из числа фильмов."""
+    return max(len(TITLE_WORDS), int(films ** 0.5) * 2)
+
+
+def zipf_cum_weights(n: int, s: float = TITLE_ZIPF_S) -> list[float]:
+    """Накопленные веса закона Ципфа для рангов 1..n (для random.choices)."""
+    return list(itertools.accumulate(1.0 / rank ** s for rank in range(1, n + 1)))
+
+
+def year_cum_weights(year_min: int = YEAR_MIN, year_max: int = YEAR_MAX) -> tuple[list[int], list[float]]:
+    """Годы и накопленные веса: последний год втрое "популярнее" первого."""
+    years = list(range(year_min, year_max + 1))
+    span = max(year_max - year_min, 1)
+    return years, list(itertools.accumulate(1.0 + 2.0 * (y - year_min) / span for y in years))
+
+
+def batched(items: Iterable, size: int) -> Iterator[list]:
+    """Разбивает поток на списки по size элементов."""
+    it = iter(items)
+    while batch := list(itertools.islice(it, size)):
+        yield batch
+
+
+# -------------------------
+# Генераторы
+# -------------------------
+
+def generate_films(
+        films: int,
+        seed: int = 42,
+        year_min: int = YEAR_MIN,
+        year_max: int = YEAR_MAX,
+        multi_genre_share: float = MULTI_GENRE_SHARE,
+) -> Iterator[tuple[tuple, list[int]]]:
+    """
+    Поток ((film_id, title, release_year), [category_id, ...]).
+    Первые два фильма получают year_min и year_max, поэтому
+    границы лет (MIN_MAX_YEAR) не зависят от размера каталога.
+    """
+    rnd = random.Random(seed)
+    words = title_vocabulary(vocabulary_size(films))
+    word_weights = zipf_cum_weights(len(words))
+    years, year_weights = year_cum_weights(year_min, year_max)
+    genre_ids = list(range(1, len(GENRES) + 1))
+    genre_weights = list(itertools.accumulate(GENRE_WEIGHTS.values()))
+
+    for film_id in range(1, films + 1):
+        first, second = rnd.choices(words, cum_weights=word_weights, k=2)
+        if second == first:
+            second = rnd.choice(words)
+        year = {1: year_min, 2: year_max}.get(film_id) or rnd.choices(years, cum_weights=year_weights)[0]
+
+        genres = rnd.choices(genre_ids, cum_weights=genre_weights)
+        if rnd.random() < multi_genre_share:
+            extra = rnd.choices(genre_ids, cum_weights=genre_weights)[0]
+            if extra != genres[0]:
+                genres.append(extra)
+
+        yield (film_id, f"{first} {second}", year), genres
+
+
+def generate_logs(
+        count: int,
+        seed: int = 42,
+        days: int = 30,
+        films: int = 1000,
+        year_min: int = YEAR_MIN,
+        year_max: int = YEAR_MAX,
+        now: datetime | None = None,
+) -> Iterator[dict]:
+    """
+    Поток документов лога поиска (поля как в mongo.log_query) за последние days дней.
+    films - размер каталога, по словарю которого ищут ключевые слова.
+    """
+    rnd = random.Random(seed)
+    now = now or datetime.now(timezone.utc)
+    words = title_vocabulary(vocabulary_size(films))
+    word_weights = zipf_cum_weights(len(words))
+    years, year_weights = year_cum_weights(year_min, year_max)
+    genres = ("All",) + GENRES
+    # "All" выбирают примерно в 15% поисков по жанру
+    genre_weights = list(itertools.accumulate((sum(GENRE_WEIGHTS.values()) * 0.18,) + tuple(GENRE_WEIGHTS.values())))
+
+    for _ in range(count):
+        if rnd.random() < 0.6:
+            keyword = rnd.choices(words, cum_weights=word_weights)[0].lower()
+            kind = rnd.random()
+            if kind < 0.15 and len(keyword) > 3:
+                # пользователь ввёл только начало слова
+                keyword = keyword[:rnd.randint(3, len(keyword) - 1)]
+            elif kind < 0.2:
+                # опечатка - обычно поиск без результатов
+                pos = rnd.randrange(len(keyword))
+                keyword = keyword[:pos] + rnd.choice("qxzj") + keyword[pos + 1:]
+            search_type, params = "keyword", {"keyword": keyword}
+            results_count = int(rnd.expovariate(1 / 20))
+        else:
+            y1 = rnd.choices(years, cum_weights=year_weights)[0]
+            y2 = min(y1 + rnd.choice((0, 0, 1, 2, 5, 10)), year_max)
+            genre = rnd.choices(genres, cum_weights=genre_weights)[0]
+            search_type = "genre__years_range"
+            params = {"genre": genre, "years_range": f"{y1}-{y2}"}
+            results_count = int(rnd.expovariate(1 / 50))
+
+        yield {
+            # свежие запросы встречаются чаще
+            "timestamp": now - timedelta(seconds=days * 86400 * rnd.random() ** 2),
+            "search_type": search_type,
+            "params": params,
+            "results_count": results_count,
+        }
+
+
+# -------------------------
+# Загрузка
+# -------------------------
+
+# Упрощённая схема: только колонки, которые читает приложение (+ last_update)
+SQLITE_SCHEMA = (
+    """
+    CREATE TABLE IF NOT EXISTS category (
+        category_id INTEGER PRIMARY KEY,
+        name TEXT NOT NULL,
+        last_update TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS film (
+        film_id INTEGER PRIMARY KEY,
+        title TEXT NOT NULL,
+        release_year INTEGER,
+        last_update TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS film_category (
+        film_id INTEGER NOT NULL,
+        category_id INTEGER NOT NULL,
+        last_update TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,
+        PRIMARY KEY (film_id, category_id)
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_title ON film (title)",
+    "CREATE INDEX IF NOT EXISTS idx_release_year ON film (release_year)",
+    "CREATE INDEX IF NOT EXISTS idx_fk_category_id ON film_category (category_id)",
+    "CREATE INDEX IF NOT EXISTS idx_film_last_update ON film (last_update)",
+    "CREATE INDEX IF NOT EXISTS idx_film_category_last_update ON film_category (last_update)",
+)
+
+MYSQL_SCHEMA = (
+    """
+    CREATE TABLE IF NOT EXISTS category (
+        category_id TINYINT UNSIGNED NOT NULL,
+        name VARCHAR(25) NOT NULL,
+        last_update TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+        PRIMARY KEY (category_id)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS film (
+        film_id INT UNSIGNED NOT NULL,
+        title VARCHAR(128) NOT NULL,
+        release_year YEAR DEFAULT NULL,
+        last_update TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+        PRIMARY KEY (film_id),
+        KEY idx_title (title),
+        KEY idx_release_year (release_year),
+        KEY idx_film_last_update (last_update)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS film_category (
+        film_id INT UNSIGNED NOT NULL,
+        category_id TINYINT UNSIGNED NOT NULL,
+        last_update TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+        PRIMARY KEY (film_id, category_id),
+        KEY idx_fk_category_id (category_id),
+        KEY idx_film_category_last_update (last_update)
+    )
+    """,
+)
+
+
+def _insert_catalog(conn, films: int, seed: int, batch_size: int, placeholder: str, progress=None) -> int:
+    """Пишет жанры и фильмы пачками (placeholder - "?" для SQLite, "%s" для MySQL)."""
+    p = placeholder
+    cursor = conn.cursor()
+    cursor.execute("SELECT COUNT(*) FROM film")
+    if cursor.fetchone()[0]:
+        raise RuntimeError("Table film is not empty - load into an empty database or use --replace")
+
+    cursor.execute("SELECT COUNT(*) FROM category")
+    if not cursor.fetchone()[0]:
+        cursor.executemany(
+            f"INSERT INTO category (category_id, name) VALUES ({p}, {p})",
+            list(enumerate(GENRES, start=1)),
+        )
+
+    loaded = 0
+    for batch in batched(generate_films(films, seed), batch_size):
+        cursor.executemany(
+            f"INSERT INTO film (film_id, title, release_year) VALUES ({p}, {p}, {p})",
+            [film for film, _ in batch],
+        )
+        cursor.executemany(
+            f"INSERT INTO film_category (film_id, category_id) VALUES ({p}, {p})",
+            [(film[0], category_id) for film, genres in batch for category_id in genres],
+        )
+        conn.commit()
+        loaded += len(batch)
+        if progress is not None:
+            progress("films", loaded, films)
+    cursor.close()
+    return loaded
+
+
+def load_sqlite(path: str, films: int, seed: int = 42, batch_size: int = LOAD_BATCH_SIZE, progress=None) -> int:
+    """Создаёт (если нужно) схему в файле SQLite и загружает каталог. Возвращает число фильмов."""
+    conn = sqlite3.connect(path)
+    try:
+        for statement in SQLITE_SCHEMA:
+            conn.execute(statement)
+        return _insert_catalog(conn, films, seed, batch_size, "?", progress)
+    finally:
+        conn.close()
+
+
+def load_mysql(
+        films: int,
+        seed: int = 42,
+        batch_size: int = LOAD_BATCH_SIZE,
+        database: str | None = None,
+        replace: bool = False,
+        progress=None,
+) -> int:
+    """
+    Загружает каталог в MySQL (база - database или из dbconfig).
+    replace - пересоздать film, category и film_category; только
+    в отдельной базе database, в базе приложения - RuntimeError.
+    """
+    if replace and (not database or database == dbconfig.get("database")):
+        raise RuntimeError("--replace drops tables - pass --database other than the application database")
+    config = dict(dbconfig, database=database) if database else dict(dbconfig)
+    conn = mysql.connector.connect(**config)
+    try:
+        with conn.cursor() as cursor:
+            if replace:
+                for table in ("film_category", "film", "category"):
+                    cursor.execute(f"DROP TABLE IF EXISTS {table}")
+            for statement in MYSQL_SCHEMA:
+                cursor.execute(statement)
+            # Проверки уникальности вторичных индексов не нужны - ключи генерируются по порядку
+            cursor.execute("SET SESSION unique_checks = 0")
+        return _insert_catalog(conn, films, seed, batch_size, "%s", progress)
+    finally:
+        conn.close()
+
+
+def load_mongo(
+        logs: int,
+        seed: int = 42,
+        films: int = 1000,
+        batch_size: int = LOAD_BATCH_SIZE,
+        collection: str = DATAGEN_COLLECTION_NAME,
+        replace: bool = False,
+        progress=None,
+) -> int:
+    """
+    Загружает логи поиска в коллекцию collection вместе со счётчиками
+    (так же, как их пишет фоновый писатель mongo.log_query).
+    В непустую коллекцию загрузка не выполняется; replace - удалить
+    логи и счётчики этой коллекции перед загрузкой.
+    """
+    counters = mongo.counters_collection_name(collection)
+    if replace:
+        mongo.get_mongo_collection(collection).drop()
+        mongo.get_mongo_collection(counters).drop()
+    elif mongo.get_mongo_collection(collection).find_one({}, {"_id": 1}) is not None:
+        raise RuntimeError(f"Collection {collection} is not empty - load into another collection or use --replace")
+
+    mongo.ensure_log_indexes(collection)
+    loaded = 0
+    for batch in batched(generate_logs(logs, seed, films=films), batch_size):
+        mongo.write_logs(batch, collection)
+        loaded += len(batch)
+        if progress is not None:
+            progress("logs", loaded, logs)
+    return loaded
+
+
+def progress_printer() -> Callable[[str, int, int], None]:
+    """progress(what, done, total) для загрузчиков: печатает ход загрузки и скорость."""
+    started = time.monotonic()
+
+    def progress(what: str, done: int, total: int) -> None:
+        elapsed = time.monotonic() - started
+        print(f"{what}: {done}/{total} ({done / elapsed if elapsed else 0:.0f}/s)", flush=True)
+
+    return progress
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Generate synthetic Sakila catalog and search logs.")
+    parser.add_argument("target", choices=("mysql", "sqlite", "mongo"))
+    parser.add_argument("--films", type=int, default=1000)
+    parser.add_argument("--logs", type=int, default=10000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--batch-size", type=int, default=LOAD_BATCH_SIZE)
+    parser.add_argument("--path", default="sakila_scale.db", help="SQLite file (target sqlite)")
+    parser.add_argument("--database", default=None, help="MySQL database instead of dbconfig['database']")
+    parser.add_argument("--collection", default=DATAGEN_COLLECTION_NAME, help="MongoDB log collection (target mongo)")
+    parser.add_argument("--replace", action="store_true", help="drop and recreate the MySQL tables / Mongo collections")
+    args = parser.parse_args(argv)
+
+    progress = progress_printer()
+    if args.target == "sqlite":
+        loaded = load_sqlite(args.path, args.films, args.seed, args.batch_size, progress)
+    elif args.target == "mysql":
+        loaded = load_mysql(args.films, args.seed, args.batch_size, args.database, args.replace, progress)
+    else:
+        loaded = load_mongo(args.logs, args.seed, args.films, args.batch_size, args.collection, args.replace, progress)
+        mongo.close_mongo_client()
+
+    print(f"Loaded: {loaded}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
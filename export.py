@@ -0,0 +1,107 @@
+# export.py
+"""
+Экспорт полного результата поиска в CSV или NDJSON.
+
+Строки читаются из MySQL потоком (mysql_repo.iter_search_*) и сразу
+превращаются в текст кусками по EXPORT_CHUNK_ROWS строк - весь результат
+никогда не лежит в памяти целиком.
+
+Одна запись в журнал экспортов (mongo.log_export, отдельная коллекция -
+в статистику поисков экспорты не попадают) на весь экспорт - после того
+как выгружена последняя строка (results_count = количество строк).
+
+Используется:
+- web_app.py (/export, StreamingResponse)
+- flows.py (export_flow, запись в файл)
+"""
+
+import csv
+import io
+import json
+from typing import Iterator
+
+from Project import local_settings
+from Project.mongo import log_export
+from Project.mysql_repo import iter_search_by_genre_years, iter_search_by_keyword
+
+# Сколько строк собирать в один кусок вывода
+EXPORT_CHUNK_ROWS = getattr(local_settings, "EXPORT_CHUNK_ROWS", 500)
+
+# Формат -> MIME-тип ответа
+EXPORT_FORMATS = {
+    "csv": "text/csv; charset=utf-8",
+    "ndjson": "application/x-ndjson",
+}
+
+# Колонки экспорта для каждого вида поиска
+EXPORT_COLUMNS = {
+    "keyword": ("film_id", "title", "release_year"),
+    "genre_years": ("film_id", "title", "release_year", "genre"),
+}
+
+
+def iter_export_chunks(rows, columns: tuple, fmt: str, on_done=None) -> Iterator[str]:
+    """
+    Превращает поток строк в куски CSV / NDJSON.
+    on_done(count) вызывается, когда выгружены все строки.
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format: {fmt}")
+
+    buf = io.StringIO()
+    if fmt == "csv":
+        writer = csv.writer(buf, lineterminator="\n")
+        writer.writerow(columns)
+
+        def write(row):
+            writer.writerow([row.get(c) for c in columns])
+    else:
+        def write(row):
+            record = {c: row.get(c) for c in columns}
+            buf.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+
+    count = 0
+    for row in rows:
+        write(row)
+        count += 1
+        if count % EXPORT_CHUNK_ROWS == 0:
+            yield buf.getvalue()
+            buf.seek(0)
+            buf.truncate()
+
+    tail = buf.getvalue()
+    if tail:
+        yield tail
+
+    if on_done is not None:
+        on_done(count)
+
+
+def export_keyword(keyword: str, fmt: str, log=log_export) -> Iterator[str]:
+    """Все фильмы по ключевому слову в формате fmt (+ одна запись в журнал экспортов)."""
+    return iter_export_chunks(
+        iter_search_by_keyword(keyword),
+        EXPORT_COLUMNS["keyword"],
+        fmt,
+        on_done=lambda count: log(
+            {"search_type": "keyword", "keyword": keyword, "format": fmt}, count
+        ),
+    )
+
+
+def export_genre_years(genre: str, year_from: int, year_to: int, fmt: str, log=log_export) -> Iterator[str]:
+    """Все фильмы жанра (или "All") за диапазон лет в формате fmt (+ одна запись в журнал экспортов)."""
+    return iter_export_chunks(
+        iter_search_by_genre_years(genre, year_from, year_to),
+        EXPORT_COLUMNS["genre_years"],
+        fmt,
+        on_done=lambda count: log(
+            {
+                "search_type": "genre__years_range",
+                "genre": genre,
+                "years_range": f"{year_from}-{year_to}",
+                "format": fmt,
+            },
+            count,
+        ),
+    )
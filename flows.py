@@ -7,19 +7,26 @@
 - поиск фильмов по ключевому слову (постранично)
 - поиск по жанру и диапазону лет (постранично)
 - просмотр статистики запросов
+- экспорт полного результата поиска в файл (CSV / NDJSON)
+
+Следующая страница загружается в фоне, пока пользователь смотрит
+текущую (см. prefetch.py).
 """
 
-from Project import queries
 from Project.mysql_repo import (
-    get_mysql_connection,
-    fetch_all,
     get_genres,
-    get_min_max_year
+    get_min_max_year,
+    search_by_genre_years
 )
+from Project.keyword_search import keyword_error, search_titles
+from Project.pagination import row_key
+from Project.prefetch import PagePrefetcher
+from Project.export import EXPORT_FORMATS, export_keyword, export_genre_years
 from Project.mongo import (
     stats_top5_frequency,
     stats_last5_unique,
-    log_query
+    log_query,
+    flush_query_log
 )
 
 # Количество фильмов на страницу (pagination)
@@ -95,30 +102,27 @@ def keyword_flow() -> None:
         print("Empty keyword. Back to menu.")
         return
 
-    offset = 0
+    after = None  # ключ последней показанной строки (keyset-пагинация)
     shown_count = 0  # сколько результатов реально показали пользователю за весь запрос
 
-    while True:
-        with get_mysql_connection() as conn:
-            with conn.cursor() as cursor:
-                cursor.execute(
-                    queries.SEARCH_BY_KEYWORD,
-                    (f"%{keyword.lower()}%", PAGE_SIZE, offset),
-                )
-                rows = fetch_all(cursor)
+    with PagePrefetcher(lambda key: search_titles(keyword, PAGE_SIZE, after=key)) as pages:
+        while True:
+            rows = pages.get(after)
 
-        print_movies(rows)
-        shown_count += len(rows)
+            print_movies(rows)
+            shown_count += len(rows)
 
-        # Если пришло меньше PAGE_SIZE - больше результатов нет
-        if len(rows) < PAGE_SIZE:
-            break
+            # Если пришло меньше PAGE_SIZE - больше результатов нет
+            if len(rows) < PAGE_SIZE:
+                break
 
-        # Если пользователь не хочет дальше - заканчиваем
-        if not ask_show_more():
-            break
+            # Следующая страница грузится, пока пользователь читает текущую
+            after = row_key("keyword", rows[-1])
+            pages.prefetch(after)
 
-        offset += PAGE_SIZE
+            # Если пользователь не хочет дальше - заканчиваем
+            if not ask_show_more():
+                break
 
     # Логирование запроса в MongoDB
     log_query("keyword", {"keyword": keyword}, shown_count)
@@ -147,27 +151,27 @@ def genre_years_flow() -> None:
         except ValueError as exc:
             print(f"Error: {exc}")
 
-    offset = 0
+    after = None
     shown_count = 0
 
-    while True:
-        with get_mysql_connection() as conn:
-            with conn.cursor() as cursor:
-                cursor.execute(
-                    queries.SEARCH_BY_GENRE_YEARS,
-                    (genre, year_from, year_to, PAGE_SIZE, offset),
-                )
-                rows = fetch_all(cursor)
+    def fetch_page(key):
+        return search_by_genre_years(genre, year_from, year_to, PAGE_SIZE, after=key)
 
-        print_movies(rows)
-        shown_count += len(rows)
+    with PagePrefetcher(fetch_page) as pages:
+        while True:
+            rows = pages.get(after)
 
-        if len(rows) < PAGE_SIZE:
-            break
-        if not ask_show_more():
-            break
+            print_movies(rows)
+            shown_count += len(rows)
+
+            if len(rows) < PAGE_SIZE:
+                break
 
-        offset += PAGE_SIZE
+            after = row_key("genre_years", rows[-1])
+            pages.prefetch(after)
+
+            if not ask_show_more():
+                break
 
     # Логирование запроса в MongoDB
     log_query(
@@ -177,10 +181,71 @@ def genre_years_flow() -> None:
     )
 
 
+# ====== FLOW: ЭКСПОРТ ======
+
+def export_flow() -> None:
+    """
+    Сценарий экспорта полного результата поиска в файл.
+    Строки пишутся в файл по мере чтения из MySQL (весь результат в память не грузится).
+    """
+    kind = input("Export search by 1: keyword, 2: genre and years (0: back): ").strip()
+
+    if kind == "1":
+        keyword = input("Enter keyword: ").strip()
+        if not keyword:
+            print("Empty keyword. Back to menu.")
+            return
+        error = keyword_error(keyword)
+        if error:
+            print(f"Error: {error}")
+            return
+        name = "films_keyword"
+    elif kind == "2":
+        genres = get_genres()
+        min_y, max_y = get_min_max_year()
+        print("Genres: All, " + ", ".join(genres))
+
+        genre = input("Enter genre exactly: ").strip()
+        if genre != "All" and genre not in genres:
+            print("Genre not found. Back to menu.")
+            return
+
+        while True:
+            try:
+                year_from, year_to = parse_years_input(min_y, max_y)
+                break
+            except ValueError as exc:
+                print(f"Error: {exc}")
+        name = f"films_{genre.lower()}_{year_from}-{year_to}"
+    else:
+        return
+
+    fmt = input(f"Format ({' / '.join(EXPORT_FORMATS)}) [csv]: ").strip().lower() or "csv"
+    if fmt not in EXPORT_FORMATS:
+        print("Unknown format. Back to menu.")
+        return
+
+    path = input(f"File name [{name}.{fmt}]: ").strip() or f"{name}.{fmt}"
+
+    if kind == "1":
+        chunks = export_keyword(keyword, fmt)
+    else:
+        chunks = export_genre_years(genre, year_from, year_to, fmt)
+
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        for chunk in chunks:
+            f.write(chunk)
+
+    print(f"Saved: {path}")
+
+
 # ====== FLOW: СТАТИСТИКА ======
 
 def stats_flow() -> None:
     """Сценарий просмотра статистики запросов."""
+    # Логи пишутся в фоне - дописываем очередь, чтобы статистика учла последние поиски
+    flush_query_log()
+
     while True:
         print(
             """
@@ -0,0 +1,299 @@
+# keyword_search.py
+"""
+Поиск фильмов по ключевому слову (подстрока в названии) - подключаемые backend-ы.
+
+Проблема исходного запроса:
+    WHERE LOWER(title) LIKE '%kw%'
+LOWER() и ведущий % не дают использовать индекс - каждый поиск
+(страница + COUNT) это полный просмотр таблицы film.
+
+Backend-ы (выбираются настройкой KEYWORD_SEARCH_BACKEND):
+- "sql"      - исходные LIKE-запросы (запасной вариант)
+- "ngram"    - in-memory индекс триграмм по названиям фильмов,
+               строится один раз при старте, поиск без обращения к MySQL
+- "fulltext" - MySQL FULLTEXT-индекс с ngram-парсером
+               (см. queries.CREATE_TITLE_FULLTEXT_INDEX)
+
+Все backend-ы возвращают одинаковые строки (film_id, title, release_year)
+в одинаковом порядке (title, film_id) и одинаковое количество.
+
+Используется:
+- web_app.py (search_keyword, export)
+- flows.py (keyword_flow, export_flow)
+"""
+
+import re
+import threading
+from bisect import bisect_right
+
+from Project import local_settings
+from Project.mysql_repo import (
+    SearchPage,
+    search_by_keyword,
+    count_by_keyword,
+    search_by_keyword_with_total,
+    search_by_keyword_fulltext,
+    count_by_keyword_fulltext,
+    search_by_keyword_fulltext_with_total,
+    get_all_films
+)
+
+# Какой backend использовать: "ngram" / "fulltext" / "sql"
+KEYWORD_SEARCH_BACKEND = getattr(local_settings, "KEYWORD_SEARCH_BACKEND", "ngram")
+
+# Длина n-граммы для in-memory индекса
+NGRAM_SIZE = 3
+
+# Минимальная длина ключевого слова для FULLTEXT (= ngram_token_size в MySQL)
+FULLTEXT_MIN_KEYWORD = 2
+
+# Символы, которые в LIKE являются шаблонами: такие ключевые слова
+# всегда отдаём в SQL, чтобы результат совпадал с исходным запросом
+LIKE_SPECIAL_CHARS = set("%_\\")
+
+
+def has_like_wildcards(keyword: str) -> bool:
+    """Есть ли в ключевом слове символы-шаблоны LIKE (%, _, \\)."""
+    return any(ch in LIKE_SPECIAL_CHARS for ch in keyword)
+
+
+def keyword_error(keyword: str) -> str | None:
+    """Проверка keyword: нужна хотя бы одна латинская буква (None - всё в порядке)."""
+    if keyword and not re.search(r"[a-zA-Z]", keyword):
+        return "Введите ключевое слово латиницей (a-z)."
+    return None
+
+
+class SqlLikeBackend:
+    """Исходный вариант: LOWER(title) LIKE '%kw%' в MySQL."""
+
+    name = "sql"
+
+    def search(self, keyword: str, limit: int, offset: int = 0, after: tuple | None = None) -> list[dict]:
+        return search_by_keyword(keyword, limit, offset=offset, after=after)
+
+    def count(self, keyword: str) -> int:
+        return count_by_keyword(keyword)
+
+    def search_with_total(self, keyword: str, limit: int, offset: int = 0) -> SearchPage:
+        return search_by_keyword_with_total(keyword, limit, offset=offset)
+
+
+class FulltextBackend:
+    """
+    MySQL FULLTEXT (ngram parser): индекс сужает кандидатов, LIKE перепроверяет.
+
+    Для полного совпадения с LIKE-версией на сервере должны быть:
+    ngram_token_size = 2 и отключённые стоп-слова FULLTEXT
+    (innodb_ft_enable_stopword = OFF), иначе часть n-грамм не индексируется.
+    Короткие слова и слова со спецсимволами ищутся через LIKE.
+    """
+
+    name = "fulltext"
+
+    def __init__(self):
+        self._fallback = SqlLikeBackend()
+
+    def _use_fallback(self, keyword: str) -> bool:
+        return (
+                len(keyword) < FULLTEXT_MIN_KEYWORD
+                or has_like_wildcards(keyword)
+                or '"' in keyword
+        )
+
+    def search(self, keyword: str, limit: int, offset: int = 0, after: tuple | None = None) -> list[dict]:
+        if self._use_fallback(keyword):
+            return self._fallback.search(keyword, limit, offset=offset, after=after)
+        return search_by_keyword_fulltext(keyword, limit, offset=offset, after=after)
+
+    def count(self, keyword: str) -> int:
+        if self._use_fallback(keyword):
+            return self._fallback.count(keyword)
+        return count_by_keyword_fulltext(keyword)
+
+    def search_with_total(self, keyword: str, limit: int, offset: int = 0) -> SearchPage:
+        if self._use_fallback(keyword):
+            return self._fallback.search_with_total(keyword, limit, offset=offset)
+        return search_by_keyword_fulltext_with_total(keyword, limit, offset=offset)
+
+
+class NgramIndexBackend:
+    """
+    In-memory инвертированный индекс n-грамм (по умолчанию триграмм) по названиям.
+
+    Как работает поиск "kw":
+    - берём все триграммы слова, пересекаем их списки фильмов
+      (начиная с самого короткого списка)
+    - кандидатов перепроверяем на вхождение подстроки
+    - сортируем по позиции фильма в порядке ORDER BY title, film_id,
+      который взят из MySQL при построении индекса (порядок сравнения
+      строк в MySQL зависит от collation, поэтому не вычисляем его сами)
+
+    Слова короче NGRAM_SIZE ищутся простым проходом по всем названиям
+    (в памяти, уже в нужном порядке).
+    """
+
+    name = "ngram"
+
+    def __init__(self, load_films=get_all_films, n: int = NGRAM_SIZE):
+        self._load_films = load_films
+        self.n = n
+        # Снимок индекса заменяется целиком одной операцией,
+        # поэтому поиск во время перестроения видит либо старый, либо новый индекс
+        self._snapshot: _IndexSnapshot | None = None
+        self._fallback = SqlLikeBackend()
+
+    # ---------- построение ----------
+
+    def build(self, films: list[dict] | None = None) -> None:
+        """
+        (Пере)строит индекс. films - строки в порядке ORDER BY title, film_id;
+        если не переданы - загружаются из MySQL.
+        """
+        if films is None:
+            films = self._load_films()
+        self._snapshot = _IndexSnapshot(films, self.n)
+
+    def ensure_built(self) -> "_IndexSnapshot":
+        """Возвращает текущий индекс; строит его при первом использовании (например, в CLI)."""
+        snapshot = self._snapshot
+        if snapshot is None:
+            self.build()
+            snapshot = self._snapshot
+        return snapshot
+
+    def stats(self) -> dict:
+        snapshot = self._snapshot
+        if snapshot is None:
+            return {"films": 0, "ngrams": 0, "n": self.n}
+        return {"films": len(snapshot.films), "ngrams": len(snapshot.postings), "n": self.n}
+
+    # ---------- поиск ----------
+
+    def search(self, keyword: str, limit: int, offset: int = 0, after: tuple | None = None) -> list[dict]:
+        if has_like_wildcards(keyword):
+            return self._fallback.search(keyword, limit, offset=offset, after=after)
+
+        snapshot = self.ensure_built()
+        positions = snapshot.match_positions(keyword)
+
+        if after is not None:
+            after_pos = snapshot.rank.get(after[1])
+            if after_pos is None:
+                # Фильм из курсора исчез из индекса - честно спрашиваем MySQL
+                return self._fallback.search(keyword, limit, after=after)
+            start = bisect_right(positions, after_pos)
+        else:
+            start = offset
+
+        return [dict(snapshot.films[pos]) for pos in positions[start:start + limit]]
+
+    def count(self, keyword: str) -> int:
+        if has_like_wildcards(keyword):
+            return self._fallback.count(keyword)
+
+        return len(self.ensure_built().match_positions(keyword))
+
+    def search_with_total(self, keyword: str, limit: int, offset: int = 0) -> SearchPage:
+        if has_like_wildcards(keyword):
+            return self._fallback.search_with_total(keyword, limit, offset=offset)
+
+        snapshot = self.ensure_built()
+        positions = snapshot.match_positions(keyword)
+        rows = [dict(snapshot.films[pos]) for pos in positions[offset:offset + limit]]
+        return SearchPage(rows, len(positions), len(positions))
+
+
+class _IndexSnapshot:
+    """Неизменяемый снимок индекса n-грамм (строится целиком в build)."""
+
+    def __init__(self, films: list[dict], n: int):
+        self.n = n
+        self.films = [
+            {"film_id": f["film_id"], "title": f["title"], "release_year": f["release_year"]}
+            for f in films
+        ]
+        self.lower_titles = [str(f["title"]).lower() for f in self.films]
+        self.rank = {f["film_id"]: pos for pos, f in enumerate(self.films)}  # film_id -> позиция
+
+        # n-грамма -> позиции фильмов (по возрастанию)
+        self.postings: dict[str, list[int]] = {}
+        for pos, title in enumerate(self.lower_titles):
+            for gram in {title[i:i + n] for i in range(len(title) - n + 1)}:
+                self.postings.setdefault(gram, []).append(pos)
+
+    def match_positions(self, keyword: str) -> list[int]:
+        """Позиции (в порядке сортировки) всех фильмов, содержащих keyword."""
+        kw = keyword.lower()
+        titles = self.lower_titles
+
+        if len(kw) < self.n:
+            return [pos for pos, title in enumerate(titles) if kw in title]
+
+        grams = {kw[i:i + self.n] for i in range(len(kw) - self.n + 1)}
+        lists = sorted((self.postings.get(g, []) for g in grams), key=len)
+        if not lists[0]:
+            return []
+
+        candidates = set(lists[0])
+        for other in lists[1:]:
+            candidates.intersection_update(other)
+            if not candidates:
+                return []
+
+        return sorted(pos for pos in candidates if kw in titles[pos])
+
+
+# -------------------------
+# Выбор backend-а
+# -------------------------
+
+BACKENDS = {
+    "sql": SqlLikeBackend,
+    "ngram": NgramIndexBackend,
+    "fulltext": FulltextBackend,
+}
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_keyword_backend():
+    """Backend поиска по ключевому слову (один на процесс)."""
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                if KEYWORD_SEARCH_BACKEND not in BACKENDS:
+                    raise ValueError(f"Unknown KEYWORD_SEARCH_BACKEND: {KEYWORD_SEARCH_BACKEND}")
+                _backend = BACKENDS[KEYWORD_SEARCH_BACKEND]()
+    return _backend
+
+
+def set_keyword_backend(backend) -> None:
+    """Подменяет backend (например, в тестах или для переключения на лету)."""
+    global _backend
+    with _backend_lock:
+        _backend = backend
+
+
+def build_keyword_index() -> None:
+    """Строит in-memory индекс заранее (при старте приложения), если он используется."""
+    backend = get_keyword_backend()
+    if isinstance(backend, NgramIndexBackend):
+        backend.build()
+
+
+def search_titles(keyword: str, limit: int, offset: int = 0, after: tuple | None = None) -> list[dict]:
+    """Страница фильмов, в названии которых есть keyword."""
+    return get_keyword_backend().search(keyword, limit, offset=offset, after=after)
+
+
+def search_titles_with_total(keyword: str, limit: int, offset: int = 0) -> SearchPage:
+    """Страница фильмов + общее количество (для backend-ов SQL - один запрос)."""
+    return get_keyword_backend().search_with_total(keyword, limit, offset=offset)
+
+
+def count_titles(keyword: str) -> int:
+    """Количество фильмов, в названии которых есть keyword."""
+    return get_keyword_backend().count(keyword)
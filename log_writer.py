@@ -0,0 +1,232 @@
+# log_writer.py
+"""
+Фоновая (асинхронная) запись логов поисковых запросов.
+
+Зачем:
+- раньше log_query делал insert_one прямо внутри обработки запроса,
+  и задержка MongoDB добавлялась к каждому первому поиску
+- теперь документ кладётся в ограниченную очередь в памяти,
+  а отдельный поток пишет накопленные документы пачками (insert_many)
+
+Пачка отправляется, когда:
+- набралось batch_size документов, или
+- прошло flush_interval секунд с первого документа в пачке, или
+- явно вызван flush() / stop() (например, при остановке приложения)
+
+Если очередь переполнена (MongoDB недоступна или не успевает),
+срабатывает политика drop_policy:
+- "drop_newest" - новый документ отбрасывается (поиск не ждёт)
+- "drop_oldest" - отбрасывается самый старый документ из очереди
+- "block" - ждём место в очереди не дольше block_timeout, потом отбрасываем
+"""
+
+import logging
+import os
+import queue
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+DROP_POLICIES = {"drop_newest", "drop_oldest", "block"}
+
+
+class QueryLogWriter:
+    """
+    Очередь + фоновый поток для пакетной записи документов.
+
+    write_batch - функция, принимающая список документов и записывающая их
+    (например, lambda docs: collection.insert_many(docs, ordered=False))
+    """
+
+    def __init__(
+            self,
+            write_batch,
+            max_queue: int = 10000,
+            batch_size: int = 100,
+            flush_interval: float = 1.0,
+            drop_policy: str = "drop_newest",
+            block_timeout: float = 0.1,
+    ):
+        if drop_policy not in DROP_POLICIES:
+            raise ValueError(f"Unknown drop_policy: {drop_policy}")
+
+        self._write_batch = write_batch
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.drop_policy = drop_policy
+        self.block_timeout = block_timeout
+
+        self._queue: queue.Queue = queue.Queue(maxsize=max_queue)
+        self._flush_now = threading.Event()
+        self._stopping = False
+        self._thread: threading.Thread | None = None
+        self._pid: int | None = None
+        self._start_lock = threading.Lock()
+
+        # Счётчики
+        self._enqueued = 0
+        self._written = 0
+        self._dropped = 0
+        self._failed = 0
+        self._batches = 0
+
+    # ---------- API ----------
+
+    def submit(self, doc: dict) -> bool:
+        """
+        Ставит документ в очередь на запись.
+        Возвращает False, если документ отброшен из-за переполнения.
+        """
+        self._ensure_started()
+
+        try:
+            self._queue.put_nowait(doc)
+        except queue.Full:
+            if not self._handle_full(doc):
+                self._dropped += 1
+                return False
+
+        self._enqueued += 1
+        return True
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """
+        Просит фоновый поток немедленно записать всё из очереди
+        и ждёт завершения (не дольше timeout; 0 - только попросить, не ждать).
+        Возвращает True, если очередь полностью записана.
+        """
+        if self._thread is None or not self._thread.is_alive():
+            return self._queue.unfinished_tasks == 0
+
+        self._flush_now.set()
+        deadline = time.monotonic() + timeout
+        with self._queue.all_tasks_done:
+            while self._queue.unfinished_tasks:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._queue.all_tasks_done.wait(remaining)
+        return True
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Записывает остаток очереди и останавливает фоновый поток."""
+        self._stopping = True
+        self._flush_now.set()
+        thread = self._thread
+        if thread is not None and thread.is_alive() and self._pid == os.getpid():
+            thread.join(timeout)
+            if thread.is_alive():
+                # Поток ещё пишет (MongoDB не успевает): он остановится сам, а пока
+                # он жив, submit() не должен запускать второй поток рядом с ним
+                logger.warning("Query log writer did not stop within %ss", timeout)
+                return
+        self._thread = None
+        self._stopping = False
+
+    def stats(self) -> dict:
+        """Счётчики работы (для мониторинга потерь и задержки записи)."""
+        return {
+            "queued": self._queue.qsize(),
+            "enqueued": self._enqueued,
+            "written": self._written,
+            "dropped": self._dropped,
+            "failed": self._failed,
+            "batches": self._batches,
+        }
+
+    # ---------- фоновый поток ----------
+
+    def _ensure_started(self) -> None:
+        """
+        Запускает поток при первом submit, заново - после fork()
+        и после того, как поток, не дождавшийся stop(), завершился сам.
+        """
+        if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._stopping = False
+            self._thread = threading.Thread(
+                target=self._run, name="query-log-writer", daemon=True
+            )
+            self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            batch = self._collect_batch()
+            if batch:
+                self._write(batch)
+            elif self._stopping:
+                return
+
+    def _collect_batch(self) -> list[dict]:
+        """Собирает пачку: до batch_size документов или до flush_interval."""
+        batch: list[dict] = []
+        # Ждём первый документ короткими интервалами, чтобы быстро реагировать на stop()
+        while not batch:
+            try:
+                batch.append(self._queue.get(timeout=0.1))
+            except queue.Empty:
+                if self._stopping:
+                    return batch
+
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            if self._flush_now.is_set() or self._stopping:
+                # При flush/stop забираем только то, что уже лежит в очереди
+                try:
+                    batch.append(self._queue.get_nowait())
+                    continue
+                except queue.Empty:
+                    break
+
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=min(remaining, 0.05)))
+            except queue.Empty:
+                continue
+
+        if self._queue.empty():
+            self._flush_now.clear()
+        return batch
+
+    def _write(self, batch: list[dict]) -> None:
+        try:
+            self._write_batch(batch)
+            self._written += len(batch)
+            self._batches += 1
+        except Exception:
+            self._failed += len(batch)
+            logger.exception("Failed to write %d query log documents", len(batch))
+        finally:
+            for _ in batch:
+                self._queue.task_done()
+
+    def _handle_full(self, doc: dict) -> bool:
+        """Политика при переполнении очереди. True - документ всё-таки поставлен."""
+        if self.drop_policy == "drop_oldest":
+            try:
+                self._queue.get_nowait()
+                self._queue.task_done()
+                self._dropped += 1
+            except queue.Empty:
+                pass
+            try:
+                self._queue.put_nowait(doc)
+                return True
+            except queue.Full:
+                return False
+
+        if self.drop_policy == "block":
+            try:
+                self._queue.put(doc, timeout=self.block_timeout)
+                return True
+            except queue.Full:
+                return False
+
+        return False
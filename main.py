@@ -7,15 +7,18 @@ Main module (CLI).
 """
 
 # Импортируем сценарии (потоки) - отдельные функции, которые выполняют логику пунктов меню
-from Project.flows import keyword_flow, genre_years_flow, stats_flow
+from Project.flows import keyword_flow, genre_years_flow, stats_flow, export_flow
+from Project.mysql_repo import close_pool
+from Project.mongo import close_mongo_client
 
 # Текст главного меню (многострочная строка, выводится в консоль)
 TEXT_MAIN_MENU = """
 === Movies Search ===
-Please input 1, 2, 3 or 0:
+Please input 1, 2, 3, 4 or 0:
 1: Search by keyword (title)
 2: Search by genre and years range
 3: View statistics
+4: Export search results (CSV / NDJSON)
 0: Exit
 """
 
@@ -41,7 +44,7 @@ def main() -> None:
     """
     while True:
         print(TEXT_MAIN_MENU)
-        choice = read_choice("Your choice: ", {"1", "2", "3", "0"})
+        choice = read_choice("Your choice: ", {"1", "2", "3", "4", "0"})
 
         if choice == "1":
             keyword_flow()
@@ -49,7 +52,12 @@ def main() -> None:
             genre_years_flow()
         elif choice == "3":
             stats_flow()
+        elif choice == "4":
+            export_flow()
         elif choice == "0":
+            # Освобождаем общие соединения с базами перед выходом
+            close_pool()
+            close_mongo_client()
             print("Bye!")
             return
 
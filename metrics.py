@@ -0,0 +1,277 @@
+# metrics.py
+"""
+Метрики задержек в памяти процесса и вывод в текстовом формате Prometheus.
+
+Что измеряется:
+- HTTP-запросы web_app (middleware): количество по маршруту/методу/статусу,
+  гистограмма длительности, ошибки (статус 5xx или исключение)
+- операции с базами (observe): выдача соединения из пула, каждый SQL-запрос
+  из queries.py, запись логов и статистика MongoDB
+- рендеринг шаблонов Jinja2
+- обновление каталога в памяти (refresher.py): длительность, размер дельты, отставание
+
+Включается настройкой METRICS_ENABLED. Когда она выключена, observe()
+возвращает общий пустой контекстный менеджер и ничего не считает.
+
+Используется:
+- web_app.py (middleware, /metrics, рендеринг шаблонов)
+- mysql_repo.py, mongo.py (observe вокруг запросов)
+- refresher.py (метрики обновления каталога)
+"""
+
+import threading
+import time
+from contextlib import nullcontext
+
+from Project import local_settings
+
+# Собирать ли метрики (/metrics показывает их в формате Prometheus)
+METRICS_ENABLED = getattr(local_settings, "METRICS_ENABLED", True)
+
+# Границы корзин гистограмм (секунды)
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_NOOP = nullcontext()
+
+
+def _format_labels(names: tuple, values: tuple, extra: str = "") -> str:
+    parts = []
+    for name, value in zip(names, values):
+        value = str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+        parts.append(f'{name}="{value}"')
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class Counter:
+    """Счётчик с метками (значение только растёт)."""
+
+    def __init__(self, name: str, help_text: str, labels: tuple = ()):
+        self.name = name
+        self.help = help_text
+        self.labels = labels
+        self._values: dict[tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount: float = 1.0) -> None:
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0.0) + amount
+
+    def value(self, *label_values) -> float:
+        return self._values.get(label_values, 0.0)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._values.clear()
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for values, count in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.labels, values)} {count:g}")
+        return lines
+
+
+class Gauge:
+    """
+    Текущее значение с метками (может и расти, и уменьшаться).
+    set_function(fn) - значение без меток вычисляется при выводе (например, "сколько секунд назад").
+    """
+
+    def __init__(self, name: str, help_text: str, labels: tuple = ()):
+        self.name = name
+        self.help = help_text
+        self.labels = labels
+        self._values: dict[tuple, float] = {}
+        self._function = None
+        self._lock = threading.Lock()
+
+    def set(self, value: float, *label_values) -> None:
+        with self._lock:
+            self._values[label_values] = float(value)
+
+    def set_function(self, fn) -> None:
+        self._function = fn
+
+    def value(self, *label_values) -> float:
+        if not label_values and self._function is not None:
+            return float(self._function())
+        return self._values.get(label_values, 0.0)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._values.clear()
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} gauge"]
+        if self._function is not None:
+            lines.append(f"{self.name} {float(self._function()):g}")
+        with self._lock:
+            for values, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.labels, values)} {value:g}")
+        return lines
+
+
+class Histogram:
+    """Гистограмма длительностей с метками (корзины - DEFAULT_BUCKETS)."""
+
+    def __init__(self, name: str, help_text: str, labels: tuple = (), buckets: tuple = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labels = labels
+        self.buckets = buckets
+        # метки -> [счётчики по корзинам..., сумма, количество]
+        self._values: dict[tuple, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float, *label_values) -> None:
+        with self._lock:
+            data = self._values.get(label_values)
+            if data is None:
+                data = self._values[label_values] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    data[i] += 1
+            data[-2] += seconds
+            data[-1] += 1
+
+    def count(self, *label_values) -> int:
+        data = self._values.get(label_values)
+        return data[-1] if data else 0
+
+    def reset(self) -> None:
+        with self._lock:
+            self._values.clear()
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for values, data in sorted(self._values.items()):
+                for bound, count in zip(self.buckets, data):
+                    labels = _format_labels(self.labels, values, f'le="{bound:g}"')
+                    lines.append(f"{self.name}_bucket{labels} {count}")
+                labels = _format_labels(self.labels, values, 'le="+Inf"')
+                lines.append(f"{self.name}_bucket{labels} {data[-1]}")
+                lines.append(f"{self.name}_sum{_format_labels(self.labels, values)} {data[-2]:.6f}")
+                lines.append(f"{self.name}_count{_format_labels(self.labels, values)} {data[-1]}")
+        return lines
+
+
+# -------------------------
+# Метрики приложения
+# -------------------------
+
+http_requests = Counter(
+    "http_requests_total", "HTTP requests by route, method and status.", ("route", "method", "status")
+)
+http_request_duration = Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route.", ("route",)
+)
+http_request_errors = Counter(
+    "http_request_errors_total", "HTTP requests that failed (5xx or exception).", ("route",)
+)
+db_operation_duration = Histogram(
+    "db_operation_duration_seconds", "Database operation latency (pool, SQL query, Mongo call).", ("db", "operation")
+)
+db_operation_errors = Counter(
+    "db_operation_errors_total", "Database operations that raised an error.", ("db", "operation")
+)
+template_render_duration = Histogram(
+    "template_render_duration_seconds", "Jinja2 template rendering latency.", ("template",)
+)
+
+catalog_refresh_duration = Histogram(
+    "catalog_refresh_duration_seconds", "Catalog/cache refresh duration (full reload or delta poll).", ("kind",)
+)
+catalog_refresh_rows = Counter(
+    "catalog_refresh_rows_total", "Changed rows applied by catalog refresh, by table.", ("table",)
+)
+catalog_refresh_delta = Gauge(
+    "catalog_refresh_delta_rows", "Changed rows found by the last catalog refresh, by table.", ("table",)
+)
+catalog_refresh_lag = Gauge(
+    "catalog_refresh_lag_seconds", "Seconds since the in-memory catalog was last confirmed up to date."
+)
+catalog_refresh_interval = Gauge(
+    "catalog_refresh_interval_seconds", "Configured catalog refresh poll interval."
+)
+catalog_refresh_errors = Counter(
+    "catalog_refresh_errors_total", "Catalog refreshes that failed.", ("kind",)
+)
+
+ALL_METRICS = (
+    http_requests,
+    http_request_duration,
+    http_request_errors,
+    db_operation_duration,
+    db_operation_errors,
+    template_render_duration,
+    catalog_refresh_duration,
+    catalog_refresh_rows,
+    catalog_refresh_delta,
+    catalog_refresh_lag,
+    catalog_refresh_interval,
+    catalog_refresh_errors,
+)
+
+
+class _Timer:
+    """Контекстный менеджер: длительность блока -> гистограмма, исключение -> счётчик ошибок."""
+
+    __slots__ = ("histogram", "errors", "labels", "started")
+
+    def __init__(self, histogram: Histogram, errors: Counter | None, labels: tuple):
+        self.histogram = histogram
+        self.errors = errors
+        self.labels = labels
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.histogram.observe(time.perf_counter() - self.started, *self.labels)
+        if exc_type is not None and self.errors is not None:
+            self.errors.inc(*self.labels)
+        return False
+
+
+def observe(db: str, operation: str):
+    """
+    Замер операции с базой:
+        with observe("mysql", "SEARCH_BY_KEYWORD"):
+            cursor.execute(...)
+    """
+    if not METRICS_ENABLED:
+        return _NOOP
+    return _Timer(db_operation_duration, db_operation_errors, (db, operation))
+
+
+def observe_template(name: str):
+    """Замер рендеринга шаблона."""
+    if not METRICS_ENABLED:
+        return _NOOP
+    return _Timer(template_render_duration, None, (name,))
+
+
+def record_request(route: str, method: str, status: int, seconds: float) -> None:
+    """Учитывает один HTTP-запрос (вызывается из middleware web_app)."""
+    http_requests.inc(route, method, status)
+    http_request_duration.observe(seconds, route)
+    if status >= 500:
+        http_request_errors.inc(route)
+
+
+def render_metrics() -> str:
+    """Все метрики в текстовом формате Prometheus (text/plain; version=0.0.4)."""
+    lines = []
+    for metric in ALL_METRICS:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+def reset_metrics() -> None:
+    """Обнуляет все метрики (для тестов)."""
+    for metric in ALL_METRICS:
+        metric.reset()
@@ -2,63 +2,426 @@
 """
 Модуль работы с MongoDB.
 Отвечает за:
-- подключение к MongoDB
-- запись логов поисковых запросов (log_query)
-- агрегирование статистики (top5_frequency, last5_unique)
+- подключение к MongoDB (один MongoClient на процесс)
+- запись логов поисковых запросов (log_query, в фоне - см. log_writer.py)
+- агрегирование статистики (top5_frequency, last5_unique, обе сразу - $facet)
+- счётчики запросов (отдельная коллекция, обновляется при каждом логе)
+- индексы и миграция старых строковых timestamp в BSON datetime
+
+Развёртывание (приложение остановлено - логи в это время не пишутся):
+    python -m Project.mongo migrate-timestamps
+    python -m Project.mongo rebuild-counters
+
+Без rebuild-counters статистика (STATS_SOURCE = "counters") показывает
+только запросы, сделанные после развёртывания.
 """
 
+import json
+import os
+import threading
 from datetime import datetime, timezone
-from pymongo import MongoClient
+import sys
+from pymongo import ASCENDING, DESCENDING, MongoClient, UpdateOne
+from Project import local_settings
 from Project.local_settings import MONGODB_URL_EDIT
+from Project.log_writer import QueryLogWriter
+from Project.metrics import observe
 
 DB_NAME = "ich_edit"
 COLLECTION_NAME = "final_project_010825-ptm_kateryna_dolinina"
 
+# Предагрегированные счётчики: один документ на уникальный (search_type, params)
+COUNTERS_COLLECTION_NAME = f"{COLLECTION_NAME}_counters"
+
+# Медленные SQL-запросы с планами EXPLAIN (см. profiler.py, SLOW_QUERY_TO_MONGO)
+SLOW_QUERIES_COLLECTION_NAME = f"{COLLECTION_NAME}_slow_queries"
+
+# Журнал экспортов: отдельно от лога поисков, чтобы выгрузки
+# не попадали в Top 5 / Last 5 и в прогрев кэша
+EXPORTS_COLLECTION_NAME = f"{COLLECTION_NAME}_exports"
+
+# Настройки клиента (можно переопределить в local_settings.py)
+MONGO_MAX_POOL_SIZE = getattr(local_settings, "MONGO_MAX_POOL_SIZE", 10)
+MONGO_SERVER_SELECTION_TIMEOUT_MS = getattr(local_settings, "MONGO_SERVER_SELECTION_TIMEOUT_MS", 5000)
+MONGO_CONNECT_TIMEOUT_MS = getattr(local_settings, "MONGO_CONNECT_TIMEOUT_MS", 5000)
+MONGO_SOCKET_TIMEOUT_MS = getattr(local_settings, "MONGO_SOCKET_TIMEOUT_MS", 10000)
+
+# Фоновая запись логов (False - писать синхронно, как раньше)
+QUERY_LOG_ASYNC = getattr(local_settings, "QUERY_LOG_ASYNC", True)
+QUERY_LOG_MAX_QUEUE = getattr(local_settings, "QUERY_LOG_MAX_QUEUE", 10000)
+QUERY_LOG_BATCH_SIZE = getattr(local_settings, "QUERY_LOG_BATCH_SIZE", 100)
+QUERY_LOG_FLUSH_INTERVAL = getattr(local_settings, "QUERY_LOG_FLUSH_INTERVAL", 1.0)
+QUERY_LOG_DROP_POLICY = getattr(local_settings, "QUERY_LOG_DROP_POLICY", "drop_newest")
+
+# Откуда брать статистику: "counters" (точечное чтение счётчиков по индексу)
+# или "log" (агрегация по всей коллекции логов, как раньше)
+STATS_SOURCE = getattr(local_settings, "STATS_SOURCE", "counters")
+
+# Для STATS_SOURCE == "log": Top 5 и Last 5 одним запросом ($facet)
+# вместо двух отдельных агрегаций
+STATS_FACET = getattr(local_settings, "STATS_FACET", True)
+
+# Общий клиент и кэш коллекций (создаются лениво при первом обращении).
+# MongoClient сам держит пул соединений и потокобезопасен,
+# поэтому один экземпляр на процесс - рекомендуемый способ работы.
+_client: MongoClient | None = None
+_client_pid: int | None = None
+_collections: dict[tuple[str, str], object] = {}
+_lock = threading.Lock()
+
+
+def get_mongo_client() -> MongoClient:
+    """
+    Возвращает общий MongoClient процесса.
+
+    Клиент нельзя использовать после fork() (его потоки и сокеты
+    остаются в родителе), поэтому в дочернем процессе создаём новый.
+    """
+    global _client, _client_pid
+    pid = os.getpid()
+    if _client is None or _client_pid != pid:
+        with _lock:
+            if _client is None or _client_pid != pid:
+                _client = MongoClient(
+                    MONGODB_URL_EDIT,
+                    maxPoolSize=MONGO_MAX_POOL_SIZE,
+                    serverSelectionTimeoutMS=MONGO_SERVER_SELECTION_TIMEOUT_MS,
+                    connectTimeoutMS=MONGO_CONNECT_TIMEOUT_MS,
+                    socketTimeoutMS=MONGO_SOCKET_TIMEOUT_MS,
+                    tz_aware=True,  # timestamp читаются как datetime с UTC
+                    connect=False,  # подключение - при первом запросе
+                )
+                _client_pid = pid
+                _collections.clear()
+    return _client
+
+
+def get_mongo_collection(name: str = COLLECTION_NAME):
+    """
+    Возвращает объект коллекции MongoDB
+    (по умолчанию - коллекцию с логами поисковых запросов).
+    """
+    client = get_mongo_client()
+    key = (DB_NAME, name)
+    col = _collections.get(key)
+    if col is None:
+        col = client[DB_NAME][name]
+        _collections[key] = col
+    return col
+
 
-def get_mongo_collection():
+def close_mongo_client() -> None:
     """
-    Возвращает объект коллекции MongoDB,
-    в которой хранятся логи поисковых запросов.
+    Закрывает общий клиент (вызывается при остановке приложения).
+    Перед закрытием дописываются логи, оставшиеся в очереди.
     """
-    client = MongoClient(MONGODB_URL_EDIT)
-    db = client[DB_NAME]
-    return db[COLLECTION_NAME]
+    global _client, _client_pid
+    _log_writer.stop()
+    with _lock:
+        client, pid = _client, _client_pid
+        _client, _client_pid = None, None
+        _collections.clear()
+    # Клиент, унаследованный от родительского процесса, закрывает сам родитель
+    if client is not None and pid == os.getpid():
+        client.close()
+
+
+def counter_key(search_type: str, params: dict) -> str:
+    """Ключ счётчика: тип поиска + параметры в каноническом виде (сортированный JSON)."""
+    return f"{search_type}|{json.dumps(params, sort_keys=True, ensure_ascii=False)}"
+
+
+def counter_updates(docs: list[dict]) -> list[UpdateOne]:
+    """
+    Операции обновления счётчиков для пачки логов.
+    Одинаковые запросы внутри пачки объединяются в один $inc.
+    """
+    grouped: dict[str, dict] = {}
+    for doc in docs:
+        key = counter_key(doc["search_type"], doc["params"])
+        item = grouped.get(key)
+        if item is None:
+            grouped[key] = {"count": 1, "last": doc}
+        else:
+            item["count"] += 1
+            if doc["timestamp"] >= item["last"]["timestamp"]:
+                item["last"] = doc
+
+    return [
+        UpdateOne(
+            {"_id": key},
+            {
+                "$inc": {"count": item["count"]},
+                "$max": {"timestamp": item["last"]["timestamp"]},
+                "$set": {
+                    "search_type": item["last"]["search_type"],
+                    "params": item["last"]["params"],
+                    "results_count": item["last"]["results_count"],
+                },
+            },
+            upsert=True,
+        )
+        for key, item in grouped.items()
+    ]
+
+
+def counters_collection_name(collection_name: str = COLLECTION_NAME) -> str:
+    """Коллекция счётчиков для коллекции логов collection_name."""
+    return f"{collection_name}_counters"
+
+
+def write_logs(docs: list[dict], collection_name: str = COLLECTION_NAME) -> None:
+    """
+    Записывает пачку логов одним запросом и обновляет счётчики одним bulk_write.
+    Используется фоновым писателем и загрузчиком синтетических логов (datagen.py).
+    """
+    with observe("mongo", "insert_logs"):
+        get_mongo_collection(collection_name).insert_many(docs, ordered=False)
+    with observe("mongo", "update_counters"):
+        get_mongo_collection(counters_collection_name(collection_name)).bulk_write(
+            counter_updates(docs), ordered=False
+        )
+
+
+def ensure_indexes() -> None:
+    """
+    Создаёт индексы (идемпотентно, вызывается при старте приложения).
+    Логи: timestamp - для $sort в агрегациях статистики,
+    (search_type, params, timestamp) - для выборок по конкретному запросу.
+    Счётчики: Top N - по (count, timestamp), Last N - по timestamp.
+    Медленные запросы: по timestamp (новые первыми).
+    """
+    ensure_log_indexes()
+    get_mongo_collection(SLOW_QUERIES_COLLECTION_NAME).create_index([("timestamp", DESCENDING)])
+    get_mongo_collection(EXPORTS_COLLECTION_NAME).create_index([("timestamp", DESCENDING)])
+
+
+def ensure_log_indexes(collection_name: str = COLLECTION_NAME) -> None:
+    """Индексы коллекции логов collection_name и её счётчиков (см. ensure_indexes)."""
+    logs = get_mongo_collection(collection_name)
+    logs.create_index([("timestamp", ASCENDING)])
+    logs.create_index([("search_type", ASCENDING), ("params", ASCENDING), ("timestamp", DESCENDING)])
+
+    counters = get_mongo_collection(counters_collection_name(collection_name))
+    counters.create_index([("count", DESCENDING), ("timestamp", DESCENDING)])
+    counters.create_index([("timestamp", DESCENDING)])
+
+
+def migrate_string_timestamps(batch_size: int = 1000) -> int:
+    """
+    Переводит timestamp, записанные строкой ISO (старый формат log_query),
+    в BSON datetime - в логах и в счётчиках. Идемпотентна: уже
+    преобразованные документы не трогает. Возвращает число изменённых документов.
+
+    Строки ISO с одинаковой зоной сортируются так же, как даты,
+    но BSON сравнивает строки и даты как разные типы - смешанные значения
+    ломают $sort и $max, поэтому миграция нужна до перехода на новый формат.
+    """
+    migrated = 0
+    for name in (COLLECTION_NAME, COUNTERS_COLLECTION_NAME):
+        col = get_mongo_collection(name)
+        ops = []
+        for doc in col.find({"timestamp": {"$type": "string"}}, {"timestamp": 1}):
+            ts = datetime.fromisoformat(doc["timestamp"])
+            if ts.tzinfo is None:
+                ts = ts.replace(tzinfo=timezone.utc)
+            ops.append(UpdateOne({"_id": doc["_id"]}, {"$set": {"timestamp": ts}}))
+            if len(ops) >= batch_size:
+                migrated += col.bulk_write(ops, ordered=False).modified_count
+                ops = []
+        if ops:
+            migrated += col.bulk_write(ops, ordered=False).modified_count
+    return migrated
+
+
+def rebuild_query_counters() -> int:
+    """
+    Пересчитывает коллекцию счётчиков по всем логам
+    (один раз для уже накопленных логов или после сбоя записи счётчиков).
+    Возвращает количество уникальных запросов.
+
+    Запускать с остановленным приложением: логи, записанные во время
+    пересчёта, могут не попасть в счётчики. Счётчики объединяются через
+    $max, поэтому пересчёт не уменьшает уже посчитанное.
+    """
+    pipeline = [
+        {"$sort": {"timestamp": 1}},
+        {
+            "$group": {
+                "_id": {"search_type": "$search_type", "params": "$params"},
+                "count": {"$sum": 1},
+                "search_type": {"$last": "$search_type"},
+                "params": {"$last": "$params"},
+                "results_count": {"$last": "$results_count"},
+                "timestamp": {"$max": "$timestamp"},
+            }
+        },
+    ]
+
+    ops = []
+    for row in get_mongo_collection().aggregate(pipeline, allowDiskUse=True):
+        ops.append(
+            UpdateOne(
+                {"_id": counter_key(row["search_type"], row["params"])},
+                {
+                    "$max": {"count": row["count"], "timestamp": row["timestamp"]},
+                    "$set": {
+                        "search_type": row["search_type"],
+                        "params": row["params"],
+                        "results_count": row["results_count"],
+                    },
+                },
+                upsert=True,
+            )
+        )
+
+    if ops:
+        get_mongo_collection(COUNTERS_COLLECTION_NAME).bulk_write(ops, ordered=False)
+    return len(ops)
+
+
+# Один фоновый писатель на процесс (поток стартует при первом логе)
+_log_writer = QueryLogWriter(
+    write_logs,
+    max_queue=QUERY_LOG_MAX_QUEUE,
+    batch_size=QUERY_LOG_BATCH_SIZE,
+    flush_interval=QUERY_LOG_FLUSH_INTERVAL,
+    drop_policy=QUERY_LOG_DROP_POLICY,
+)
+
+
+def flush_query_log(timeout: float = 5.0) -> bool:
+    """Принудительно дописывает логи из очереди (например, перед показом статистики)."""
+    return _log_writer.flush(timeout)
+
+
+def get_query_log_stats() -> dict:
+    """Счётчики фоновой записи логов (сколько записано / отброшено)."""
+    return _log_writer.stats()
 
 
 def log_query(search_type: str, params: dict, results_count: int) -> None:
     """
     Логирует один поисковый запрос пользователя в MongoDB.
 
+    При QUERY_LOG_ASYNC документ только ставится в очередь,
+    запись выполняется фоновым потоком пачками (insert_many).
+    Вместе с логом обновляется счётчик запроса (COUNTERS_COLLECTION_NAME).
+
     Поля документа:
-    - timestamp: время запроса в UTC (ISO format)
+    - timestamp: время запроса в UTC (BSON datetime - сортируется по индексу)
     - search_type: тип поиска ("keyword" / "genre__years_range")
     - params: параметры поиска (keyword / genre / years_range)
     - results_count: количество найденных фильмов по запросу
     (в Web-версии это total_count, в CLI может быть количество показанных результатов)
     """
-    col = get_mongo_collection()
-    col.insert_one(
-        {
-            "timestamp": datetime.now(timezone.utc).isoformat(),
-            "search_type": search_type,
-            "params": params,
-            "results_count": results_count,
-        }
-    )
+    doc = {
+        "timestamp": datetime.now(timezone.utc),
+        "search_type": search_type,
+        "params": params,
+        "results_count": results_count,
+    }
+
+    if QUERY_LOG_ASYNC:
+        _log_writer.submit(doc)
+    else:
+        write_logs([doc])
+
+
+def log_slow_query(entry: dict) -> None:
+    """Сохраняет запись о медленном SQL-запросе (вызывается из фонового потока профилировщика)."""
+    with observe("mongo", "insert_slow_query"):
+        get_mongo_collection(SLOW_QUERIES_COLLECTION_NAME).insert_one(entry)
+
+
+def log_export(params: dict, results_count: int) -> None:
+    """
+    Сохраняет запись об экспорте в EXPORTS_COLLECTION_NAME.
+    Лог поисков и счётчики статистики не затрагиваются.
+    """
+    doc = {
+        "timestamp": datetime.now(timezone.utc),
+        "params": params,
+        "results_count": results_count,
+    }
+    with observe("mongo", "insert_export"):
+        get_mongo_collection(EXPORTS_COLLECTION_NAME).insert_one(doc)
 
 
 def stats_top5_frequency():
     """
     Возвращает Top 5 запросов по частоте (самые популярные).
 
-    Логика:
+    При STATS_SOURCE == "counters" - это чтение 5 документов из коллекции
+    счётчиков по индексу (count, timestamp): стоимость не растёт вместе с логом.
+
+    Логика варианта "log":
     - группируем по (search_type + params)
     - считаем количество повторов (count)
     - сортируем по убыванию count, затем по времени
     """
-    col = get_mongo_collection()
+    return top_queries(5)
 
-    pipeline = [
+
+def top_queries(limit: int) -> list[dict]:
+    """Top N запросов (search_type, params) по частоте - для статистики и прогрева кэша."""
+    if STATS_SOURCE == "counters":
+        return top_counters(limit)
+
+    with observe("mongo", "top_frequency"):
+        return list(get_mongo_collection().aggregate(top_frequency_pipeline(limit)))
+
+
+def stats_last5_unique():
+    """
+    Возвращает 5 последних уникальных запросов (Last 5 unique).
+
+    При STATS_SOURCE == "counters" - чтение 5 счётчиков по индексу timestamp.
+
+    Логика варианта "log":
+    - сортируем по времени (новые сверху)
+    - группируем по (search_type + params) и берём первый (самый новый)
+    - снова сортируем по timestamp и ограничиваем 5
+    """
+    if STATS_SOURCE == "counters":
+        return last_counters(5)
+
+    with observe("mongo", "last_unique"):
+        return list(get_mongo_collection().aggregate(last_unique_pipeline(5)))
+
+
+def use_stats_facet() -> bool:
+    """Получать ли Top и Last одной агрегацией (иначе - два независимых запроса)."""
+    # Подконвейеры $facet не используют индексы, поэтому для счётчиков
+    # два чтения по индексу (параллельно) дешевле одного $facet
+    return STATS_SOURCE == "log" and STATS_FACET
+
+
+def stats_top_and_last(limit: int = 5) -> tuple[list[dict], list[dict]]:
+    """
+    Top N по частоте и Last N unique одним обращением к MongoDB:
+    обе агрегации выполняются как подконвейеры одного $facet.
+    """
+    with observe("mongo", "stats_facet"):
+        result = list(get_mongo_collection().aggregate(stats_facet_pipeline(limit)))
+    return result[0]["top"], result[0]["last"]
+
+
+def stats_facet_pipeline(limit: int) -> list[dict]:
+    """$facet из top_frequency_pipeline и last_unique_pipeline (используется и async-версией)."""
+    return [
+        {
+            "$facet": {
+                "top": top_frequency_pipeline(limit),
+                "last": last_unique_pipeline(limit),
+            }
+        }
+    ]
+
+
+def top_frequency_pipeline(limit: int) -> list[dict]:
+    """Агрегация Top N по частоте по коллекции логов (используется и async-версией)."""
+    return [
         # Сортировка по времени нужна, чтобы $last брал "последнюю" запись корректно
         {"$sort": {"timestamp": 1}},
         {
@@ -72,24 +435,13 @@ def stats_top5_frequency():
             }
         },
         {"$sort": {"count": -1, "timestamp": -1}},
-        {"$limit": 5},
+        {"$limit": limit},
     ]
 
-    return list(col.aggregate(pipeline))
-
-
-def stats_last5_unique():
-    """
-    Возвращает 5 последних уникальных запросов (Last 5 unique).
 
-    Логика:
-    - сортируем по времени (новые сверху)
-    - группируем по (search_type + params) и берём первый (самый новый)
-    - снова сортируем по timestamp и ограничиваем 5
-    """
-    col = get_mongo_collection()
-
-    pipeline = [
+def last_unique_pipeline(limit: int) -> list[dict]:
+    """Агрегация Last N unique по коллекции логов (используется и async-версией)."""
+    return [
         {"$sort": {"timestamp": -1}},
         {
             "$group": {
@@ -101,7 +453,52 @@ def stats_last5_unique():
             }
         },
         {"$sort": {"timestamp": -1}},
-        {"$limit": 5},
+        {"$limit": limit},
     ]
 
-    return list(col.aggregate(pipeline))
+
+# Порядок сортировки счётчиков (совпадает с индексами из ensure_indexes)
+TOP_COUNTERS_SORT = [("count", DESCENDING), ("timestamp", DESCENDING)]
+LAST_COUNTERS_SORT = [("timestamp", DESCENDING)]
+
+
+def top_counters(limit: int) -> list[dict]:
+    """Top N запросов по частоте из коллекции счётчиков."""
+    cursor = (
+        get_mongo_collection(COUNTERS_COLLECTION_NAME)
+        .find()
+        .sort(TOP_COUNTERS_SORT)
+        .limit(limit)
+    )
+    with observe("mongo", "top_counters"):
+        return list(cursor)
+
+
+def last_counters(limit: int) -> list[dict]:
+    """N последних уникальных запросов из коллекции счётчиков."""
+    cursor = (
+        get_mongo_collection(COUNTERS_COLLECTION_NAME)
+        .find({}, {"count": 0})
+        .sort(LAST_COUNTERS_SORT)
+        .limit(limit)
+    )
+    with observe("mongo", "last_counters"):
+        return list(cursor)
+
+
+def main(argv: list[str] | None = None) -> int:
+    command = sys.argv[1:] if argv is None else argv
+    if command == ["migrate-timestamps"]:
+        ensure_indexes()
+        print(f"Migrated documents: {migrate_string_timestamps()}")
+    elif command == ["rebuild-counters"]:
+        ensure_indexes()
+        print(f"Rebuilt counters: {rebuild_query_counters()}")
+    else:
+        print("Usage: python -m Project.mongo migrate-timestamps | rebuild-counters")
+        return 2
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
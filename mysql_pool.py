@@ -0,0 +1,233 @@
+# mysql_pool.py
+"""
+Пул соединений с MySQL.
+
+Зачем:
+- раньше каждый вызов get_mysql_connection() открывал новое TCP-соединение
+  и заново проходил авторизацию (на один /search/genre - три handshake)
+- теперь соединения переиспользуются всем процессом (web_app + CLI flows)
+
+Возможности пула:
+- ограниченный размер (size)
+- проверка "живости" соединения перед выдачей (health check через ping)
+- пересоздание соединения, если во время работы произошла ошибка БД
+- ожидание свободного соединения с таймаутом (wait_timeout)
+- статистика для подбора размера пула под нагрузкой (stats)
+"""
+
+import os
+import threading
+import time
+
+import mysql.connector
+
+
+class PoolTimeoutError(Exception):
+    """Не удалось получить соединение из пула за wait_timeout секунд."""
+
+
+class PooledConnection:
+    """
+    Обёртка над соединением из пула.
+
+    Поддерживает тот же сценарий использования, что и обычное соединение:
+
+        with pool.connection() as conn:
+            with conn.cursor() as cursor:
+                ...
+
+    При выходе из with соединение возвращается в пул (а не закрывается).
+    Если внутри with упала ошибка БД - соединение выбрасывается и
+    при следующем запросе будет создано новое.
+    """
+
+    def __init__(self, pool: "MySQLPool", raw):
+        self._pool = pool
+        self._raw = raw
+        self._released = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.release(broken=exc_type is not None and issubclass(exc_type, mysql.connector.Error))
+        return False
+
+    def __getattr__(self, name):
+        # cursor(), commit(), ... - всё делегируем "сырому" соединению
+        return getattr(self._raw, name)
+
+    def release(self, broken: bool = False) -> None:
+        """Возвращает соединение в пул (один раз)."""
+        if self._released:
+            return
+        self._released = True
+        self._pool.release(self._raw, broken=broken)
+
+    def close(self) -> None:
+        """Совместимость с обычным соединением: close() = вернуть в пул."""
+        self.release()
+
+
+class MySQLPool:
+    """
+    Простой потокобезопасный пул соединений.
+
+    connect - функция без аргументов, создающая новое соединение
+    size - максимальное количество одновременно открытых соединений
+    wait_timeout - сколько секунд ждать свободное соединение
+    health_check_interval - если соединение простаивало дольше, перед выдачей делаем ping
+    """
+
+    def __init__(
+            self,
+            connect,
+            size: int = 5,
+            wait_timeout: float = 10.0,
+            health_check_interval: float = 30.0,
+    ):
+        if size < 1:
+            raise ValueError("Pool size must be >= 1")
+
+        self._connect = connect
+        self.size = size
+        self.wait_timeout = wait_timeout
+        self.health_check_interval = health_check_interval
+
+        self._cond = threading.Condition()
+        self._idle: list[tuple[object, float]] = []  # (соединение, время возврата в пул)
+        self._opened = 0  # сколько соединений сейчас существует (idle + in use)
+        self._pid = os.getpid()
+
+        # Счётчики для статистики
+        self._created = 0
+        self._recycled = 0
+        self._acquired = 0
+        self._waits = 0
+        self._timeouts = 0
+        self._wait_time_total = 0.0
+
+    # ---------- выдача / возврат ----------
+
+    def connection(self) -> PooledConnection:
+        """Берёт соединение из пула (или создаёт новое, если лимит не исчерпан)."""
+        self._check_fork()
+        deadline = time.monotonic() + self.wait_timeout
+        started = time.monotonic()
+        waited = False
+
+        with self._cond:
+            while not self._idle and self._opened >= self.size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._timeouts += 1
+                    raise PoolTimeoutError(
+                        f"No free MySQL connection in {self.wait_timeout}s (pool size {self.size})"
+                    )
+                waited = True
+                self._cond.wait(remaining)
+
+            if waited:
+                self._waits += 1
+                self._wait_time_total += time.monotonic() - started
+            self._acquired += 1
+
+            if self._idle:
+                raw, idle_since = self._idle.pop()
+            else:
+                raw, idle_since = None, 0.0
+                self._opened += 1
+
+        # Сетевые операции делаем вне блокировки
+        try:
+            if raw is not None and not self._is_healthy(raw, idle_since):
+                self._close_quietly(raw)
+                raw = None
+                with self._cond:
+                    self._recycled += 1
+            if raw is None:
+                raw = self._connect()
+                with self._cond:
+                    self._created += 1
+        except Exception:
+            # Слот освобождается, чтобы пул не "усыхал" при недоступной БД
+            with self._cond:
+                self._opened -= 1
+                self._cond.notify()
+            raise
+
+        return PooledConnection(self, raw)
+
+    def release(self, raw, broken: bool = False) -> None:
+        """Возвращает соединение в пул; "сломанные" соединения закрываются."""
+        if broken:
+            self._close_quietly(raw)
+            with self._cond:
+                self._opened -= 1
+                self._recycled += 1
+                self._cond.notify()
+            return
+
+        with self._cond:
+            self._idle.append((raw, time.monotonic()))
+            self._cond.notify()
+
+    def close_all(self) -> None:
+        """Закрывает все свободные соединения (например, при остановке приложения)."""
+        with self._cond:
+            idle, self._idle = self._idle, []
+            self._opened -= len(idle)
+            self._cond.notify_all()
+        for raw, _ in idle:
+            self._close_quietly(raw)
+
+    # ---------- статистика ----------
+
+    def stats(self) -> dict:
+        """Текущее состояние пула и накопленные счётчики."""
+        with self._cond:
+            idle = len(self._idle)
+            return {
+                "size": self.size,
+                "opened": self._opened,
+                "in_use": self._opened - idle,
+                "idle": idle,
+                "created": self._created,
+                "recycled": self._recycled,
+                "acquired": self._acquired,
+                "waits": self._waits,
+                "timeouts": self._timeouts,
+                "wait_time_total": round(self._wait_time_total, 6),
+            }
+
+    # ---------- служебное ----------
+
+    def _is_healthy(self, raw, idle_since: float) -> bool:
+        """Проверяем соединение ping-ом, только если оно долго простаивало."""
+        if time.monotonic() - idle_since < self.health_check_interval:
+            return True
+        try:
+            raw.ping(reconnect=False)
+            return True
+        except Exception:
+            return False
+
+    def _check_fork(self) -> None:
+        """
+        После fork() (например, gunicorn/uvicorn workers) нельзя использовать
+        сокеты родителя - просто забываем их и начинаем с пустого пула.
+        """
+        if self._pid == os.getpid():
+            return
+        with self._cond:
+            if self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._idle = []
+                self._opened = 0
+
+    @staticmethod
+    def _close_quietly(raw) -> None:
+        try:
+            raw.close()
+        except Exception:
+            pass
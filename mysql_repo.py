@@ -2,20 +2,202 @@
 """
 MySQL repository.
 Модуль отвечает ТОЛЬКО за работу с MySQL:
-- подключение к базе
+- подключение к базе (через общий пул соединений, см. mysql_pool.py)
 - выполнение SQL-запросов
 - преобразование результатов в удобный формат
+- кэширование результатов поисковых запросов (result_cache, см. cache.py)
 """
 
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterator, NamedTuple
+
 import mysql.connector
 
-from Project import queries
+from Project import local_settings, queries
 from Project.local_settings import dbconfig
+from Project.mysql_pool import MySQLPool
+from Project.pagination import SearchPage
+from Project.cache import CachedValue, MemoryLRUBackend, ResultCache
+from Project.catalog import GenreCatalog
+from Project.metrics import observe
+from Project.profiler import SLOW_QUERY_EXPLAIN, is_slow, slow_query_log
+from Project.singleflight import SingleFlight
+
+# Настройки пула (можно переопределить в local_settings.py)
+MYSQL_POOL_SIZE = getattr(local_settings, "MYSQL_POOL_SIZE", 5)
+MYSQL_POOL_WAIT_TIMEOUT = getattr(local_settings, "MYSQL_POOL_WAIT_TIMEOUT", 10.0)
+MYSQL_POOL_HEALTH_CHECK_INTERVAL = getattr(local_settings, "MYSQL_POOL_HEALTH_CHECK_INTERVAL", 30.0)
+
+# Сколько секунд держать в памяти жанры и границы лет
+REFERENCE_CACHE_TTL = getattr(local_settings, "REFERENCE_CACHE_TTL", 300.0)
+
+# Кэш результатов поиска: "memory" (LRU в памяти процесса) или "none" (выключен)
+RESULT_CACHE_BACKEND = getattr(local_settings, "RESULT_CACHE_BACKEND", "memory")
+RESULT_CACHE_TTL = getattr(local_settings, "RESULT_CACHE_TTL", 60.0)
+RESULT_CACHE_MAX_ENTRIES = getattr(local_settings, "RESULT_CACHE_MAX_ENTRIES", 1000)
+RESULT_CACHE_MAX_BYTES = getattr(local_settings, "RESULT_CACHE_MAX_BYTES", 16 * 1024 * 1024)
+
+# Одинаковые одновременные поиски выполняются в базе один раз (singleflight.py)
+SINGLE_FLIGHT = getattr(local_settings, "SINGLE_FLIGHT", True)
+
+# Сколько строк читать из курсора за раз при потоковом чтении (iter_search_*)
+STREAM_BATCH_SIZE = getattr(local_settings, "STREAM_BATCH_SIZE", 1000)
+
+# Поиск по жанру и годам из каталога в памяти (catalog.py) вместо JOIN в MySQL
+GENRE_CATALOG = getattr(local_settings, "GENRE_CATALOG", False)
+
+# Через сколько секунд повторять построение каталога после ошибки загрузки
+GENRE_CATALOG_RETRY_INTERVAL = getattr(local_settings, "GENRE_CATALOG_RETRY_INTERVAL", 30.0)
+
+# Один пул на весь процесс (создаётся лениво при первом запросе)
+_pool: MySQLPool | None = None
+_pool_lock = threading.Lock()
+
+# Сессия потока (см. session_connection): active - сессия открыта,
+# conn - закреплённое за потоком соединение пула (берётся при первом запросе)
+_session = threading.local()
+
+
+def _connect():
+    """Открывает новое "сырое" соединение (используется пулом)."""
+    # autocommit=True: в переиспользуемом соединении не должна "висеть"
+    # открытая транзакция со старым снимком данных
+    return mysql.connector.connect(**dbconfig, autocommit=True)
+
+
+def get_pool() -> MySQLPool:
+    """Возвращает общий пул соединений процесса."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = MySQLPool(
+                    _connect,
+                    size=MYSQL_POOL_SIZE,
+                    wait_timeout=MYSQL_POOL_WAIT_TIMEOUT,
+                    health_check_interval=MYSQL_POOL_HEALTH_CHECK_INTERVAL,
+                )
+    return _pool
 
 
 def get_mysql_connection():
-    """Создаёт соединение с MySQL."""
-    return mysql.connector.connect(**dbconfig)
+    """
+    Берёт соединение из пула.
+    Используется как контекстный менеджер: при выходе из with
+    соединение возвращается в пул.
+    Внутри session_connection() - всегда одно и то же соединение сессии.
+    """
+    if getattr(_session, "active", False):
+        if _session.conn is None:
+            _session.conn = _acquire()
+        return _SessionConnection(_session.conn)
+    return _acquire()
+
+
+def _acquire():
+    # Время выдачи соединения: ожидание свободного, ping или открытие нового
+    with observe("mysql", "connection"):
+        return get_pool().connection()
+
+
+@contextmanager
+def session_connection():
+    """
+    Закрепляет за текущим потоком одно соединение пула на время with:
+    все запросы mysql_repo из этого потока идут через него, без
+    возврата в пул и повторной выдачи на каждый запрос.
+    Соединение берётся при первом запросе и возвращается в пул в конце.
+    """
+    if getattr(_session, "active", False):
+        yield  # сессия уже открыта выше по стеку
+        return
+
+    _session.active = True
+    _session.conn = None
+    try:
+        yield
+    finally:
+        conn = _session.conn
+        _session.active = False
+        _session.conn = None
+        if conn is not None:
+            conn.release()
+
+
+class _SessionConnection:
+    """
+    Соединение сессии для одного with get_mysql_connection():
+    при выходе остаётся закреплённым за потоком. После ошибки БД
+    соединение выбрасывается, следующий запрос сессии возьмёт новое.
+    """
+
+    def __init__(self, conn):
+        self._conn = conn
+
+    def __enter__(self):
+        return self._conn
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None and issubclass(exc_type, mysql.connector.Error):
+            self._conn.release(broken=True)
+            _session.conn = None
+        return False
+
+
+def get_pool_stats() -> dict:
+    """Статистика пула соединений (для подбора MYSQL_POOL_SIZE)."""
+    return get_pool().stats()
+
+
+def close_pool() -> None:
+    """Закрывает свободные соединения пула (при остановке приложения)."""
+    if _pool is not None:
+        _pool.close_all()
+
+
+# SQL-текст -> имя константы из queries.py (метка запроса в метриках)
+QUERY_NAMES = {sql: name for name, sql in vars(queries).items() if name.isupper() and isinstance(sql, str)}
+
+
+def run_query(cursor, sql: str, params: tuple | None = None) -> None:
+    """
+    Выполняет запрос из queries.py с замером времени (metrics.observe).
+    Обычный курсор возвращается из execute, когда сервер уже выполнил
+    запрос и начал отдавать результат, поэтому замер - это время запроса.
+    Медленные запросы попадают в профилировщик (profiler.py) вместе с EXPLAIN.
+    """
+    name = QUERY_NAMES.get(sql, "other")
+    started = time.perf_counter()
+    with observe("mysql", name):
+        if params is None:
+            cursor.execute(sql)
+        else:
+            cursor.execute(sql, params)
+    record_if_slow(name, sql, params, time.perf_counter() - started)
+
+
+def record_if_slow(name: str, sql: str, params, seconds: float) -> None:
+    """Записывает запрос в профилировщик, если он дольше порога (общая часть sync и async)."""
+    if is_slow(seconds):
+        slow_query_log.record(name, sql, params, seconds, explain=explain_query if SLOW_QUERY_EXPLAIN else None)
+
+
+def explain_query(sql: str, params) -> list[dict]:
+    """
+    План выполнения запроса (EXPLAIN с теми же параметрами).
+    Отдельное соединение из пула - не соединение сессии потока.
+    """
+    with get_pool().connection() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute("EXPLAIN " + sql.strip().rstrip(";"), params or ())
+            plan = fetch_all(cursor)
+    # Значения плана - в простые типы (для JSON и MongoDB)
+    return [
+        {k: v if v is None or isinstance(v, (int, float, str)) else str(v) for k, v in row.items()}
+        for row in plan
+    ]
 
 
 def fetch_all(cursor) -> list[dict]:
@@ -27,46 +209,485 @@ def fetch_all(cursor) -> list[dict]:
     return [dict(zip(cols, row)) for row in cursor.fetchall()]
 
 
-def get_genres() -> list[str]:
-    """Возвращает список жанров."""
+def iter_rows(sql: str, params: tuple, batch_size: int | None = None) -> Iterator[dict]:
+    """
+    Потоково читает результат запроса: строки приходят с сервера
+    пачками по batch_size (fetchmany) через небуферизованный курсор,
+    поэтому в памяти одновременно не больше одной пачки.
+
+    Соединение занято, пока генератор не дочитан или не закрыт.
+    Если генератор закрыли раньше (клиент прервал экспорт), соединение
+    закрывается, а не возвращается в пул: дочитывать остаток большого
+    результата (consume_results) пришлось бы до конца.
+    """
+    batch_size = batch_size or STREAM_BATCH_SIZE
+    with get_mysql_connection() as conn:
+        cursor = conn.cursor(buffered=False)
+        try:
+            run_query(cursor, sql, params)
+            cols = [d[0] for d in cursor.description]
+            while True:
+                batch = cursor.fetchmany(batch_size)
+                if not batch:
+                    break
+                for row in batch:
+                    yield dict(zip(cols, row))
+        finally:
+            if conn.unread_result:
+                _discard_connection(conn)
+            else:
+                cursor.close()
+
+
+def _discard_connection(conn) -> None:
+    """
+    Закрывает соединение вместо возврата в пул. Сокет закрывается сразу
+    (shutdown, без команды QUIT), недочитанный результат сервер отбросит сам.
+    """
+    shutdown = getattr(conn, "shutdown", None)
+    if shutdown is not None:
+        shutdown()
+    if getattr(_session, "conn", None) is conn:
+        _session.conn = None
+    conn.release(broken=True)
+
+
+def fetch_page_with_total(cursor) -> tuple[list[dict], int | None, int | None]:
+    """
+    Разбирает результат *_WITH_TOTAL запроса: убирает служебные колонки
+    total_count / total_films из строк и возвращает их отдельно.
+    Для пустой страницы total неизвестен (None).
+    """
+    return split_total(fetch_all(cursor))
+
+
+def split_total(rows: list[dict]) -> tuple[list[dict], int | None, int | None]:
+    """Отделяет total_count / total_films от строк (общая часть для sync и async)."""
+    if not rows:
+        return rows, None, None
+
+    total = int(rows[0]["total_count"])
+    total_films = int(rows[0].get("total_films", total))
+    for row in rows:
+        row.pop("total_count", None)
+        row.pop("total_films", None)
+    return rows, total, total_films
+
+
+class ReferenceData(NamedTuple):
+    """Справочные данные: жанры и границы лет (кэшируются целиком)."""
+    genres: tuple[str, ...]
+    genre_set: frozenset
+    min_year: int
+    max_year: int
+
+
+def load_reference_data() -> ReferenceData:
+    """Загружает жанры и границы лет из MySQL (одно соединение, два запроса)."""
     with get_mysql_connection() as conn:
         with conn.cursor() as cursor:
-            cursor.execute(queries.SHOW_GENRES)
-            return [row[0] for row in cursor.fetchall()]
+            run_query(cursor, queries.SHOW_GENRES)
+            genres = tuple(row[0] for row in cursor.fetchall())
+
+            run_query(cursor, queries.MIN_MAX_YEAR)
+            row = cursor.fetchone()
+
+    return ReferenceData(genres, frozenset(genres), int(row[0]), int(row[1]))
+
+
+# Справочные данные меняются редко - держим их в памяти REFERENCE_CACHE_TTL секунд
+_reference_cache = CachedValue(load_reference_data, ttl=REFERENCE_CACHE_TTL)
+
+
+def get_reference_data() -> ReferenceData:
+    """Справочные данные из кэша (без обращения к БД, пока не истёк TTL)."""
+    return _reference_cache.get()
+
+
+def invalidate_reference_cache() -> None:
+    """Сбрасывает кэш жанров и границ лет (следующий запрос перечитает их из БД)."""
+    _reference_cache.invalidate()
+
+
+def set_reference_data(value: ReferenceData) -> None:
+    """Кладёт в кэш уже загруженные справочные данные (например, после обновления каталога)."""
+    _reference_cache.set(value)
+
+
+# Кэш результатов поисковых запросов (страницы и COUNT)
+result_cache = ResultCache(
+    MemoryLRUBackend(RESULT_CACHE_MAX_ENTRIES, RESULT_CACHE_MAX_BYTES)
+    if RESULT_CACHE_BACKEND == "memory" else None,
+    ttl=RESULT_CACHE_TTL,
+    single_flight=SingleFlight() if SINGLE_FLIGHT else None,
+)
+
+
+def get_result_cache_stats() -> dict:
+    """Попадания / промахи / размер кэша результатов (+ сэкономленные одинаковые запросы)."""
+    return result_cache.stats()
+
+
+def get_genres() -> list[str]:
+    """Возвращает список жанров."""
+    return list(get_reference_data().genres)
+
+
+def get_genre_set() -> frozenset:
+    """Множество жанров - для проверки жанра за O(1)."""
+    return get_reference_data().genre_set
 
 
 def get_min_max_year() -> tuple[int, int]:
     """Минимальный и максимальный год в базе."""
+    ref = get_reference_data()
+    return ref.min_year, ref.max_year
+
+
+def iter_search_by_keyword(keyword: str, batch_size: int | None = None) -> Iterator[dict]:
+    """
+    Все фильмы, в названии которых есть keyword, потоком
+    (ORDER BY title, film_id). Результат не кэшируется.
+    """
+    return iter_rows(queries.STREAM_BY_KEYWORD, (f"%{keyword.lower()}%",), batch_size)
+
+
+@result_cache.cached("search_by_keyword")
+def search_by_keyword(
+        keyword: str,
+        limit: int,
+        offset: int = 0,
+        after: tuple | None = None
+) -> list[dict]:
+    """
+    Поиск фильмов по ключевому слову.
+    after - ключ (title, film_id) последней строки предыдущей страницы
+    (keyset-пагинация); если не задан - используется offset.
+    """
+    like_value = f"%{keyword.lower()}%"
     with get_mysql_connection() as conn:
         with conn.cursor() as cursor:
-            cursor.execute(queries.MIN_MAX_YEAR)
-            row = cursor.fetchone()
-            return int(row[0]), int(row[1])
+            if after is None:
+                run_query(cursor, queries.SEARCH_BY_KEYWORD, (like_value, limit, offset))
+            else:
+                run_query(cursor, queries.SEARCH_BY_KEYWORD_AFTER, (like_value, *after, limit))
+            return fetch_all(cursor)
 
 
-def search_by_keyword(keyword: str, limit: int, offset: int) -> list[dict]:
-    """Поиск фильмов по ключевому слову."""
+@result_cache.cached("count_by_keyword")
+def count_by_keyword(keyword: str) -> int:
+    """Общее количество фильмов по ключевому слову."""
     with get_mysql_connection() as conn:
         with conn.cursor() as cursor:
-            cursor.execute(
-                queries.SEARCH_BY_KEYWORD,
+            run_query(cursor, queries.COUNT_BY_KEYWORD, (f"%{keyword.lower()}%",))
+            return int(cursor.fetchone()[0])
+
+
+@result_cache.cached("search_by_keyword_with_total")
+def search_by_keyword_with_total(keyword: str, limit: int, offset: int = 0) -> SearchPage:
+    """Страница поиска по ключевому слову + общее количество (один запрос)."""
+    with get_mysql_connection() as conn:
+        with conn.cursor() as cursor:
+            run_query(
+                cursor,
+                queries.SEARCH_BY_KEYWORD_WITH_TOTAL,
                 (f"%{keyword.lower()}%", limit, offset),
             )
+            rows, total, _ = fetch_page_with_total(cursor)
+
+    if total is None:
+        total = count_by_keyword(keyword) if offset else 0
+    return SearchPage(rows, total, total)
+
+
+@result_cache.cached("search_by_keyword_fulltext")
+def search_by_keyword_fulltext(
+        keyword: str,
+        limit: int,
+        offset: int = 0,
+        after: tuple | None = None
+) -> list[dict]:
+    """
+    Поиск по ключевому слову через FULLTEXT-индекс (ngram) + проверка LIKE.
+    Результат совпадает с search_by_keyword.
+    """
+    phrase = f'"{keyword.lower()}"'
+    like_value = f"%{keyword.lower()}%"
+    with get_mysql_connection() as conn:
+        with conn.cursor() as cursor:
+            if after is None:
+                run_query(
+                    cursor,
+                    queries.SEARCH_BY_KEYWORD_FULLTEXT,
+                    (phrase, like_value, limit, offset),
+                )
+            else:
+                run_query(
+                    cursor,
+                    queries.SEARCH_BY_KEYWORD_FULLTEXT_AFTER,
+                    (phrase, like_value, *after, limit),
+                )
+            return fetch_all(cursor)
+
+
+@result_cache.cached("count_by_keyword_fulltext")
+def count_by_keyword_fulltext(keyword: str) -> int:
+    """Количество фильмов по ключевому слову через FULLTEXT-индекс."""
+    with get_mysql_connection() as conn:
+        with conn.cursor() as cursor:
+            run_query(
+                cursor,
+                queries.COUNT_BY_KEYWORD_FULLTEXT,
+                (f'"{keyword.lower()}"', f"%{keyword.lower()}%"),
+            )
+            return int(cursor.fetchone()[0])
+
+
+@result_cache.cached("search_by_keyword_fulltext_with_total")
+def search_by_keyword_fulltext_with_total(keyword: str, limit: int, offset: int = 0) -> SearchPage:
+    """FULLTEXT-поиск по ключевому слову + общее количество (один запрос)."""
+    with get_mysql_connection() as conn:
+        with conn.cursor() as cursor:
+            run_query(
+                cursor,
+                queries.SEARCH_BY_KEYWORD_FULLTEXT_WITH_TOTAL,
+                (f'"{keyword.lower()}"', f"%{keyword.lower()}%", limit, offset),
+            )
+            rows, total, _ = fetch_page_with_total(cursor)
+
+    if total is None:
+        total = count_by_keyword_fulltext(keyword) if offset else 0
+    return SearchPage(rows, total, total)
+
+
+def get_all_films() -> list[dict]:
+    """Все фильмы (film_id, title, release_year) в порядке ORDER BY title, film_id."""
+    with get_mysql_connection() as conn:
+        with conn.cursor() as cursor:
+            run_query(cursor, queries.ALL_FILMS_FOR_INDEX)
             return fetch_all(cursor)
 
 
+def get_film_genres() -> list[dict]:
+    """Все пары (film_id, genre) из film_category."""
+    with get_mysql_connection() as conn:
+        with conn.cursor() as cursor:
+            run_query(cursor, queries.FILM_GENRES_FOR_CATALOG)
+            return fetch_all(cursor)
+
+
+def load_catalog_data() -> tuple[list[dict], list[dict], list[str]]:
+    """Данные для каталога жанров/лет: фильмы, пары фильм-жанр, жанры (одна сессия)."""
+    with session_connection():
+        return get_all_films(), get_film_genres(), load_reference_data().genres
+
+
+def get_catalog_watermark():
+    """Самое позднее last_update в film, category и film_category (None для пустых таблиц)."""
+    with get_mysql_connection() as conn:
+        with conn.cursor() as cursor:
+            run_query(cursor, queries.CATALOG_WATERMARK)
+            return cursor.fetchone()[0]
+
+
+def count_catalog_rows_since(watermark) -> int:
+    """Сколько строк film, category и film_category изменено не раньше watermark."""
+    with get_mysql_connection() as conn:
+        with conn.cursor() as cursor:
+            run_query(cursor, queries.CATALOG_ROWS_SINCE, (watermark, watermark, watermark))
+            return cursor.fetchone()[0]
+
+
+def get_films_updated_since(watermark) -> list[dict]:
+    """Фильмы (film_id, title, release_year), изменённые не раньше watermark."""
+    with get_mysql_connection() as conn:
+        with conn.cursor() as cursor:
+            run_query(cursor, queries.FILMS_UPDATED_SINCE, (watermark,))
+            return fetch_all(cursor)
+
+
+def get_categories_updated_since(watermark) -> list[dict]:
+    """Жанры (category_id, name), изменённые не раньше watermark."""
+    with get_mysql_connection() as conn:
+        with conn.cursor() as cursor:
+            run_query(cursor, queries.CATEGORIES_UPDATED_SINCE, (watermark,))
+            return fetch_all(cursor)
+
+
+def get_film_genres_updated_since(watermark) -> list[dict]:
+    """Пары (film_id, genre) фильмов, у которых не раньше watermark менялись строки film_category."""
+    with get_mysql_connection() as conn:
+        with conn.cursor() as cursor:
+            run_query(cursor, queries.FILM_GENRES_UPDATED_SINCE, (watermark,))
+            return fetch_all(cursor)
+
+
+# Каталог жанров/лет в памяти: при GENRE_CATALOG функции поиска по жанру
+# ниже отвечают из него (см. GenreCatalog.serves), без MySQL и кэша результатов
+genre_catalog = GenreCatalog(load_catalog_data, enabled=GENRE_CATALOG, retry_interval=GENRE_CATALOG_RETRY_INTERVAL)
+
+
+def build_genre_catalog() -> None:
+    """Строит каталог заранее (при старте приложения), если он включён."""
+    if genre_catalog.enabled:
+        genre_catalog.build()
+
+
+def get_genre_catalog_stats() -> dict:
+    """Размер каталога жанров/лет (и используется ли NumPy)."""
+    return genre_catalog.stats()
+
+
+def iter_search_by_genre_years(
+        genre: str,
+        year_from: int,
+        year_to: int,
+        batch_size: int | None = None
+) -> Iterator[dict]:
+    """
+    Все фильмы жанра за диапазон лет (genre == "All" - все жанры)
+    потоком, в порядке постраничного поиска. Результат не кэшируется.
+    """
+    if genre == "All":
+        return iter_rows(queries.STREAM_BY_YEARS_ALL_GENRES, (year_from, year_to), batch_size)
+    return iter_rows(queries.STREAM_BY_GENRE_YEARS, (genre, year_from, year_to), batch_size)
+
+
+@genre_catalog.serves("search_by_genre_years")
+@result_cache.cached("search_by_genre_years")
 def search_by_genre_years(
         genre: str,
         year_from: int,
         year_to: int,
         limit: int,
-        offset: int
+        offset: int = 0,
+        after: tuple | None = None
 ) -> list[dict]:
-    """Поиск фильмов по жанру и диапазону лет."""
+    """
+    Поиск фильмов по жанру и диапазону лет.
+    after - ключ (release_year, title, film_id) последней строки предыдущей страницы.
+    """
+    with get_mysql_connection() as conn:
+        with conn.cursor() as cursor:
+            if after is None:
+                run_query(
+                    cursor,
+                    queries.SEARCH_BY_GENRE_YEARS,
+                    (genre, year_from, year_to, limit, offset),
+                )
+            else:
+                run_query(
+                    cursor,
+                    queries.SEARCH_BY_GENRE_YEARS_AFTER,
+                    (genre, year_from, year_to, *after, limit),
+                )
+            return fetch_all(cursor)
+
+
+@genre_catalog.serves("search_by_years_all_genres")
+@result_cache.cached("search_by_years_all_genres")
+def search_by_years_all_genres(
+        year_from: int,
+        year_to: int,
+        limit: int,
+        offset: int = 0,
+        after: tuple | None = None
+) -> list[dict]:
+    """
+    Поиск фильмов по диапазону лет (все жанры).
+    after - ключ (release_year, title, film_id, genre) последней строки предыдущей страницы.
+    """
+    with get_mysql_connection() as conn:
+        with conn.cursor() as cursor:
+            if after is None:
+                run_query(
+                    cursor,
+                    queries.SEARCH_BY_YEARS_ALL_GENRES,
+                    (year_from, year_to, limit, offset),
+                )
+            else:
+                run_query(
+                    cursor,
+                    queries.SEARCH_BY_YEARS_ALL_GENRES_AFTER,
+                    (year_from, year_to, *after, limit),
+                )
+            return fetch_all(cursor)
+
+
+@genre_catalog.serves("count_by_genre_years")
+@result_cache.cached("count_by_genre_years")
+def count_by_genre_years(genre: str, year_from: int, year_to: int) -> int:
+    """Общее количество фильмов по жанру и диапазону лет."""
     with get_mysql_connection() as conn:
         with conn.cursor() as cursor:
-            cursor.execute(
-                queries.SEARCH_BY_GENRE_YEARS,
+            run_query(cursor, queries.COUNT_BY_GENRE_YEARS, (genre, year_from, year_to))
+            return int(cursor.fetchone()[0])
+
+
+@genre_catalog.serves("count_by_years_all_genres")
+@result_cache.cached("count_by_years_all_genres")
+def count_by_years_all_genres(year_from: int, year_to: int) -> int:
+    """Общее количество фильмов по диапазону лет (все жанры)."""
+    with get_mysql_connection() as conn:
+        with conn.cursor() as cursor:
+            run_query(cursor, queries.COUNT_BY_YEARS_ALL_GENRES, (year_from, year_to))
+            return int(cursor.fetchone()[0])
+
+
+@genre_catalog.serves("count_rows_by_years_all_genres")
+@result_cache.cached("count_rows_by_years_all_genres")
+def count_rows_by_years_all_genres(year_from: int, year_to: int) -> int:
+    """Количество строк результата по диапазону лет (все жанры) - для страниц."""
+    with get_mysql_connection() as conn:
+        with conn.cursor() as cursor:
+            run_query(cursor, queries.COUNT_ROWS_BY_YEARS_ALL_GENRES, (year_from, year_to))
+            return int(cursor.fetchone()[0])
+
+
+@genre_catalog.serves("search_by_genre_years_with_total")
+@result_cache.cached("search_by_genre_years_with_total")
+def search_by_genre_years_with_total(
+        genre: str,
+        year_from: int,
+        year_to: int,
+        limit: int,
+        offset: int = 0
+) -> SearchPage:
+    """Страница поиска по жанру и годам + общее количество (один запрос)."""
+    with get_mysql_connection() as conn:
+        with conn.cursor() as cursor:
+            run_query(
+                cursor,
+                queries.SEARCH_BY_GENRE_YEARS_WITH_TOTAL,
                 (genre, year_from, year_to, limit, offset),
             )
-            return fetch_all(cursor)
+            rows, total, _ = fetch_page_with_total(cursor)
+
+    if total is None:
+        total = count_by_genre_years(genre, year_from, year_to) if offset else 0
+    return SearchPage(rows, total, total)
+
+
+@genre_catalog.serves("search_by_years_all_genres_with_total")
+@result_cache.cached("search_by_years_all_genres_with_total")
+def search_by_years_all_genres_with_total(
+        year_from: int,
+        year_to: int,
+        limit: int,
+        offset: int = 0
+) -> SearchPage:
+    """Страница поиска по годам (все жанры) + количество строк и фильмов (один запрос)."""
+    with get_mysql_connection() as conn:
+        with conn.cursor() as cursor:
+            run_query(
+                cursor,
+                queries.SEARCH_BY_YEARS_ALL_GENRES_WITH_TOTAL,
+                (year_from, year_to, limit, offset),
+            )
+            rows, total, total_films = fetch_page_with_total(cursor)
+
+    if total is None:
+        # Пустая страница (за концом результата): строки и фильмы считаем отдельно
+        total = count_rows_by_years_all_genres(year_from, year_to) if offset else 0
+        total_films = count_by_years_all_genres(year_from, year_to) if offset else 0
+    return SearchPage(rows, total, total_films)
@@ -0,0 +1,82 @@
+# pagination.py
+"""
+Keyset (seek) пагинация: курсоры продолжения.
+
+Курсор - это ключ сортировки последней показанной строки,
+упакованный в непрозрачную строку (base64 от JSON), которая
+передаётся в next_url как параметр cursor.
+
+Используется:
+- web_app.py (параметр cursor в /search/keyword и /search/genre)
+- mysql_repo.py / flows.py (ключ последней строки для следующей страницы)
+- mysql_repo.py, keyword_search.py, catalog.py (SearchPage - страница + общее количество)
+"""
+
+import base64
+import json
+from typing import NamedTuple
+
+# Колонки ключа сортировки для каждого вида поиска
+# (должны совпадать с ORDER BY в queries.py)
+KEY_COLUMNS = {
+    "keyword": ("title", "film_id"),
+    "genre_years": ("release_year", "title", "film_id"),
+    "years_all_genres": ("release_year", "title", "film_id", "genre"),
+}
+
+# Тип значения каждой колонки ключа (проверяется при разборе курсора)
+COLUMN_TYPES = {
+    "title": str,
+    "film_id": int,
+    "release_year": int,
+    "genre": str,
+}
+
+
+class SearchPage(NamedTuple):
+    """
+    Страница результатов вместе с общим количеством.
+    total - всего строк результата (для количества страниц),
+    total_films - уникальных фильмов (для статистики; отличается от total
+    только для "All genres", где фильм с несколькими жанрами даёт несколько строк).
+    """
+    rows: list[dict]
+    total: int
+    total_films: int
+
+
+def row_key(kind: str, row: dict) -> tuple:
+    """Ключ сортировки строки результата (для запроса следующей страницы)."""
+    return tuple(row[col] for col in KEY_COLUMNS[kind])
+
+
+def encode_cursor(kind: str, row: dict) -> str:
+    """Упаковывает ключ последней строки страницы в курсор."""
+    payload = {"k": kind, "v": list(row_key(kind, row))}
+    raw = json.dumps(payload, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(kind: str, token: str) -> tuple:
+    """
+    Распаковывает курсор обратно в ключ.
+    Бросает ValueError, если курсор повреждён или от другого вида поиска.
+    """
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        values = payload["v"]
+        token_kind = payload["k"]
+    except (ValueError, KeyError, TypeError, UnicodeError):
+        raise ValueError("Invalid cursor.") from None
+
+    if token_kind != kind or not isinstance(values, list) or len(values) != len(KEY_COLUMNS[kind]):
+        raise ValueError("Invalid cursor.")
+
+    # Значения идут в SQL и в ключ кэша: только int / str нужной колонки (bool - не int)
+    for column, value in zip(KEY_COLUMNS[kind], values):
+        expected = COLUMN_TYPES[column]
+        if not isinstance(value, expected) or isinstance(value, bool):
+            raise ValueError("Invalid cursor.")
+
+    return tuple(values)
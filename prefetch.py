@@ -0,0 +1,80 @@
+# prefetch.py
+"""
+Предзагрузка следующей страницы результатов для CLI (flows.py).
+
+Раньше следующая страница запрашивалась только после ответа "y"
+в ask_show_more(), и пользователь каждый раз ждал запрос к MySQL.
+Теперь, пока на экране страница N, страница N+1 уже загружается
+в фоновом потоке, и после "y" она обычно готова.
+
+Все страницы одного поиска загружаются в одном фоновом потоке
+внутри mysql_repo.session_connection(), то есть через одно соединение
+пула, закреплённое за поиском на всё время листания.
+"""
+
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from Project.mysql_repo import session_connection
+
+
+class PagePrefetcher:
+    """
+    Загрузка страниц в фоновом потоке с предзагрузкой следующей.
+
+    fetch_page - функция after -> rows (after - ключ последней строки
+    предыдущей страницы или None для первой страницы)
+
+    Использование:
+        with PagePrefetcher(fetch_page) as pages:
+            rows = pages.get(None)
+            pages.prefetch(row_key(kind, rows[-1]))  # пока пользователь читает
+            ...
+    """
+
+    def __init__(self, fetch_page, session=session_connection):
+        self._fetch_page = fetch_page
+        self._session = session()
+        self._executor: ThreadPoolExecutor | None = None
+        self._pending: dict[tuple | None, Future] = {}
+
+    def __enter__(self):
+        # Один поток: все запросы поиска идут последовательно через соединение сессии
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="page-prefetch")
+        self._executor.submit(self._session.__enter__).result()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+    def prefetch(self, after: tuple | None) -> None:
+        """Начинает загрузку страницы после ключа after (если ещё не начата)."""
+        if after not in self._pending:
+            self._pending[after] = self._executor.submit(self._fetch_page, after)
+
+    def get(self, after: tuple | None) -> list[dict]:
+        """
+        Страница после ключа after: предзагруженная или загруженная сейчас.
+        Ошибка загрузки пробрасывается здесь, как при обычном вызове.
+        """
+        self.prefetch(after)
+        future = self._pending.pop(after)
+
+        # Остальные предзагрузки больше не нужны
+        for other in self._pending.values():
+            other.cancel()
+        self._pending.clear()
+
+        return future.result()
+
+    def close(self) -> None:
+        """Отменяет незапущенные загрузки, закрывает сессию и останавливает поток."""
+        if self._executor is None:
+            return
+        for future in self._pending.values():
+            future.cancel()
+        self._pending.clear()
+        # Сессию закрываем в том же потоке, где она открыта (соединение - thread-local)
+        self._executor.submit(self._session.__exit__, None, None, None).result()
+        self._executor.shutdown(wait=True)
+        self._executor = None
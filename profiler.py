@@ -0,0 +1,163 @@
+# profiler.py
+"""
+Профилировщик медленных SQL-запросов.
+
+Каждый запрос из queries.py выполняется через mysql_repo.run_query,
+который замеряет время. Если запрос выполнялся дольше
+SLOW_QUERY_THRESHOLD секунд, сюда записываются:
+- имя запроса (константа из queries.py), параметры, длительность, время
+- план выполнения EXPLAIN с теми же параметрами
+- признак полного просмотра таблицы (type = ALL в плане)
+
+Записи хранятся в кольцевом буфере последних SLOW_QUERY_BUFFER_SIZE
+запросов (/stats/slow-queries) и, если включено SLOW_QUERY_TO_MONGO,
+дублируются в MongoDB (mongo.log_slow_query).
+
+EXPLAIN выполняется в фоновом потоке через отдельное соединение пула:
+соединение запроса в этот момент ещё читает результат, а пользователь
+не должен ждать лишний запрос. Чтобы при перегрузке базы (когда медленными
+становятся все запросы) профилировщик не добавлял ей работы и не занимал
+пул:
+- в очереди фонового потока не больше SLOW_QUERY_MAX_PENDING записей,
+  остальные сохраняются без плана и без отправки в sink (skipped)
+- EXPLAIN одного и того же запроса (имени из queries.py) выполняется
+  не чаще раза в SLOW_QUERY_EXPLAIN_INTERVAL секунд
+"""
+
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+from Project import local_settings
+from Project.mongo import log_slow_query
+
+logger = logging.getLogger(__name__)
+
+# Порог "медленного" запроса в секундах (0 - профилировщик выключен)
+SLOW_QUERY_THRESHOLD = getattr(local_settings, "SLOW_QUERY_THRESHOLD", 0.5)
+
+# Сколько последних медленных запросов хранить в памяти
+SLOW_QUERY_BUFFER_SIZE = getattr(local_settings, "SLOW_QUERY_BUFFER_SIZE", 100)
+
+# Выполнять ли EXPLAIN для медленных запросов
+SLOW_QUERY_EXPLAIN = getattr(local_settings, "SLOW_QUERY_EXPLAIN", True)
+
+# Дублировать ли записи в MongoDB
+SLOW_QUERY_TO_MONGO = getattr(local_settings, "SLOW_QUERY_TO_MONGO", False)
+
+# Сколько записей может ждать EXPLAIN / отправки в sink (больше - пропускаются)
+SLOW_QUERY_MAX_PENDING = getattr(local_settings, "SLOW_QUERY_MAX_PENDING", 10)
+
+# Не чаще раза в столько секунд выполнять EXPLAIN одного и того же запроса
+SLOW_QUERY_EXPLAIN_INTERVAL = getattr(local_settings, "SLOW_QUERY_EXPLAIN_INTERVAL", 60.0)
+
+
+def is_slow(seconds: float) -> bool:
+    """Превышен ли порог медленного запроса."""
+    return bool(SLOW_QUERY_THRESHOLD) and seconds >= SLOW_QUERY_THRESHOLD
+
+
+def has_full_scan(plan: list[dict]) -> bool:
+    """Есть ли в плане EXPLAIN полный просмотр таблицы (type = ALL)."""
+    return any(str(row.get("type", "")).upper() == "ALL" for row in plan)
+
+
+class SlowQueryLog:
+    """
+    Кольцевой буфер медленных запросов.
+
+    sink(entry) - куда ещё отправить готовую запись (например, в MongoDB)
+    max_pending - сколько записей может ждать фонового потока
+    explain_interval - минимальный интервал между EXPLAIN одного запроса (секунды)
+    """
+
+    def __init__(self, size: int = 100, sink=None, max_pending: int = 10, explain_interval: float = 60.0):
+        self.sink = sink
+        self.max_pending = max_pending
+        self.explain_interval = explain_interval
+        self._entries: deque = deque(maxlen=size)
+        self._lock = threading.Lock()
+        self._executor: ThreadPoolExecutor | None = None
+        self._pending = 0
+        self._explained_at: dict[str, float] = {}
+        self.recorded = 0
+        self.skipped = 0
+
+    def record(self, name: str, sql: str, params, seconds: float, explain=None) -> dict:
+        """
+        Добавляет запись; план и отправка в sink - в фоне.
+        explain(sql, params) -> строки плана EXPLAIN.
+        """
+        entry = {
+            "query": name,
+            "params": list(params) if params is not None else [],
+            "duration_ms": round(seconds * 1000, 3),
+            "timestamp": datetime.now(timezone.utc),
+            "explain": None,
+            "full_scan": None,
+        }
+        with self._lock:
+            self._entries.append(entry)
+            self.recorded += 1
+
+            if explain is not None:
+                now = time.monotonic()
+                explained_at = self._explained_at.get(name)
+                if explained_at is not None and now - explained_at < self.explain_interval:
+                    explain = None  # план этого запроса недавно уже снимали
+            if explain is None and self.sink is None:
+                return entry
+            if self._pending >= self.max_pending:
+                self.skipped += 1
+                return entry
+            if explain is not None:
+                self._explained_at[name] = now
+            self._pending += 1
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="slow-query")
+            executor = self._executor
+
+        executor.submit(self._complete, entry, sql, params, explain)
+        return entry
+
+    def _complete(self, entry: dict, sql: str, params, explain) -> None:
+        try:
+            if explain is not None:
+                plan = explain(sql, params)
+                entry["explain"] = plan
+                entry["full_scan"] = has_full_scan(plan)
+            if self.sink is not None:
+                self.sink(dict(entry))
+        except Exception:
+            logger.exception("Slow query %s was not profiled", entry["query"])
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+    def entries(self) -> list[dict]:
+        """Записи буфера, новые первыми."""
+        with self._lock:
+            return list(reversed(self._entries))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._explained_at.clear()
+
+    def wait(self) -> None:
+        """Дожидается фоновых EXPLAIN (для тестов и остановки приложения)."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+
+slow_query_log = SlowQueryLog(
+    SLOW_QUERY_BUFFER_SIZE,
+    sink=log_slow_query if SLOW_QUERY_TO_MONGO else None,
+    max_pending=SLOW_QUERY_MAX_PENDING,
+    explain_interval=SLOW_QUERY_EXPLAIN_INTERVAL,
+)
@@ -43,7 +43,7 @@ SEARCH_BY_KEYWORD = """
 SELECT film_id, title, release_year
 FROM film
 WHERE LOWER(title) LIKE %s
-ORDER BY title
+ORDER BY title, film_id
 LIMIT %s OFFSET %s;
 """
 
@@ -59,7 +59,7 @@ JOIN film_category fc ON fc.film_id = f.film_id
 JOIN category c ON c.category_id = fc.category_id
 WHERE c.name = %s
 AND f.release_year BETWEEN %s AND %s
-ORDER BY f.release_year, f.title
+ORDER BY f.release_year, f.title, f.film_id
 LIMIT %s OFFSET %s;
 """
 
@@ -75,13 +75,303 @@ FROM film f
 JOIN film_category fc ON fc.film_id = f.film_id
 JOIN category c ON c.category_id = fc.category_id
 WHERE f.release_year BETWEEN %s AND %s
-ORDER BY f.release_year, f.title
+ORDER BY f.release_year, f.title, f.film_id, c.name
 LIMIT %s OFFSET %s;
 """
 
+# --------------------------------------------------
+# Страница + общее количество за один запрос (MySQL 8+, оконные функции)
+# --------------------------------------------------
+#
+# COUNT(*) OVER() считается по всем строкам, прошедшим WHERE, ещё до LIMIT,
+# поэтому каждая строка страницы содержит total_count, и отдельный
+# COUNT-запрос с теми же JOIN и фильтрами не нужен.
+# Если страница пустая (OFFSET за концом результата), total неизвестен -
+# тогда используется обычный COUNT-запрос.
+
+SEARCH_BY_KEYWORD_WITH_TOTAL = """
+SELECT film_id, title, release_year, COUNT(*) OVER() AS total_count
+FROM film
+WHERE LOWER(title) LIKE %s
+ORDER BY title, film_id
+LIMIT %s OFFSET %s;
+"""
+
+SEARCH_BY_KEYWORD_FULLTEXT_WITH_TOTAL = """
+SELECT film_id, title, release_year, COUNT(*) OVER() AS total_count
+FROM film
+WHERE MATCH(title) AGAINST (%s IN BOOLEAN MODE)
+AND LOWER(title) LIKE %s
+ORDER BY title, film_id
+LIMIT %s OFFSET %s;
+"""
+
+# Для конкретного жанра фильм встречается один раз,
+# поэтому COUNT(*) совпадает с COUNT(DISTINCT f.film_id)
+SEARCH_BY_GENRE_YEARS_WITH_TOTAL = """
+SELECT
+    f.film_id,
+    f.title,
+    f.release_year,
+    c.name AS genre,
+    COUNT(*) OVER() AS total_count
+FROM film f
+JOIN film_category fc ON fc.film_id = f.film_id
+JOIN category c ON c.category_id = fc.category_id
+WHERE c.name = %s
+AND f.release_year BETWEEN %s AND %s
+ORDER BY f.release_year, f.title, f.film_id
+LIMIT %s OFFSET %s;
+"""
+
+# Для "All genres" фильм с несколькими жанрами даёт несколько строк:
+# total_count - строки (для количества страниц),
+# total_films - уникальные фильмы (как COUNT_BY_YEARS_ALL_GENRES, для статистики).
+# COUNT(DISTINCT ...) OVER() в MySQL не поддерживается, поэтому отмечаем
+# первую строку каждого фильма через ROW_NUMBER() и суммируем отметки.
+SEARCH_BY_YEARS_ALL_GENRES_WITH_TOTAL = """
+SELECT
+    film_id,
+    title,
+    release_year,
+    genre,
+    COUNT(*) OVER() AS total_count,
+    SUM(is_first) OVER() AS total_films
+FROM (
+    SELECT
+        f.film_id,
+        f.title,
+        f.release_year,
+        c.name AS genre,
+        ROW_NUMBER() OVER (PARTITION BY f.film_id ORDER BY c.name) = 1 AS is_first
+    FROM film f
+    JOIN film_category fc ON fc.film_id = f.film_id
+    JOIN category c ON c.category_id = fc.category_id
+    WHERE f.release_year BETWEEN %s AND %s
+) AS t
+ORDER BY release_year, title, film_id, genre
+LIMIT %s OFFSET %s;
+"""
+
+# --------------------------------------------------
+# Поисковые запросы с keyset-пагинацией (seek)
+# --------------------------------------------------
+#
+# Вместо OFFSET передаётся ключ последней показанной строки,
+# и MySQL сразу "перескакивает" к нужному месту по порядку сортировки,
+# не читая и не отбрасывая пропущенные строки.
+# Порядок тот же, что и в запросах выше; film_id (и жанр для All genres)
+# добавлены в конец как уникальный "разрыв ничьей".
+
+# Следующая страница поиска по ключевому слову после (title, film_id)
+SEARCH_BY_KEYWORD_AFTER = """
+SELECT film_id, title, release_year
+FROM film
+WHERE LOWER(title) LIKE %s
+AND (title, film_id) > (%s, %s)
+ORDER BY title, film_id
+LIMIT %s;
+"""
+
+# Следующая страница поиска по жанру и годам после (release_year, title, film_id)
+SEARCH_BY_GENRE_YEARS_AFTER = """
+SELECT
+    f.film_id,
+    f.title,
+    f.release_year,
+    c.name AS genre
+FROM film f
+JOIN film_category fc ON fc.film_id = f.film_id
+JOIN category c ON c.category_id = fc.category_id
+WHERE c.name = %s
+AND f.release_year BETWEEN %s AND %s
+AND (f.release_year, f.title, f.film_id) > (%s, %s, %s)
+ORDER BY f.release_year, f.title, f.film_id
+LIMIT %s;
+"""
+
+# Следующая страница "All genres" после (release_year, title, film_id, genre)
+# Жанр входит в ключ: фильм с несколькими жанрами даёт несколько строк
+SEARCH_BY_YEARS_ALL_GENRES_AFTER = """
+SELECT
+    f.film_id,
+    f.title,
+    f.release_year,
+    c.name AS genre
+FROM film f
+JOIN film_category fc ON fc.film_id = f.film_id
+JOIN category c ON c.category_id = fc.category_id
+WHERE f.release_year BETWEEN %s AND %s
+AND (f.release_year, f.title, f.film_id, c.name) > (%s, %s, %s, %s)
+ORDER BY f.release_year, f.title, f.film_id, c.name
+LIMIT %s;
+"""
+
+# --------------------------------------------------
+# Поиск по ключевому слову через FULLTEXT (альтернативный backend)
+# --------------------------------------------------
+#
+# Требуется FULLTEXT-индекс с ngram-парсером (создаётся один раз вручную):
+#     CREATE_TITLE_FULLTEXT_INDEX
+# MATCH ... AGAINST находит кандидатов по индексу, а LIKE повторно проверяет
+# подстроку - поэтому результат совпадает с SEARCH_BY_KEYWORD.
+# Параметры: фраза для MATCH ('"kw"'), затем те же, что у LIKE-версии.
+
+CREATE_TITLE_FULLTEXT_INDEX = """
+ALTER TABLE film ADD FULLTEXT INDEX ft_film_title_ngram (title) WITH PARSER ngram;
+"""
+
+SEARCH_BY_KEYWORD_FULLTEXT = """
+SELECT film_id, title, release_year
+FROM film
+WHERE MATCH(title) AGAINST (%s IN BOOLEAN MODE)
+AND LOWER(title) LIKE %s
+ORDER BY title, film_id
+LIMIT %s OFFSET %s;
+"""
+
+SEARCH_BY_KEYWORD_FULLTEXT_AFTER = """
+SELECT film_id, title, release_year
+FROM film
+WHERE MATCH(title) AGAINST (%s IN BOOLEAN MODE)
+AND LOWER(title) LIKE %s
+AND (title, film_id) > (%s, %s)
+ORDER BY title, film_id
+LIMIT %s;
+"""
+
+COUNT_BY_KEYWORD_FULLTEXT = """
+SELECT COUNT(*) AS cnt
+FROM film
+WHERE MATCH(title) AGAINST (%s IN BOOLEAN MODE)
+AND LOWER(title) LIKE %s;
+"""
+
+# Все фильмы в порядке сортировки поиска
+# Используется для построения in-memory индекса названий при старте
+ALL_FILMS_FOR_INDEX = """
+SELECT film_id, title, release_year
+FROM film
+ORDER BY title, film_id;
+"""
+
+# Пары (фильм, жанр) для каталога жанров/лет в памяти (catalog.py)
+FILM_GENRES_FOR_CATALOG = """
+SELECT fc.film_id, c.name AS genre
+FROM film_category fc
+JOIN category c ON c.category_id = fc.category_id;
+"""
+
+# --------------------------------------------------
+# Инкрементальное обновление каталога в памяти (refresher.py)
+# --------------------------------------------------
+#
+# Изменённые строки ищутся по last_update (в Sakila он есть во всех
+# таблицах и обновляется автоматически). Чтобы опрос не читал таблицы
+# целиком, нужны индексы (создаются один раз вручную):
+#     CREATE_FILM_LAST_UPDATE_INDEX, CREATE_FILM_CATEGORY_LAST_UPDATE_INDEX
+
+CREATE_FILM_LAST_UPDATE_INDEX = """
+ALTER TABLE film ADD INDEX idx_film_last_update (last_update);
+"""
+
+CREATE_FILM_CATEGORY_LAST_UPDATE_INDEX = """
+ALTER TABLE film_category ADD INDEX idx_film_category_last_update (last_update);
+"""
+
+# Отметка (watermark) - самое позднее изменение во всех трёх таблицах
+CATALOG_WATERMARK = """
+SELECT MAX(last_update) AS watermark
+FROM (
+    SELECT MAX(last_update) AS last_update FROM film
+    UNION ALL
+    SELECT MAX(last_update) FROM category
+    UNION ALL
+    SELECT MAX(last_update) FROM film_category
+) t;
+"""
+
+# Сколько строк изменено не раньше отметки: строки, изменённые в ту же секунду
+# уже после опроса, отметку не сдвигают, но увеличивают это число
+CATALOG_ROWS_SINCE = """
+SELECT
+    (SELECT COUNT(*) FROM film WHERE last_update >= %s)
+    + (SELECT COUNT(*) FROM category WHERE last_update >= %s)
+    + (SELECT COUNT(*) FROM film_category WHERE last_update >= %s) AS cnt;
+"""
+
+# Изменения читаются включая строки с last_update = отметке (>=):
+# повторно прочитанные строки, которые уже применены, отбрасывает refresher.py
+FILMS_UPDATED_SINCE = """
+SELECT film_id, title, release_year
+FROM film
+WHERE last_update >= %s;
+"""
+
+CATEGORIES_UPDATED_SINCE = """
+SELECT category_id, name
+FROM category
+WHERE last_update >= %s;
+"""
+
+# Все жанры фильмов, у которых менялись строки film_category
+# (полный список жанров фильма, а не только изменённые пары)
+FILM_GENRES_UPDATED_SINCE = """
+SELECT fc.film_id, c.name AS genre
+FROM film_category fc
+JOIN category c ON c.category_id = fc.category_id
+WHERE fc.film_id IN (
+    SELECT film_id FROM film_category WHERE last_update >= %s
+);
+"""
+
+# --------------------------------------------------
+# Полный результат без пагинации (потоковое чтение, экспорт)
+# --------------------------------------------------
+#
+# Те же фильтры и ORDER BY, что у постраничных запросов, но без LIMIT:
+# строки читаются из курсора пачками (см. mysql_repo.iter_search_*).
+
+STREAM_BY_KEYWORD = """
+SELECT film_id, title, release_year
+FROM film
+WHERE LOWER(title) LIKE %s
+ORDER BY title, film_id;
+"""
+
+STREAM_BY_GENRE_YEARS = """
+SELECT
+    f.film_id,
+    f.title,
+    f.release_year,
+    c.name AS genre
+FROM film f
+JOIN film_category fc ON fc.film_id = f.film_id
+JOIN category c ON c.category_id = fc.category_id
+WHERE c.name = %s
+AND f.release_year BETWEEN %s AND %s
+ORDER BY f.release_year, f.title, f.film_id;
+"""
+
+STREAM_BY_YEARS_ALL_GENRES = """
+SELECT
+    f.film_id,
+    f.title,
+    f.release_year,
+    c.name AS genre
+FROM film f
+JOIN film_category fc ON fc.film_id = f.film_id
+JOIN category c ON c.category_id = fc.category_id
+WHERE f.release_year BETWEEN %s AND %s
+ORDER BY f.release_year, f.title, f.film_id, c.name;
+"""
+
 # --------------------------------------------------
 # COUNT-запросы (для логирования статистики)
 # --------------------------------------------------
+#
+# Нужны, только если total не пришёл вместе со страницей
+# (см. *_WITH_TOTAL выше) - например, пустая страница или старая ссылка.
 
 # Общее количество фильмов по ключевому слову
 # Используется для записи results_count в MongoDB
@@ -109,4 +399,14 @@ FROM film f
 JOIN film_category fc ON fc.film_id = f.film_id
 JOIN category c ON c.category_id = fc.category_id
 WHERE f.release_year BETWEEN %s AND %s;
+"""
+
+# Количество строк результата "All genres" (фильм с двумя жанрами - две строки):
+# по нему считаются страницы, в отличие от числа фильмов для статистики
+COUNT_ROWS_BY_YEARS_ALL_GENRES = """
+SELECT COUNT(*) AS cnt
+FROM film f
+JOIN film_category fc ON fc.film_id = f.film_id
+JOIN category c ON c.category_id = fc.category_id
+WHERE f.release_year BETWEEN %s AND %s;
 """
\ No newline at end of file
@@ -0,0 +1,372 @@
+# refresher.py
+"""
+Фоновое инкрементальное обновление данных каталога в памяти.
+
+Индекс n-грамм (keyword_search), каталог жанров/лет (mysql_repo.genre_catalog),
+индекс подсказок (suggest.py), справочные данные (жанры, границы лет)
+и кэш результатов строятся по таблицам film, category и film_category.
+Раньше они обновлялись только полной перезагрузкой (при старте или
+по TTL), и на больших таблицах это дорого.
+
+CatalogRefresher держит копию этих таблиц в памяти и раз в
+CATALOG_REFRESH_INTERVAL секунд читает из MySQL только изменения:
+- отметка (watermark) - самое позднее last_update во всех трёх таблицах
+- опрос выбирает строки с last_update >= watermark (по индексам last_update,
+  см. queries.CREATE_*_LAST_UPDATE_INDEX): строки, изменённые в ту же
+  секунду уже после предыдущего опроса, отметку не сдвигают, но попадают
+  в выборку; строки, которые копия уже содержит, отбрасываются
+- если отметка и число строк с last_update >= отметке (CATALOG_ROWS_SINCE)
+  не изменились - изменений нет, строки не читаются и ничего не пересобирается
+- изменения применяются к копии; из кэша результатов удаляются только
+  результаты, которые изменённые фильмы могут затронуть (по ключевому слову,
+  жанру и году - см. cache_key_affected); переименование жанра и полная
+  перезагрузка сбрасывают кэш целиком
+
+Индекс n-грамм, каталог и индекс подсказок после изменения пересобираются
+из копии в памяти целиком (без выборки из MySQL): это неизменяемые снимки
+из отсортированных массивов, точечная правка которых стоит почти столько
+же, сколько сборка. Это сознательное упрощение: дорогая часть полного
+обновления - чтение таблиц из MySQL - при опросе не выполняется.
+
+Удаления и строки, закоммиченные позже, чем их last_update попал под отметку
+(длинные транзакции), по last_update не видны - их подбирает полная
+перезагрузка раз в CATALOG_FULL_REFRESH_INTERVAL секунд. Она же
+восстанавливает точный порядок названий из MySQL (в копии изменённые
+фильмы вставляются по приближённому ключу без учёта collation).
+
+Метрики (metrics.py): длительность обновлений, размер последней дельты
+по таблицам, отставание (секунды с последнего успешного опроса),
+интервал опроса и ошибки.
+"""
+
+import heapq
+import logging
+import os
+import threading
+import time
+
+from Project import keyword_search, local_settings, mysql_repo
+from Project.metrics import (
+    METRICS_ENABLED,
+    catalog_refresh_delta,
+    catalog_refresh_duration,
+    catalog_refresh_errors,
+    catalog_refresh_interval,
+    catalog_refresh_lag,
+    catalog_refresh_rows,
+)
+from Project.suggest import suggest_index
+
+logger = logging.getLogger(__name__)
+
+# Интервал опроса изменений (секунды); 0 - фоновое обновление выключено
+CATALOG_REFRESH_INTERVAL = getattr(local_settings, "CATALOG_REFRESH_INTERVAL", 0)
+
+# Интервал полной перезагрузки (удаления, длинные транзакции); 0 - только при старте
+CATALOG_FULL_REFRESH_INTERVAL = getattr(local_settings, "CATALOG_FULL_REFRESH_INTERVAL", 3600.0)
+
+TABLES = ("film", "category", "film_category")
+
+# Запросы кэша результатов (имена ResultCache) по тому, от чего зависит ответ;
+# результаты остальных запросов (FULLTEXT и др.) удаляются при любом изменении
+KEYWORD_QUERIES = frozenset({"search_by_keyword", "count_by_keyword", "search_by_keyword_with_total"})
+GENRE_QUERIES = frozenset({"search_by_genre_years", "count_by_genre_years", "search_by_genre_years_with_total"})
+ALL_GENRES_QUERIES = frozenset({
+    "search_by_years_all_genres",
+    "count_by_years_all_genres",
+    "count_rows_by_years_all_genres",
+    "search_by_years_all_genres_with_total",
+})
+
+
+def title_order_key(film: dict) -> tuple:
+    """Приближение ORDER BY title, film_id (collation MySQL не различает регистр)."""
+    return film["title"].casefold(), film["film_id"]
+
+
+def cache_key_affected(name: str, args: tuple, titles: set, years: set, genres: set) -> bool:
+    """
+    Может ли изменение фильмов поменять результат, закэшированный по (name, args).
+    titles - названия (в нижнем регистре), years и genres - годы и жанры
+    изменённых фильмов до и после изменения.
+    """
+    try:
+        if name in KEYWORD_QUERIES:
+            keyword = args[0].lower()
+            return keyword_search.has_like_wildcards(keyword) or any(keyword in title for title in titles)
+        if name in GENRE_QUERIES:
+            genre, year_from, year_to = args[:3]
+            return genre in genres and any(year_from <= year <= year_to for year in years)
+        if name in ALL_GENRES_QUERIES:
+            year_from, year_to = args[:2]
+            return any(year_from <= year <= year_to for year in years)
+    except (AttributeError, TypeError, ValueError):
+        pass
+    return True
+
+
+class CatalogRefresher:
+    """
+    Копия каталога в памяти + фоновый поток опроса изменений.
+
+    films - фильмы в порядке ORDER BY title, film_id,
+    film_genres - film_id -> жанры фильма, genres - жанры в порядке ORDER BY name.
+    """
+
+    def __init__(self, interval: float = CATALOG_REFRESH_INTERVAL,
+                 full_interval: float = CATALOG_FULL_REFRESH_INTERVAL):
+        self.interval = interval
+        self.full_interval = full_interval
+
+        self.films: list[dict] = []
+        self.film_genres: dict[int, list[str]] = {}
+        self.genres: list[str] = []
+        self.watermark = None
+        self._rows_since = None  # строк с last_update >= watermark при последнем опросе
+
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._pid: int | None = None
+
+        # Счётчики
+        self._last_success: float | None = None
+        self._last_full: float | None = None
+        self._last_delta = {table: 0 for table in TABLES}
+        self._refreshes = 0
+        self._full_refreshes = 0
+        self._errors = 0
+
+    # ---------- обновление ----------
+
+    def full_refresh(self) -> dict:
+        """Перечитывает таблицы целиком и пересобирает всё, что строится по ним."""
+        with self._lock:
+            started = time.perf_counter()
+            try:
+                with mysql_repo.session_connection():
+                    # Отметку читаем первой: изменения во время выборки попадут в следующий опрос
+                    watermark = mysql_repo.get_catalog_watermark()
+                    rows_since = mysql_repo.count_catalog_rows_since(watermark)
+                    films = mysql_repo.get_all_films()
+                    pairs = mysql_repo.get_film_genres()
+                    reference = mysql_repo.load_reference_data()
+            except Exception:
+                self._failed("full")
+                raise
+
+            self.films = films
+            self.film_genres = {}
+            for row in pairs:
+                self.film_genres.setdefault(row["film_id"], []).append(row["genre"])
+            self.genres = list(reference.genres)
+            self._publish(reference, films_changed=True)
+            mysql_repo.result_cache.clear()
+
+            self.watermark, self._rows_since = watermark, rows_since
+            self._last_success = self._last_full = time.monotonic()
+            self._full_refreshes += 1
+            self._observe("full", started, {"film": len(films), "category": len(self.genres),
+                                            "film_category": len(pairs)})
+            return dict(self._last_delta)
+
+    def refresh(self) -> dict:
+        """
+        Один опрос: применяет строки, изменённые не раньше отметки (ещё не применённые).
+        Возвращает размер дельты по таблицам. Без отметки (первый запуск)
+        или по истечении CATALOG_FULL_REFRESH_INTERVAL - полная перезагрузка.
+        """
+        if self.watermark is None or self._full_refresh_due():
+            return self.full_refresh()
+
+        with self._lock:
+            started = time.perf_counter()
+            try:
+                with mysql_repo.session_connection():
+                    watermark = mysql_repo.get_catalog_watermark()
+                    rows_since = mysql_repo.count_catalog_rows_since(watermark)
+                    if watermark == self.watermark and rows_since == self._rows_since:
+                        films, categories, pairs = [], [], []
+                    else:
+                        films = self._changed_films(mysql_repo.get_films_updated_since(self.watermark))
+                        categories = [
+                            row for row in mysql_repo.get_categories_updated_since(self.watermark)
+                            if row["name"] not in self.genres
+                        ]
+                        # Переименование жанра меняет пары всех его фильмов - перечитываем все пары
+                        pairs = (
+                            mysql_repo.get_film_genres() if categories
+                            else self._changed_pairs(mysql_repo.get_film_genres_updated_since(self.watermark))
+                        )
+                    reference = mysql_repo.load_reference_data() if films or categories else None
+            except Exception:
+                self._failed("incremental")
+                raise
+
+            # Названия, годы и жанры изменённых фильмов - до и после изменения
+            film_ids = {row["film_id"] for row in films}
+            changed_ids = film_ids | {row["film_id"] for row in pairs}
+            titles, years, genres = set(), set(), set()
+            self._collect_touched(changed_ids, film_ids, titles, years, genres)
+
+            if films:
+                self._apply_films(films)
+            if categories:
+                self.film_genres = {}
+            for film_id in {row["film_id"] for row in pairs}:
+                self.film_genres[film_id] = []
+            for row in pairs:
+                self.film_genres[row["film_id"]].append(row["genre"])
+
+            if films or categories or pairs:
+                if reference is not None:
+                    self.genres = list(reference.genres)
+                self._publish(reference, films_changed=bool(films))
+                if categories:
+                    mysql_repo.result_cache.clear()
+                else:
+                    self._collect_touched(changed_ids, film_ids, titles, years, genres)
+                    mysql_repo.result_cache.invalidate(
+                        lambda name, args: cache_key_affected(name, args, titles, years, genres)
+                    )
+
+            self.watermark, self._rows_since = watermark, rows_since
+            self._last_success = time.monotonic()
+            self._refreshes += 1
+            self._observe("incremental", started, {"film": len(films), "category": len(categories),
+                                                   "film_category": len(pairs)})
+            return dict(self._last_delta)
+
+    def _full_refresh_due(self) -> bool:
+        return bool(self.full_interval) and (
+            self._last_full is None or time.monotonic() - self._last_full >= self.full_interval
+        )
+
+    def _changed_films(self, rows: list[dict]) -> list[dict]:
+        """Строки film, которых ещё нет в копии (повторно прочитанные на отметке отбрасываются)."""
+        if not rows:
+            return rows
+        current = {film["film_id"]: (film["title"], film["release_year"]) for film in self.films}
+        return [row for row in rows if current.get(row["film_id"]) != (row["title"], row["release_year"])]
+
+    def _changed_pairs(self, rows: list[dict]) -> list[dict]:
+        """Пары фильмов, у которых список жанров отличается от копии."""
+        new_genres: dict[int, list[str]] = {}
+        for row in rows:
+            new_genres.setdefault(row["film_id"], []).append(row["genre"])
+        return [
+            row for row in rows
+            if sorted(new_genres[row["film_id"]]) != sorted(self.film_genres.get(row["film_id"], ()))
+        ]
+
+    def _collect_touched(self, changed_ids: set, film_ids: set, titles: set, years: set, genres: set) -> None:
+        """Добавляет годы и жанры фильмов changed_ids (и названия фильмов film_ids) из копии."""
+        if not changed_ids:
+            return
+        for film in self.films:
+            if film["film_id"] in changed_ids:
+                years.add(film["release_year"])
+                if film["film_id"] in film_ids:
+                    titles.add(film["title"].lower())
+        for film_id in changed_ids:
+            genres.update(self.film_genres.get(film_id, ()))
+
+    def _apply_films(self, changed: list[dict]) -> None:
+        """Заменяет изменённые фильмы в упорядоченном списке (слияние, без полной сортировки)."""
+        changed_ids = {row["film_id"] for row in changed}
+        kept = [film for film in self.films if film["film_id"] not in changed_ids]
+        self.films = list(heapq.merge(kept, sorted(changed, key=title_order_key), key=title_order_key))
+
+    def _publish(self, reference, films_changed: bool) -> None:
+        """Пересобирает индексы, каталог и справочные данные из копии (кэш результатов - в вызывающем)."""
+        if films_changed:
+            backend = keyword_search.get_keyword_backend()
+            if isinstance(backend, keyword_search.NgramIndexBackend):
+                backend.build(self.films)
+        if mysql_repo.genre_catalog.enabled:
+            pairs = [
+                {"film_id": film_id, "genre": genre}
+                for film_id, genres in self.film_genres.items()
+                for genre in genres
+            ]
+            mysql_repo.genre_catalog.build((self.films, pairs, self.genres))
+        if reference is not None:
+            mysql_repo.set_reference_data(reference)
+        if films_changed or reference is not None:
+            suggest_index.build(self.films, self.genres)
+
+    # ---------- метрики ----------
+
+    def _observe(self, kind: str, started: float, delta: dict) -> None:
+        self._last_delta = delta
+        if not METRICS_ENABLED:
+            return
+        catalog_refresh_duration.observe(time.perf_counter() - started, kind)
+        for table, rows in delta.items():
+            catalog_refresh_delta.set(rows, table)
+            if kind == "incremental":
+                catalog_refresh_rows.inc(table, amount=rows)
+
+    def _failed(self, kind: str) -> None:
+        self._errors += 1
+        if METRICS_ENABLED:
+            catalog_refresh_errors.inc(kind)
+
+    def lag_seconds(self) -> float:
+        """Секунды с последнего успешного обновления (0 - ещё не обновлялся)."""
+        if self._last_success is None:
+            return 0.0
+        return time.monotonic() - self._last_success
+
+    def stats(self) -> dict:
+        return {
+            "interval": self.interval,
+            "full_interval": self.full_interval,
+            "running": self._thread is not None and self._thread.is_alive(),
+            "watermark": str(self.watermark) if self.watermark is not None else None,
+            "films": len(self.films),
+            "lag_seconds": round(self.lag_seconds(), 3),
+            "last_delta": dict(self._last_delta),
+            "refreshes": self._refreshes,
+            "full_refreshes": self._full_refreshes,
+            "errors": self._errors,
+        }
+
+    # ---------- фоновый поток ----------
+
+    def start(self) -> None:
+        """Запускает опрос раз в interval секунд (ничего не делает, если interval = 0)."""
+        if not self.interval or (self._thread is not None and self._pid == os.getpid()):
+            return
+        if METRICS_ENABLED:
+            catalog_refresh_interval.set(self.interval)
+            catalog_refresh_lag.set_function(self.lag_seconds)
+        self._stop.clear()
+        self._pid = os.getpid()
+        self._thread = threading.Thread(target=self._run, name="catalog-refresher", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Останавливает фоновый поток (текущий опрос доработает до конца)."""
+        self._stop.set()
+        thread = self._thread
+        if thread is not None and thread.is_alive() and self._pid == os.getpid():
+            thread.join(timeout)
+        self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self.refresh()
+            except Exception:
+                # Данные остаются прежними до следующего успешного опроса
+                logger.exception("Catalog refresh failed")
+
+
+# Обновление каталога процесса (web_app запускает его при старте, если включено)
+catalog_refresher = CatalogRefresher()
+
+
+def get_refresh_stats() -> dict:
+    """Состояние фонового обновления каталога (отметка, дельта, отставание)."""
+    return catalog_refresher.stats()
@@ -0,0 +1,153 @@
+# singleflight.py
+"""
+Объединение одинаковых одновременных запросов (single-flight).
+
+Когда популярный поиск открывают много пользователей сразу, все запросы
+промахиваются мимо кэша результатов одновременно, и каждый выполняет одни
+и те же запросы страницы и COUNT в MySQL. SingleFlight пропускает в базу
+только первый вызов с данным ключом ("ведущий"); остальные, пришедшие,
+пока он выполняется, ждут и получают его результат (или его исключение).
+
+- do(key, fn) - для sync-функций (потоки, mysql_repo)
+- do_async(key, fn) - для async-функций (async_repo), в пределах event loop
+
+Статистика по ключам: сколько раз запрос реально выполнялся и сколько
+повторных выполнений сэкономлено. Хранится для последних max_keys ключей.
+
+Подключается к ResultCache (cache.py): объединяются вызовы при промахе кэша.
+"""
+
+import asyncio
+import functools
+import threading
+from collections import OrderedDict
+
+
+class _Call:
+    """Выполняющийся вызов: ведущий заполняет value / error, остальные ждут done."""
+
+    __slots__ = ("done", "value", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error: BaseException | None = None
+
+
+def format_key(key) -> str:
+    """Ключ ResultCache (name, args, kwargs) в читаемом виде: name(arg, ..., k=v)."""
+    if isinstance(key, tuple) and len(key) == 3 and isinstance(key[0], str):
+        name, args, kwargs = key
+        parts = [repr(a) for a in args] + [f"{k}={v!r}" for k, v in kwargs]
+        return f"{name}({', '.join(parts)})"
+    return repr(key)
+
+
+class SingleFlight:
+    """Один вызов на ключ в каждый момент времени + счётчики по ключам."""
+
+    def __init__(self, max_keys: int = 1000):
+        self.max_keys = max_keys
+        self._calls: dict = {}
+        self._async_calls: dict = {}
+        self._lock = threading.Lock()
+
+        # key -> [выполнений, сэкономлено]
+        self._per_key: OrderedDict = OrderedDict()
+        self.executions = 0
+        self.coalesced = 0
+
+    # ---------- выполнение ----------
+
+    def do(self, key, fn):
+        """Результат fn(); одновременные вызовы с тем же key ждут первый."""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            self._count(key, leader)
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.value
+
+        try:
+            call.value = fn()
+        except BaseException as exc:
+            call.error = exc
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.value
+
+    async def do_async(self, key, fn):
+        """
+        То же для корутин: fn() - async-функция без аргументов.
+        Общий вызов идёт отдельной задачей, которую все вызывающие ждут через
+        shield: отмена одного из них (клиент отключился, таймаут) не отменяет
+        вызов для остальных, а результат всё равно попадёт в кэш.
+        """
+        loop = asyncio.get_running_loop()
+        flight_key = (id(loop), key)
+
+        task = self._async_calls.get(flight_key)
+        leader = task is None
+        if leader:
+            task = asyncio.ensure_future(fn())
+            self._async_calls[flight_key] = task
+            task.add_done_callback(functools.partial(self._async_done, flight_key))
+        with self._lock:
+            self._count(key, leader)
+        return await asyncio.shield(task)
+
+    def _async_done(self, flight_key, task: asyncio.Task) -> None:
+        if self._async_calls.get(flight_key) is task:
+            del self._async_calls[flight_key]
+        if not task.cancelled():
+            task.exception()  # ожидающих может не остаться - не предупреждать о "never retrieved"
+
+    # ---------- статистика ----------
+
+    def _count(self, key, leader: bool) -> None:
+        """Вызывается под self._lock."""
+        counts = self._per_key.pop(key, None) or [0, 0]
+        if leader:
+            counts[0] += 1
+            self.executions += 1
+        else:
+            counts[1] += 1
+            self.coalesced += 1
+        self._per_key[key] = counts
+        while len(self._per_key) > self.max_keys:
+            self._per_key.popitem(last=False)
+
+    def key_stats(self, key) -> dict:
+        with self._lock:
+            executions, coalesced = self._per_key.get(key, (0, 0))
+        return {"executions": executions, "coalesced": coalesced}
+
+    def stats(self, top: int = 10) -> dict:
+        """Итоги + ключи, для которых сэкономлено больше всего выполнений."""
+        with self._lock:
+            items = sorted(self._per_key.items(), key=lambda item: item[1][1], reverse=True)[:top]
+            return {
+                "in_flight": len(self._calls) + len(self._async_calls),
+                "executions": self.executions,
+                "coalesced": self.coalesced,
+                "top_keys": [
+                    {"key": format_key(key), "executions": executions, "coalesced": coalesced}
+                    for key, (executions, coalesced) in items
+                    if coalesced
+                ],
+            }
+
+    def reset(self) -> None:
+        with self._lock:
+            self._per_key.clear()
+            self.executions = 0
+            self.coalesced = 0
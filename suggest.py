@@ -0,0 +1,180 @@
+# suggest.py
+"""
+Подсказки при вводе (typeahead) по названиям фильмов и жанрам.
+
+Раньше ключевое слово вводилось вслепую: поиск без результатов всё равно
+стоил запроса страницы, количества и записи в лог. /api/suggest?prefix=
+отвечает из индекса в памяти, без обращения к базам.
+
+Индекс - отсортированный массив ключей (без дерева):
+- для каждого слова названия ключ - остаток названия с начала этого слова
+  в нижнем регистре ("ACADEMY DINOSAUR" -> "academy dinosaur", "dinosaur"),
+  поэтому префикс находит название и по первому, и по следующим словам
+- поиск - bisect до первого ключа >= prefix и проход вперёд, пока ключи
+  начинаются с prefix; проход ограничен limit найденными фильмами, так что
+  время не зависит от размера каталога
+- порядок: жанры (их немного, простой проход), затем названия, которые
+  начинаются с prefix, затем совпадения по следующим словам
+
+Снимок неизменяемый и заменяется целиком: при каждом обновлении каталога
+(refresher.py), а без фонового обновления (CATALOG_REFRESH_INTERVAL = 0) -
+когда снимок, загруженный из MySQL, старше SUGGEST_INDEX_TTL секунд.
+Пока один запрос перестраивает устаревший снимок, остальные отвечают
+по старому.
+"""
+
+import logging
+import re
+import threading
+import time
+from bisect import bisect_left
+
+from Project import local_settings
+from Project.mysql_repo import REFERENCE_CACHE_TTL, get_all_films, get_genres
+
+logger = logging.getLogger(__name__)
+
+# Сколько подсказок отдавать по умолчанию и максимум (параметр limit)
+SUGGEST_LIMIT = getattr(local_settings, "SUGGEST_LIMIT", 10)
+SUGGEST_MAX_LIMIT = 50
+
+# Сколько секунд живёт индекс, загруженный из MySQL (0 - не устаревает).
+# Индекс, собранный CatalogRefresher, не устаревает - его обновляет сам refresher
+SUGGEST_INDEX_TTL = getattr(local_settings, "SUGGEST_INDEX_TTL", REFERENCE_CACHE_TTL)
+
+WORD = re.compile(r"\S+")
+
+
+class SuggestSnapshot:
+    """
+    Неизменяемый индекс подсказок.
+    films - строки с title в порядке ORDER BY title, film_id; genres - список жанров.
+    """
+
+    def __init__(self, films: list[dict], genres):
+        self.titles = [film["title"] for film in films]
+        self.genres = list(genres)
+        self._genre_keys = [genre.casefold() for genre in self.genres]
+
+        # Начала названий и начала остальных слов - отдельно:
+        # названия, которые начинаются с префикса, показываются первыми
+        starts, words = [], []
+        for pos, title in enumerate(self.titles):
+            lowered = title.casefold()
+            for word in WORD.finditer(lowered):
+                (words if word.start() else starts).append((lowered[word.start():], pos))
+        self.columns = [self._column(starts), self._column(words)]
+        self.keys_count = len(starts) + len(words)
+
+    @staticmethod
+    def _column(entries: list[tuple]) -> tuple[list[str], list[int]]:
+        entries.sort()
+        return [key for key, _ in entries], [pos for _, pos in entries]
+
+    def suggest(self, prefix: str, limit: int) -> list[dict]:
+        prefix = prefix.strip().casefold()
+        if not prefix or limit <= 0:
+            return []
+
+        result = [
+            {"value": genre, "kind": "genre"}
+            for genre, key in zip(self.genres, self._genre_keys)
+            if key.startswith(prefix)
+        ][:limit]
+
+        seen = set()
+        for keys, positions in self.columns:
+            i = bisect_left(keys, prefix)
+            while len(result) < limit and i < len(keys) and keys[i].startswith(prefix):
+                pos = positions[i]
+                if pos not in seen:
+                    seen.add(pos)
+                    result.append({"value": self.titles[pos], "kind": "title"})
+                i += 1
+        return result
+
+
+class SuggestIndex:
+    """
+    Индекс подсказок процесса: снимок + загрузка из MySQL при первом обращении
+    и после истечения ttl (если снимок загружен самим индексом).
+    """
+
+    def __init__(self, load_films=get_all_films, load_genres=get_genres, ttl: float = SUGGEST_INDEX_TTL):
+        self._load_films = load_films
+        self._load_genres = load_genres
+        self.ttl = ttl
+        self._snapshot: SuggestSnapshot | None = None
+        self._expires_at: float | None = None
+        self._lock = threading.Lock()
+
+    def build(self, films: list[dict] | None = None, genres=None) -> None:
+        """
+        (Пере)строит индекс; если данные не переданы - загружает их,
+        и такой снимок устаревает через ttl. Снимок из переданных данных
+        не устаревает: их источник (CatalogRefresher) обновляет его сам.
+        """
+        loaded = films is None or genres is None
+        if films is None:
+            films = self._load_films()
+        if genres is None:
+            genres = self._load_genres()
+        self._snapshot = SuggestSnapshot(films, genres)
+        self._expires_at = time.monotonic() + self.ttl if loaded and self.ttl else None
+
+    @property
+    def built(self) -> bool:
+        return self._snapshot is not None
+
+    @property
+    def fresh(self) -> bool:
+        """Снимок есть и не устарел - подсказки отдаются без обращения к MySQL."""
+        expires_at = self._expires_at
+        return self._snapshot is not None and (expires_at is None or time.monotonic() < expires_at)
+
+    def snapshot(self) -> SuggestSnapshot:
+        snapshot = self._snapshot
+        if snapshot is None:
+            with self._lock:
+                if self._snapshot is None:
+                    self.build()
+                snapshot = self._snapshot
+        elif not self.fresh and self._lock.acquire(blocking=False):
+            # Устаревший снимок перестраивает один запрос, остальные отвечают по старому
+            try:
+                if not self.fresh:
+                    self.build()
+            except Exception:
+                # MySQL недоступна - старый снимок служит ещё ttl секунд
+                self._expires_at = time.monotonic() + self.ttl
+                logger.warning("Suggest index was not rebuilt, next attempt in %ss", self.ttl, exc_info=True)
+            finally:
+                self._lock.release()
+            snapshot = self._snapshot
+        return snapshot
+
+    def suggest(self, prefix: str, limit: int = SUGGEST_LIMIT) -> list[dict]:
+        """До limit подсказок (жанры, затем названия), начинающихся с prefix."""
+        return self.snapshot().suggest(prefix, min(limit, SUGGEST_MAX_LIMIT))
+
+    def clear(self) -> None:
+        self._snapshot = None
+        self._expires_at = None
+
+    def stats(self) -> dict:
+        snapshot = self._snapshot
+        return {
+            "built": snapshot is not None,
+            "fresh": self.fresh,
+            "titles": len(snapshot.titles) if snapshot else 0,
+            "keys": snapshot.keys_count if snapshot else 0,
+            "genres": len(snapshot.genres) if snapshot else 0,
+        }
+
+
+suggest_index = SuggestIndex()
+
+
+def build_suggest_index() -> None:
+    """Строит индекс подсказок заранее (при старте приложения)."""
+    suggest_index.build()
@@ -0,0 +1,31 @@
+"""
+Тесты async_repo.py без реальных баз данных:
+fetch_all подменяется async-заглушкой.
+"""
+
+import asyncio
+
+from Project import async_repo, mysql_repo
+
+
+def test_async_search_shares_result_cache_with_sync(monkeypatch):
+    """Async-запрос кэшируется под тем же ключом, что и sync-версия."""
+    calls = []
+
+    async def fake_fetch_all(sql, params=()):
+        calls.append(params)
+        return [{"film_id": 1, "title": "A", "release_year": 2006, "total_count": 1}]
+
+    monkeypatch.setattr(async_repo, "fetch_all", fake_fetch_all)
+    mysql_repo.result_cache.clear()
+
+    page = asyncio.run(async_repo.search_by_genre_years_with_total("Action", 2000, 2010, 10, offset=0))
+    assert page.rows == [{"film_id": 1, "title": "A", "release_year": 2006}]
+    assert page.total == 1
+
+    # sync-функция берёт результат из кэша - в MySQL не идёт
+    monkeypatch.setattr(mysql_repo, "get_mysql_connection", lambda: (_ for _ in ()).throw(AssertionError))
+    assert mysql_repo.search_by_genre_years_with_total("Action", 2000, 2010, 10, offset=0).total == 1
+    assert len(calls) == 1
+
+    mysql_repo.result_cache.clear()
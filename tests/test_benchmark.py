@@ -0,0 +1,69 @@
+"""
+Тесты бенчмарка (benchmark.py).
+
+Набор сценариев прогоняется на крошечной фикстуре (несколько замеров),
+чтобы бенчмарк не ломался вместе с кодом, который он замеряет.
+Отдельно проверяются перцентили и сравнение с прошлым запуском.
+"""
+
+from Project import benchmark, mongo, mysql_repo
+
+
+def test_run_suite_small_fixture():
+    """Все сценарии выполняются на SQLite + mongomock, у каждого есть ops/s и p50/p95/p99."""
+    pool = mysql_repo._pool
+    get_collection = mongo.get_mongo_collection
+
+    results = benchmark.run_suite(films=60, logs=30, iterations=2, warmup=1)
+
+    assert set(results) == {s.name for s in benchmark.build_scenarios(None)}
+    for r in results.values():
+        assert r["ops_per_sec"] > 0
+        assert r["p50_ms"] <= r["p95_ms"] <= r["p99_ms"]
+
+    # Заменители убраны после прогона
+    assert mysql_repo._pool is pool
+    assert mongo.get_mongo_collection is get_collection
+
+
+def test_sqlite_fixture_matches_repo_queries():
+    """Запросы mysql_repo (оконные функции, keyset) работают на SQLite-фикстуре."""
+    with benchmark.stand_ins(films=80, logs=0):
+        page = mysql_repo.search_by_years_all_genres_with_total(1990, 2025, 10, 0)
+        assert len(page.rows) == 10
+        assert page.total_films == 80
+        assert page.total >= page.total_films
+
+        first = mysql_repo.search_by_years_all_genres(1990, 2025, 5)
+        last = first[-1]
+        after = (last["release_year"], last["title"], last["film_id"], last["genre"])
+        second = mysql_repo.search_by_years_all_genres(1990, 2025, 5, after=after)
+        assert page.rows[5:10] == second
+
+
+def test_percentile_nearest_rank():
+    values = [float(v) for v in range(1, 101)]
+    assert benchmark.percentile(values, 50) == 50.0
+    assert benchmark.percentile(values, 95) == 95.0
+    assert benchmark.percentile(values, 99) == 99.0
+    assert benchmark.percentile([7.0], 99) == 7.0
+    assert benchmark.percentile([], 50) == 0.0
+
+
+def test_compare_results_flags_p95_regression(tmp_path):
+    """Рост p95 выше порога - регрессия; базовый запуск ищется по тем же параметрам."""
+    old = {"a": {"ops_per_sec": 100.0, "p50_ms": 1.0, "p95_ms": 2.0, "p99_ms": 3.0}}
+    new = {"a": {"ops_per_sec": 50.0, "p50_ms": 1.0, "p95_ms": 3.0, "p99_ms": 4.0}}
+
+    path = str(tmp_path / "history.jsonl")
+    benchmark.save_run({"commit": "abc", "config": {"films": 10}, "results": old}, path)
+    benchmark.save_run({"commit": "def", "config": {"films": 99}, "results": new}, path)
+
+    baseline = benchmark.find_baseline(benchmark.load_history(path), {"films": 10})
+    assert baseline["commit"] == "abc"
+
+    diff = benchmark.compare_results(new, baseline["results"], threshold=0.25)
+    assert diff["a"]["p95"] == 0.5
+    assert diff["a"]["ops_per_sec"] == -0.5
+    assert diff["a"]["regression"] is True
+    assert "REGRESSION" in benchmark.format_report(new, diff, "abc")
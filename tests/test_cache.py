@@ -0,0 +1,147 @@
+"""
+Unit-тесты для кэшей в памяти (cache.py).
+
+Цель тестов:
+- проверить, что значение загружается один раз и берётся из кэша
+- проверить истечение TTL и ручную инвалидацию
+"""
+
+import time
+
+from Project.cache import CachedValue
+
+
+def test_value_is_loaded_once():
+    """Повторные get() в пределах TTL не вызывают loader."""
+    calls = []
+    cached = CachedValue(lambda: calls.append(1) or ["Action", "Comedy"], ttl=60)
+
+    assert cached.get() == ["Action", "Comedy"]
+    assert cached.get() == ["Action", "Comedy"]
+    assert len(calls) == 1
+    assert cached.stats()["hits"] == 1
+
+
+def test_ttl_expiry():
+    """После истечения TTL значение загружается заново."""
+    calls = []
+    cached = CachedValue(lambda: calls.append(1) or len(calls), ttl=0.01)
+
+    cached.get()
+    time.sleep(0.02)
+
+    assert cached.get() == 2
+
+
+def test_invalidate():
+    """invalidate() заставляет перечитать значение."""
+    calls = []
+    cached = CachedValue(lambda: calls.append(1) or len(calls), ttl=60)
+
+    cached.get()
+    cached.invalidate()
+
+    assert cached.get() == 2
+
+
+def test_result_cache_hits_and_misses():
+    """Повторный запрос с теми же параметрами берётся из кэша."""
+    from Project.cache import MemoryLRUBackend, ResultCache
+
+    cache = ResultCache(MemoryLRUBackend(), ttl=60)
+    calls = []
+
+    @cache.cached("search")
+    def search(keyword, limit, offset=0):
+        calls.append(keyword)
+        return [{"title": keyword.upper()}]
+
+    assert search("academy", 10, offset=0) == [{"title": "ACADEMY"}]
+    assert search("academy", 10, offset=0) == [{"title": "ACADEMY"}]
+    assert search("academy", 10, offset=10) == [{"title": "ACADEMY"}]
+
+    assert calls == ["academy", "academy"]
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 2
+
+
+def test_result_cache_returns_copies():
+    """Изменение полученных строк не портит значение в кэше."""
+    from Project.cache import MemoryLRUBackend, ResultCache
+
+    cache = ResultCache(MemoryLRUBackend(), ttl=60)
+
+    @cache.cached("search")
+    def search():
+        return [{"title": "A"}]
+
+    search()[0]["title"] = "changed"
+
+    assert search() == [{"title": "A"}]
+
+
+def test_lru_eviction_by_entries_and_bytes():
+    """При превышении лимитов вытесняются давно не использованные ключи."""
+    from Project.cache import MISSING, MemoryLRUBackend
+
+    backend = MemoryLRUBackend(max_entries=2)
+    backend.set("a", 1, ttl=60)
+    backend.set("b", 2, ttl=60)
+    backend.get("a")  # "a" становится самым свежим
+    backend.set("c", 3, ttl=60)
+
+    assert backend.get("b") is MISSING
+    assert backend.get("a") == 1
+    assert backend.stats()["evictions"] == 1
+
+    small = MemoryLRUBackend(max_bytes=1000)
+    small.set("big", "x" * 5000, ttl=60)
+    assert small.get("big") is MISSING
+
+
+def test_result_cache_invalidate_by_predicate():
+    """invalidate удаляет только ключи, для которых условие истинно."""
+    from Project.cache import MemoryLRUBackend, ResultCache
+
+    backend = MemoryLRUBackend()
+    cache = ResultCache(backend, ttl=60)
+
+    @cache.cached("count")
+    def count(genre):
+        return genre
+
+    count("Action")
+    count("Drama")
+
+    assert cache.invalidate(lambda name, args: args == ("Action",)) == 1
+    assert backend.stats()["entries"] == 1
+    assert count("Drama") == "Drama" and cache.hits == 1
+
+
+def test_result_cache_key_ignores_argument_style():
+    """f(x, 10), f(x, 10, 0) и f(x, 10, offset=0) - один и тот же ключ."""
+    from Project.cache import MemoryLRUBackend, ResultCache
+
+    cache = ResultCache(MemoryLRUBackend(), ttl=60)
+    calls = []
+
+    @cache.cached("search")
+    def search(keyword, limit, offset=0):
+        calls.append(offset)
+        return [keyword]
+
+    search("academy", 10)
+    search("academy", 10, 0)
+    search("academy", 10, offset=0)
+    search(keyword="academy", limit=10)
+
+    assert calls == [0]
+    assert cache.hits == 3
+
+
+def test_cache_backend_is_abstract():
+    import pytest
+    from Project.cache import CacheBackend
+
+    with pytest.raises(TypeError):
+        CacheBackend()
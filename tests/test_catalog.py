@@ -0,0 +1,151 @@
+"""
+Тесты каталога жанров/лет в памяти (catalog.py).
+
+Главное требование - результат совпадает с SQL-версией. Поэтому ответы
+каталога сравниваются с запросами mysql_repo на SQLite-фикстуре Sakila
+(из benchmark.py): страницы по OFFSET, цепочки keyset-страниц, COUNT и
+страницы с total для конкретного жанра и для "All genres".
+"""
+
+import asyncio
+import threading
+
+import pytest
+from Project import benchmark, mysql_repo
+from Project.catalog import CatalogSnapshot, GenreCatalog
+from Project.pagination import row_key
+
+RANGES = [(1990, 2025), (2000, 2010), (2015, 2015), (2030, 2040)]
+
+
+@pytest.fixture
+def sakila():
+    """SQLite-фикстура, кэш результатов выключен, каталог построен по тем же данным."""
+    backend = mysql_repo.result_cache.backend
+    mysql_repo.result_cache.set_backend(None)
+    try:
+        with benchmark.stand_ins(films=300, logs=0, seed=5):
+            yield CatalogSnapshot(*mysql_repo.load_catalog_data())
+    finally:
+        mysql_repo.result_cache.set_backend(backend)
+
+
+def test_genre_pages_match_sql(sakila):
+    for genre in ("Action", "Comedy", "Sports"):
+        for y1, y2 in RANGES:
+            assert sakila.count_by_genre_years(genre, y1, y2) == mysql_repo.count_by_genre_years(genre, y1, y2)
+            for offset in (0, 7, 1000):
+                assert sakila.search_by_genre_years(genre, y1, y2, 7, offset) == \
+                    mysql_repo.search_by_genre_years(genre, y1, y2, 7, offset)
+                assert sakila.search_by_genre_years_with_total(genre, y1, y2, 7, offset) == \
+                    mysql_repo.search_by_genre_years_with_total(genre, y1, y2, 7, offset)
+
+
+def test_all_genres_pages_match_sql(sakila):
+    for y1, y2 in RANGES:
+        assert sakila.count_by_years_all_genres(y1, y2) == mysql_repo.count_by_years_all_genres(y1, y2)
+        assert sakila.count_rows_by_years_all_genres(y1, y2) == \
+            mysql_repo.count_rows_by_years_all_genres(y1, y2)
+        for offset in (0, 10, 5000):
+            assert sakila.search_by_years_all_genres(y1, y2, 10, offset) == \
+                mysql_repo.search_by_years_all_genres(y1, y2, 10, offset)
+            assert sakila.search_by_years_all_genres_with_total(y1, y2, 10, offset) == \
+                mysql_repo.search_by_years_all_genres_with_total(y1, y2, 10, offset)
+
+
+def test_keyset_chain_matches_sql(sakila):
+    """Страницы по курсору (ключ последней строки) - те же, что у *_AFTER запросов."""
+    for genre, kind in (("Drama", "genre_years"), ("All", "years_all_genres")):
+        after = None
+        pages = 0
+        while True:
+            if genre == "All":
+                expected = mysql_repo.search_by_years_all_genres(1995, 2020, 3, after=after)
+                got = sakila.search_by_years_all_genres(1995, 2020, 3, after=after)
+            else:
+                expected = mysql_repo.search_by_genre_years(genre, 1995, 2020, 3, after=after)
+                got = sakila.search_by_genre_years(genre, 1995, 2020, 3, after=after)
+            assert got == expected
+            if len(got) < 3:
+                break
+            after = row_key(kind, got[-1])
+            pages += 1
+        assert pages > 1
+
+
+def test_unknown_cursor_film_falls_back(sakila):
+    """Фильма из курсора нет в снимке - каталог не отвечает (None), запрос уйдёт в MySQL."""
+    assert sakila.search_by_genre_years("Action", 1990, 2025, 5, after=(2000, "X", 999999)) is None
+    assert sakila.search_by_genre_years("Nope", 1990, 2025, 5) == []
+
+
+def test_serves_uses_snapshot_only_when_enabled():
+    films = [{"film_id": 1, "title": "A", "release_year": 2000}]
+    loads = []
+
+    def load():
+        loads.append(1)
+        return films, [{"film_id": 1, "genre": "Action"}], ["Action"]
+
+    catalog = GenreCatalog(load, enabled=False)
+
+    @catalog.serves("count_by_genre_years")
+    def count_by_genre_years(genre, year_from, year_to):
+        return -1
+
+    @catalog.serves_async("count_by_years_all_genres")
+    async def count_by_years_all_genres(year_from, year_to):
+        return -1
+
+    assert count_by_genre_years("Action", 1990, 2025) == -1
+    assert loads == []
+
+    catalog.enabled = True
+    assert count_by_genre_years("Action", 1990, 2025) == 1
+    assert asyncio.run(count_by_years_all_genres(1990, 2025)) == 1
+    assert loads == [1]
+    assert catalog.stats()["pairs"] == 1
+
+
+def test_failed_build_falls_back_and_backs_off():
+    """Ошибка загрузки каталога - ответ из func, повторная загрузка - не раньше retry_interval."""
+    loads = []
+
+    def load():
+        loads.append(1)
+        raise RuntimeError("MySQL is down")
+
+    catalog = GenreCatalog(load, enabled=True, retry_interval=60)
+
+    @catalog.serves("count_by_genre_years")
+    def count_by_genre_years(genre, year_from, year_to):
+        return -1
+
+    assert count_by_genre_years("Action", 1990, 2025) == -1
+    assert count_by_genre_years("Action", 1990, 2025) == -1
+    assert loads == [1]
+
+    catalog.retry_interval = 0
+    assert count_by_genre_years("Action", 1990, 2025) == -1
+    assert loads == [1, 1]
+
+
+def test_async_wrapper_builds_in_background():
+    """Async-обёртка не загружает каталог в event loop: отвечает func, каталог строится в потоке."""
+    release = threading.Event()
+
+    def load():
+        assert threading.current_thread() is not threading.main_thread()
+        release.wait(5)
+        return [{"film_id": 1, "title": "A", "release_year": 2000}], [{"film_id": 1, "genre": "Action"}], ["Action"]
+
+    catalog = GenreCatalog(load, enabled=True)
+
+    @catalog.serves_async("count_by_years_all_genres")
+    async def count_by_years_all_genres(year_from, year_to):
+        return -1
+
+    assert asyncio.run(count_by_years_all_genres(1990, 2025)) == -1
+    release.set()
+    catalog._builder.join(5)
+    assert asyncio.run(count_by_years_all_genres(1990, 2025)) == 1
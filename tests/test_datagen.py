@@ -0,0 +1,106 @@
+"""
+Тесты генератора синтетических данных (datagen.py).
+
+Проверяется детерминированность, форма строк и документов,
+перекос распределений и загрузка в SQLite и mongomock.
+"""
+
+import sqlite3
+from collections import Counter
+
+import mongomock
+import pytest
+from Project import datagen, mongo
+
+
+def test_generate_films_is_deterministic_and_well_formed():
+    films = list(datagen.generate_films(500, seed=7))
+
+    assert films == list(datagen.generate_films(500, seed=7))
+    assert films != list(datagen.generate_films(500, seed=8))
+
+    assert [film[0] for film, _ in films] == list(range(1, 501))
+    years = [film[2] for film, _ in films]
+    assert (min(years), max(years)) == (datagen.YEAR_MIN, datagen.YEAR_MAX)
+    for (film_id, title, year), genres in films:
+        assert len(title.split()) == 2
+        assert 1 <= len(genres) <= 2
+        assert len(set(genres)) == len(genres)
+        assert all(1 <= g <= len(datagen.GENRES) for g in genres)
+
+
+def test_title_words_follow_zipf():
+    """Самое частое слово встречается заметно чаще, чем слово из середины словаря."""
+    words = Counter(
+        word for (_, title, _), _ in datagen.generate_films(5000, seed=1) for word in title.split()
+    )
+    vocabulary = datagen.title_vocabulary(datagen.vocabulary_size(5000))
+    assert words["LOVE"] > 5 * words[vocabulary[len(vocabulary) // 2]]
+
+
+def test_title_vocabulary_grows_with_synthetic_words():
+    words = datagen.title_vocabulary(1000)
+    assert len(words) == len(set(words)) == 1000
+    assert words[:len(datagen.TITLE_WORDS)] == list(datagen.TITLE_WORDS)
+
+
+def test_generate_logs_shape():
+    docs = list(datagen.generate_logs(300, seed=3))
+
+    assert {d["search_type"] for d in docs} == {"keyword", "genre__years_range"}
+    for d in docs:
+        assert d["timestamp"].tzinfo is not None
+        if d["search_type"] == "keyword":
+            assert d["params"]["keyword"]
+        else:
+            y1, y2 = map(int, d["params"]["years_range"].split("-"))
+            assert datagen.YEAR_MIN <= y1 <= y2 <= datagen.YEAR_MAX
+            assert d["params"]["genre"] in ("All",) + datagen.GENRES
+
+
+def test_load_sqlite(tmp_path):
+    path = str(tmp_path / "sakila.db")
+    assert datagen.load_sqlite(path, 120, batch_size=50) == 120
+
+    conn = sqlite3.connect(path)
+    assert conn.execute("SELECT COUNT(*) FROM film").fetchone()[0] == 120
+    assert conn.execute("SELECT COUNT(*) FROM category").fetchone()[0] == 16
+    assert conn.execute("SELECT COUNT(DISTINCT film_id) FROM film_category").fetchone()[0] == 120
+    conn.close()
+
+
+def test_load_mongo_writes_logs_and_counters(monkeypatch):
+    db = mongomock.MongoClient()["test"]
+    monkeypatch.setattr(mongo, "get_mongo_collection", lambda name=mongo.COLLECTION_NAME: db[name])
+
+    assert datagen.load_mongo(250, batch_size=100) == 250
+
+    # Рабочий лог приложения не затронут
+    assert db[mongo.COLLECTION_NAME].count_documents({}) == 0
+    assert db[datagen.DATAGEN_COLLECTION_NAME].count_documents({}) == 250
+    counters = list(db[mongo.counters_collection_name(datagen.DATAGEN_COLLECTION_NAME)].find())
+    assert sum(c["count"] for c in counters) == 250
+
+
+def test_load_mongo_refuses_non_empty_collection(monkeypatch):
+    db = mongomock.MongoClient()["test"]
+    monkeypatch.setattr(mongo, "get_mongo_collection", lambda name=mongo.COLLECTION_NAME: db[name])
+    datagen.load_mongo(100, collection="logs")
+
+    with pytest.raises(RuntimeError):
+        datagen.load_mongo(100, collection="logs")
+    assert db["logs"].count_documents({}) == 100
+
+    assert datagen.load_mongo(50, collection="logs", replace=True) == 50
+    assert db["logs"].count_documents({}) == 50
+    assert sum(c["count"] for c in db[mongo.counters_collection_name("logs")].find()) == 50
+
+
+@pytest.mark.parametrize("database", [None, datagen.dbconfig["database"]])
+def test_load_mysql_refuses_replace_in_application_database(monkeypatch, database):
+    def connect(**config):
+        raise AssertionError("connected before refusing --replace")
+
+    monkeypatch.setattr(datagen.mysql.connector, "connect", connect)
+    with pytest.raises(RuntimeError):
+        datagen.load_mysql(10, database=database, replace=True)
@@ -0,0 +1,63 @@
+"""
+Unit-тесты экспорта результатов поиска (export.py) и эндпоинта /export.
+
+Строки подаются генератором вместо MySQL, лог подменяется списком.
+"""
+
+import json
+
+from fastapi.testclient import TestClient
+
+from Project import export, web_app
+
+
+def make_rows(n):
+    return ({"film_id": i, "title": f"FILM {i}", "release_year": 2006} for i in range(n))
+
+
+def test_csv_export_is_chunked_and_logged_once(monkeypatch):
+    """CSV выдаётся кусками по EXPORT_CHUNK_ROWS строк, лог - один раз в конце."""
+    monkeypatch.setattr(export, "EXPORT_CHUNK_ROWS", 2)
+    logged = []
+
+    chunks = list(export.iter_export_chunks(
+        make_rows(5), export.EXPORT_COLUMNS["keyword"], "csv", on_done=logged.append
+    ))
+
+    assert len(chunks) == 3
+    lines = "".join(chunks).splitlines()
+    assert lines[0] == "film_id,title,release_year"
+    assert lines[1] == "0,FILM 0,2006"
+    assert len(lines) == 6
+    assert logged == [5]
+
+
+def test_ndjson_export_line_per_row():
+    chunks = export.iter_export_chunks(make_rows(2), export.EXPORT_COLUMNS["keyword"], "ndjson")
+
+    records = [json.loads(line) for line in "".join(chunks).splitlines()]
+    assert records == [
+        {"film_id": 0, "title": "FILM 0", "release_year": 2006},
+        {"film_id": 1, "title": "FILM 1", "release_year": 2006},
+    ]
+
+
+def test_export_endpoint_streams_keyword_results(monkeypatch):
+    logged = []
+    monkeypatch.setattr(export, "iter_search_by_keyword", lambda keyword: make_rows(3))
+    monkeypatch.setattr(web_app, "log_export", lambda *args: logged.append(args))
+
+    resp = TestClient(web_app.app).get("/export", params={"keyword": "film", "format": "ndjson"})
+
+    assert resp.status_code == 200
+    assert resp.headers["content-type"].startswith("application/x-ndjson")
+    assert len(resp.text.splitlines()) == 3
+    assert logged == [({"search_type": "keyword", "keyword": "film", "format": "ndjson"}, 3)]
+
+
+def test_export_endpoint_validates_input():
+    client = TestClient(web_app.app)
+
+    assert client.get("/export", params={"keyword": "film", "format": "xml"}).status_code == 400
+    assert client.get("/export", params={"keyword": "123"}).status_code == 400
+    assert client.get("/export").status_code == 400
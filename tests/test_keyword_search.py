@@ -0,0 +1,68 @@
+"""
+Unit-тесты для in-memory индекса названий (keyword_search.py).
+
+Цель тестов:
+- убедиться, что индекс n-грамм возвращает те же фильмы, в том же порядке
+  и с тем же количеством, что и LOWER(title) LIKE '%kw%' ... ORDER BY title, film_id
+- проверить постраничный вывод (OFFSET и keyset)
+
+MySQL не используется: "эталонный" SQL-результат вычисляется в Python.
+"""
+
+import pytest
+from Project.keyword_search import NgramIndexBackend
+
+FILMS = [
+    {"film_id": i, "title": title, "release_year": 2000 + i % 10}
+    for i, title in enumerate(sorted([
+        "ACADEMY DINOSAUR", "ACE GOLDFINGER", "ADAPTATION HOLES", "AFFAIR PREJUDICE",
+        "AFRICAN EGG", "AGENT TRUMAN", "AIRPLANE SIERRA", "AIRPORT POLLOCK",
+        "ALABAMA DEVIL", "ALADDIN CALENDAR", "ALAMO VIDEOTAPE", "ALASKA PHANTOM",
+        "ALI FOREVER", "ALICE FANTASIA", "ALIEN CENTER", "ALLEY EVOLUTION",
+        "ALONE TRIP", "ALTER VICTORY", "AMADEUS HOLY", "AMELIE HELLFIGHTERS",
+        "BEAR GRACELAND", "DINOSAUR SECRETARY", "GOLDFINGER SENSIBILITY",
+    ]), start=1)
+]
+
+
+def like_reference(keyword: str) -> list[dict]:
+    """То, что вернул бы MySQL: фильтр по подстроке в исходном порядке."""
+    return [f for f in FILMS if keyword.lower() in f["title"].lower()]
+
+
+@pytest.fixture
+def backend():
+    b = NgramIndexBackend(load_films=lambda: FILMS)
+    b.build()
+    return b
+
+
+@pytest.mark.parametrize("keyword", ["academy", "AL", "a", "dinosaur", "ol", "zzz", "ie ", "fInGeR"])
+def test_same_results_as_like(backend, keyword):
+    """Результаты и количество совпадают с LIKE-версией."""
+    expected = like_reference(keyword)
+
+    assert backend.search(keyword, limit=100) == expected
+    assert backend.count(keyword) == len(expected)
+
+
+def test_offset_and_keyset_pages(backend):
+    """Страницы по OFFSET и по курсору (title, film_id) совпадают."""
+    expected = like_reference("a")
+
+    page2_offset = backend.search("a", limit=5, offset=5)
+    last = expected[4]
+    page2_keyset = backend.search("a", limit=5, after=(last["title"], last["film_id"]))
+
+    assert page2_offset == expected[5:10]
+    assert page2_keyset == expected[5:10]
+
+
+def test_like_wildcards_go_to_sql(backend, monkeypatch):
+    """Ключевые слова с % или _ обрабатываются исходным SQL-запросом."""
+    calls = []
+    monkeypatch.setattr(backend._fallback, "count", lambda kw: calls.append(kw) or 0)
+
+    backend.count("a_b")
+
+    assert calls == ["a_b"]
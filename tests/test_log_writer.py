@@ -0,0 +1,104 @@
+"""
+Unit-тесты для фоновой записи логов (log_writer.py).
+
+Цель тестов:
+- проверить, что документы записываются пачками (insert_many)
+- проверить политику переполнения очереди
+- убедиться, что stop() дописывает всё, что осталось в очереди
+
+MongoDB не используется: запись подменяется функцией, сохраняющей пачки в список.
+"""
+
+import threading
+import time
+
+from Project.log_writer import QueryLogWriter
+
+
+def test_batches_by_size():
+    """10 документов при batch_size=5 записываются двумя пачками."""
+    batches = []
+    writer = QueryLogWriter(batches.append, batch_size=5, flush_interval=10)
+
+    for i in range(10):
+        assert writer.submit({"i": i})
+
+    assert writer.flush(timeout=2)
+    writer.stop()
+
+    assert [len(b) for b in batches] == [5, 5]
+    assert writer.stats()["written"] == 10
+
+
+def test_stop_flushes_queue():
+    """При остановке неполная пачка всё равно записывается."""
+    batches = []
+    writer = QueryLogWriter(batches.append, batch_size=100, flush_interval=10)
+
+    writer.submit({"a": 1})
+    writer.submit({"a": 2})
+    writer.stop()
+
+    assert sum(len(b) for b in batches) == 2
+
+
+def test_drop_newest_when_full():
+    """Переполненная очередь не блокирует поиск - новый документ отбрасывается."""
+    release = threading.Event()
+    writer = QueryLogWriter(lambda docs: release.wait(2), max_queue=1, batch_size=1)
+
+    results = [writer.submit({"i": i}) for i in range(5)]
+    release.set()
+    writer.stop()
+
+    assert False in results
+    assert writer.stats()["dropped"] >= 1
+
+
+def test_write_error_is_counted():
+    """Ошибка MongoDB не роняет поток записи, а попадает в счётчик failed."""
+    def broken(docs):
+        raise RuntimeError("mongo down")
+
+    writer = QueryLogWriter(broken, batch_size=1)
+    writer.submit({"a": 1})
+    writer.flush(timeout=2)
+    writer.stop()
+
+    assert writer.stats()["failed"] == 1
+
+
+def test_stop_timeout_keeps_running_thread():
+    """stop() не дождался потока - второй поток рядом с ним не запускается."""
+    release = threading.Event()
+    batches = []
+    writer = QueryLogWriter(lambda docs: release.wait(5) and batches.append(docs), batch_size=1)
+
+    writer.submit({"a": 1})
+    thread = writer._thread
+    writer.stop(timeout=0.05)
+    writer.submit({"a": 2})
+
+    assert writer._thread is thread
+    release.set()
+    thread.join(5)
+    writer.stop()
+    assert sum(len(b) for b in batches) == 2
+    assert writer._thread is None
+
+
+def test_submit_after_timed_out_stop_restarts_writer():
+    """Поток, не дождавшийся stop(), завершился - следующий submit запускает новый."""
+    batches = []
+    writer = QueryLogWriter(lambda docs: time.sleep(0.2) or batches.append(docs), batch_size=1)
+
+    writer.submit({"a": 1})
+    thread = writer._thread
+    writer.stop(timeout=0.01)
+    thread.join(5)
+
+    writer.submit({"a": 2})
+    assert writer.flush(timeout=2)
+    writer.stop()
+
+    assert [doc for batch in batches for doc in batch] == [{"a": 1}, {"a": 2}]
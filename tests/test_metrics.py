@@ -0,0 +1,72 @@
+"""
+Unit-тесты метрик (metrics.py) и эндпоинта /metrics.
+Реальные базы не используются.
+"""
+
+from fastapi.testclient import TestClient
+
+from Project import metrics, mysql_repo, queries, web_app
+
+
+class FakeCursor:
+    def execute(self, sql, params=None):
+        pass
+
+
+def test_histogram_renders_prometheus_text():
+    hist = metrics.Histogram("demo_seconds", "Demo.", ("op",), buckets=(0.1, 1.0))
+    hist.observe(0.05, "a")
+    hist.observe(0.5, "a")
+
+    text = "\n".join(hist.render())
+
+    assert "# TYPE demo_seconds histogram" in text
+    assert 'demo_seconds_bucket{op="a",le="0.1"} 1' in text
+    assert 'demo_seconds_bucket{op="a",le="1"} 2' in text
+    assert 'demo_seconds_bucket{op="a",le="+Inf"} 2' in text
+    assert 'demo_seconds_count{op="a"} 2' in text
+
+
+def test_gauge_renders_labels_and_function():
+    gauge = metrics.Gauge("demo_rows", "Demo.", ("table",))
+    gauge.set(3, "film")
+    gauge.set(1, "film")
+    lag = metrics.Gauge("demo_lag_seconds", "Demo.")
+    lag.set_function(lambda: 2.5)
+
+    assert "# TYPE demo_rows gauge" in gauge.render()
+    assert 'demo_rows{table="film"} 1' in gauge.render()
+    assert lag.value() == 2.5
+    assert "demo_lag_seconds 2.5" in lag.render()
+
+
+def test_run_query_is_labelled_with_query_name(monkeypatch):
+    metrics.reset_metrics()
+
+    mysql_repo.run_query(FakeCursor(), queries.COUNT_BY_KEYWORD, ("%a%",))
+
+    assert metrics.db_operation_duration.count("mysql", "COUNT_BY_KEYWORD") == 1
+
+
+def test_observe_is_noop_when_disabled(monkeypatch):
+    metrics.reset_metrics()
+    monkeypatch.setattr(metrics, "METRICS_ENABLED", False)
+
+    with metrics.observe("mysql", "SHOW_GENRES"):
+        pass
+
+    assert metrics.db_operation_duration.count("mysql", "SHOW_GENRES") == 0
+
+
+def test_metrics_endpoint_reports_routes(monkeypatch):
+    metrics.reset_metrics()
+    monkeypatch.setattr(web_app, "stats_top5_frequency", lambda: [])
+    monkeypatch.setattr(web_app, "stats_last5_unique", lambda: [])
+
+    client = TestClient(web_app.app)
+    client.get("/stats")
+    text = client.get("/metrics").text
+
+    assert 'http_requests_total{route="/stats",method="GET",status="200"} 1' in text
+    assert 'http_request_duration_seconds_count{route="/stats"} 1' in text
+    assert 'template_render_duration_seconds_count{template="stats.html"} 1' in text
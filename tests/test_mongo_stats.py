@@ -53,6 +53,8 @@ def test_stats_pipelines_work(monkeypatch):
     # Подменяем функцию get_mongo_collection,
     # чтобы mongo.py работал с mock-коллекцией, а не с реальной БД
     monkeypatch.setattr(mongo, "get_mongo_collection", lambda: col)
+    # Проверяем агрегацию по логам (вариант без коллекции счётчиков)
+    monkeypatch.setattr(mongo, "STATS_SOURCE", "log")
 
     # Вызываем функции статистики
     top5 = mongo.stats_top5_frequency()
@@ -66,3 +68,184 @@ def test_stats_pipelines_work(monkeypatch):
     # (наличие count и params после агрегации)
     assert "count" in top5[0]
     assert "params" in top5[0]
+
+
+def test_mongo_client_is_shared(monkeypatch):
+    """
+    Проверяем, что MongoClient создаётся один раз на процесс,
+    а коллекция переиспользуется между вызовами.
+    """
+    created = []
+
+    def fake_client(*args, **kwargs):
+        created.append(kwargs)
+        return mongomock.MongoClient()
+
+    monkeypatch.setattr(mongo, "MongoClient", fake_client)
+    mongo.close_mongo_client()
+
+    col1 = mongo.get_mongo_collection()
+    col2 = mongo.get_mongo_collection()
+
+    assert col1 is col2
+    assert len(created) == 1
+    assert created[0]["maxPoolSize"] == mongo.MONGO_MAX_POOL_SIZE
+
+    # После close_mongo_client следующий вызов создаёт новый клиент
+    mongo.close_mongo_client()
+    mongo.get_mongo_collection()
+    assert len(created) == 2
+    mongo.close_mongo_client()
+
+
+def test_counters_match_log_aggregation(monkeypatch):
+    """
+    log_query обновляет коллекцию счётчиков, и статистика по счётчикам
+    совпадает с агрегацией по логам.
+    """
+    client = mongomock.MongoClient()
+    db = client["ich_edit"]
+    monkeypatch.setattr(mongo, "get_mongo_collection", lambda name=mongo.COLLECTION_NAME: db[name])
+    monkeypatch.setattr(mongo, "QUERY_LOG_ASYNC", False)
+
+    mongo.log_query("keyword", {"keyword": "academy"}, 2)
+    mongo.log_query("genre__years_range", {"genre": "All", "years_range": "2005-2006"}, 10)
+    mongo.log_query("keyword", {"keyword": "academy"}, 3)
+
+    monkeypatch.setattr(mongo, "STATS_SOURCE", "counters")
+    top5 = mongo.stats_top5_frequency()
+    last5 = mongo.stats_last5_unique()
+
+    monkeypatch.setattr(mongo, "STATS_SOURCE", "log")
+    top5_log = mongo.stats_top5_frequency()
+
+    assert [(r["count"], r["params"], r["results_count"]) for r in top5] == \
+        [(r["count"], r["params"], r["results_count"]) for r in top5_log]
+    assert top5[0]["count"] == 2
+    assert top5[0]["results_count"] == 3
+    assert last5[0]["params"] == {"keyword": "academy"}
+
+
+def test_rebuild_counters_from_log(monkeypatch):
+    """Счётчики можно пересчитать по уже накопленным логам."""
+    client = mongomock.MongoClient()
+    db = client["ich_edit"]
+    monkeypatch.setattr(mongo, "get_mongo_collection", lambda name=mongo.COLLECTION_NAME: db[name])
+
+    db[mongo.COLLECTION_NAME].insert_many([
+        {"timestamp": "2026-01-20T00:00:00+00:00", "search_type": "keyword",
+         "params": {"keyword": "ace"}, "results_count": 1},
+        {"timestamp": "2026-01-21T00:00:00+00:00", "search_type": "keyword",
+         "params": {"keyword": "ace"}, "results_count": 1},
+    ])
+
+    assert mongo.rebuild_query_counters() == 1
+    assert mongo.top_counters(5)[0]["count"] == 2
+
+
+def test_rebuild_counters_command_keeps_newer_counts(monkeypatch, capsys):
+    """rebuild-counters не уменьшает счётчик, уже увеличенный log_query после снимка логов."""
+    client = mongomock.MongoClient()
+    db = client["ich_edit"]
+    monkeypatch.setattr(mongo, "get_mongo_collection", lambda name=mongo.COLLECTION_NAME: db[name])
+
+    ts = datetime(2026, 1, 20, tzinfo=timezone.utc)
+    db[mongo.COLLECTION_NAME].insert_many([
+        {"timestamp": ts, "search_type": "keyword", "params": {"keyword": "ace"}, "results_count": 1},
+        {"timestamp": ts, "search_type": "keyword", "params": {"keyword": "moon"}, "results_count": 4},
+    ])
+    db[mongo.COUNTERS_COLLECTION_NAME].bulk_write(mongo.counter_updates([
+        {"timestamp": ts, "search_type": "keyword", "params": {"keyword": "ace"}, "results_count": 1},
+    ] * 3))
+
+    assert mongo.main(["rebuild-counters"]) == 0
+    assert "Rebuilt counters: 2" in capsys.readouterr().out
+    counts = {c["params"]["keyword"]: c["count"] for c in db[mongo.COUNTERS_COLLECTION_NAME].find()}
+    assert counts == {"ace": 3, "moon": 1}
+
+
+def test_migrate_string_timestamps(monkeypatch):
+    """Старые строковые timestamp переводятся в datetime, новые не трогаются."""
+    client = mongomock.MongoClient()
+    db = client["ich_edit"]
+    monkeypatch.setattr(mongo, "get_mongo_collection", lambda name=mongo.COLLECTION_NAME: db[name])
+
+    col = db[mongo.COLLECTION_NAME]
+    col.insert_many([
+        {"timestamp": "2026-01-21T12:00:00+00:00", "search_type": "keyword", "params": {}},
+        {"timestamp": datetime(2026, 1, 22, tzinfo=timezone.utc), "search_type": "keyword", "params": {}},
+    ])
+
+    assert mongo.migrate_string_timestamps() == 1
+    assert mongo.migrate_string_timestamps() == 0
+    assert all(isinstance(d["timestamp"], datetime) for d in col.find())
+
+
+def test_stats_page_renders_datetime_timestamps(monkeypatch):
+    """Страница статистики отображает и datetime, и старые строковые timestamp."""
+    from fastapi.testclient import TestClient
+    from Project import web_app
+
+    rows = [
+        {"search_type": "keyword", "params": {"keyword": "ace"}, "count": 2,
+         "results_count": 1, "timestamp": datetime(2026, 1, 21, 12, 30, tzinfo=timezone.utc)},
+        {"search_type": "keyword", "params": {"keyword": "old"}, "count": 1,
+         "results_count": 1, "timestamp": "2026-01-20T08:15:00+00:00"},
+    ]
+    monkeypatch.setattr(web_app, "stats_top5_frequency", lambda: rows)
+    monkeypatch.setattr(web_app, "stats_last5_unique", lambda: rows)
+
+    resp = TestClient(web_app.app).get("/stats")
+
+    assert "2026-01-21 12:30" in resp.text
+    assert "2026-01-20 08:15" in resp.text
+
+
+def test_stats_facet_matches_separate_aggregations(monkeypatch):
+    """Один $facet возвращает те же Top 5 и Last 5, что и две отдельные агрегации."""
+    client = mongomock.MongoClient()
+    db = client["ich_edit"]
+    monkeypatch.setattr(mongo, "get_mongo_collection", lambda name=mongo.COLLECTION_NAME: db[name])
+    monkeypatch.setattr(mongo, "QUERY_LOG_ASYNC", False)
+    monkeypatch.setattr(mongo, "STATS_SOURCE", "log")
+
+    mongo.log_query("keyword", {"keyword": "academy"}, 2)
+    mongo.log_query("keyword", {"keyword": "ace"}, 5)
+    mongo.log_query("keyword", {"keyword": "academy"}, 3)
+
+    top5, last5 = mongo.stats_top_and_last(5)
+
+    assert top5 == mongo.stats_top5_frequency()
+    assert last5 == mongo.stats_last5_unique()
+    assert top5[0]["count"] == 2
+
+
+def test_stats_page_uses_single_facet_query(monkeypatch):
+    """При STATS_SOURCE == "log" страница статистики делает один запрос ($facet)."""
+    from fastapi.testclient import TestClient
+    from Project import web_app
+
+    calls = []
+    monkeypatch.setattr(mongo, "STATS_SOURCE", "log")
+    monkeypatch.setattr(web_app, "stats_top_and_last", lambda: calls.append("facet") or ([], []))
+    monkeypatch.setattr(web_app, "stats_top5_frequency", lambda: calls.append("top"))
+    monkeypatch.setattr(web_app, "stats_last5_unique", lambda: calls.append("last"))
+
+    resp = TestClient(web_app.app).get("/stats")
+
+    assert resp.status_code == 200
+    assert calls == ["facet"]
+
+
+def test_exports_do_not_affect_stats(monkeypatch):
+    """Экспорт пишется в свою коллекцию: лог поисков и счётчики не меняются."""
+    client = mongomock.MongoClient()
+    db = client["ich_edit"]
+    monkeypatch.setattr(mongo, "get_mongo_collection", lambda name=mongo.COLLECTION_NAME: db[name])
+    monkeypatch.setattr(mongo, "QUERY_LOG_ASYNC", False)
+
+    mongo.log_export({"search_type": "keyword", "keyword": "academy", "format": "csv"}, 2)
+
+    assert db[mongo.EXPORTS_COLLECTION_NAME].count_documents({}) == 1
+    assert db[mongo.COLLECTION_NAME].count_documents({}) == 0
+    assert db[mongo.COUNTERS_COLLECTION_NAME].count_documents({}) == 0
@@ -0,0 +1,96 @@
+"""
+Unit-тесты для пула соединений (mysql_pool.py).
+
+Цель тестов:
+- проверить, что соединения переиспользуются, а не открываются заново
+- проверить таймаут ожидания свободного соединения
+- проверить, что соединение с ошибкой БД выбрасывается из пула
+
+Реальная MySQL не используется: вместо соединений - простые fake-объекты.
+"""
+
+import mysql.connector
+import pytest
+from Project.mysql_pool import MySQLPool, PoolTimeoutError
+
+
+class FakeConnection:
+    """Минимальная замена соединения mysql.connector."""
+
+    def __init__(self):
+        self.closed = False
+        self.alive = True
+
+    def ping(self, reconnect=False):
+        if not self.alive:
+            raise mysql.connector.InterfaceError("gone")
+
+    def close(self):
+        self.closed = True
+
+
+def make_pool(**kwargs):
+    created = []
+
+    def connect():
+        conn = FakeConnection()
+        created.append(conn)
+        return conn
+
+    return MySQLPool(connect, **kwargs), created
+
+
+def test_connection_is_reused():
+    """Два последовательных запроса используют одно и то же соединение."""
+    pool, created = make_pool(size=2)
+
+    with pool.connection():
+        pass
+    with pool.connection():
+        pass
+
+    assert len(created) == 1
+    assert pool.stats()["acquired"] == 2
+    assert pool.stats()["idle"] == 1
+
+
+def test_wait_timeout():
+    """Если все соединения заняты - ждём wait_timeout и получаем ошибку."""
+    pool, _ = make_pool(size=1, wait_timeout=0.05)
+
+    with pool.connection():
+        with pytest.raises(PoolTimeoutError):
+            pool.connection()
+
+    assert pool.stats()["timeouts"] == 1
+
+
+def test_broken_connection_is_recycled():
+    """Ошибка БД внутри with - соединение закрывается, следующее создаётся заново."""
+    pool, created = make_pool(size=1)
+
+    with pytest.raises(mysql.connector.OperationalError):
+        with pool.connection():
+            raise mysql.connector.OperationalError("lost connection")
+
+    with pool.connection():
+        pass
+
+    assert created[0].closed
+    assert len(created) == 2
+    assert pool.stats()["recycled"] == 1
+
+
+def test_health_check_replaces_dead_connection():
+    """Долго простаивавшее "мёртвое" соединение заменяется новым."""
+    pool, created = make_pool(size=1, health_check_interval=0)
+
+    with pool.connection():
+        pass
+    created[0].alive = False
+
+    with pool.connection():
+        pass
+
+    assert len(created) == 2
+    assert pool.stats()["opened"] == 1
@@ -0,0 +1,92 @@
+"""
+Unit-тесты потокового чтения результатов (mysql_repo.iter_search_*).
+
+Реальная MySQL не используется: fake-курсор отдаёт строки
+пачками через fetchmany и запоминает размеры запрошенных пачек.
+"""
+
+from Project import mysql_repo, queries
+
+
+class FakeStreamCursor:
+    description = [("film_id",), ("title",), ("release_year",)]
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def execute(self, sql, params=()):
+        self.conn.executed.append((sql, params))
+        self.conn.unread_result = True
+
+    def fetchmany(self, size):
+        batch = self.conn.rows[self.conn.pos:self.conn.pos + size]
+        self.conn.pos += len(batch)
+        self.conn.batches.append(size)
+        if not batch:
+            self.conn.unread_result = False
+        return batch
+
+    def close(self):
+        self.conn.closed = True
+
+
+class FakeStreamConnection:
+    def __init__(self, rows):
+        self.rows = rows
+        self.pos = 0
+        self.executed = []
+        self.batches = []
+        self.buffered = None
+        self.unread_result = False
+        self.consumed = False
+        self.closed = False
+        self.released = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+    def cursor(self, buffered=None):
+        self.buffered = buffered
+        return FakeStreamCursor(self)
+
+    def consume_results(self):
+        self.consumed = True
+        self.unread_result = False
+
+    def shutdown(self):
+        self.closed = True
+
+    def release(self, broken=False):
+        self.released = "broken" if broken else "pool"
+
+
+def test_iter_search_by_keyword_streams_in_batches(monkeypatch):
+    """Строки читаются пачками batch_size через небуферизованный курсор."""
+    conn = FakeStreamConnection([(i, f"FILM {i}", 2006) for i in range(5)])
+    monkeypatch.setattr(mysql_repo, "get_mysql_connection", lambda: conn)
+
+    rows = list(mysql_repo.iter_search_by_keyword("Film", batch_size=2))
+
+    assert [r["film_id"] for r in rows] == [0, 1, 2, 3, 4]
+    assert conn.executed == [(queries.STREAM_BY_KEYWORD, ("%film%",))]
+    assert conn.batches == [2, 2, 2, 2]
+    assert conn.buffered is False
+    assert conn.closed and not conn.consumed
+
+
+def test_iter_search_stopped_early_discards_connection(monkeypatch):
+    """Если чтение прервали, остаток не дочитывается: соединение закрывается, а не идёт в пул."""
+    conn = FakeStreamConnection([(i, f"FILM {i}", 2006) for i in range(5)])
+    monkeypatch.setattr(mysql_repo, "get_mysql_connection", lambda: conn)
+
+    stream = mysql_repo.iter_search_by_genre_years("All", 2000, 2010, batch_size=2)
+    assert next(stream)["film_id"] == 0
+    stream.close()
+
+    assert conn.executed[0][0] == queries.STREAM_BY_YEARS_ALL_GENRES
+    assert not conn.consumed and conn.closed
+    assert conn.released == "broken"
+    assert conn.batches == [2]
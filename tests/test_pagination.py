@@ -0,0 +1,63 @@
+"""
+Unit-тесты для keyset-пагинации (pagination.py).
+
+Цель тестов:
+- проверить, что курсор корректно упаковывается и распаковывается
+- убедиться, что повреждённый курсор, курсор другого поиска
+  или курсор с неверными типами значений отклоняются
+"""
+
+import base64
+import json
+
+import pytest
+from Project.pagination import encode_cursor, decode_cursor, row_key
+
+
+def test_cursor_roundtrip():
+    """Курсор последней строки распаковывается в её ключ сортировки."""
+    row = {"film_id": 7, "title": "ACADEMY DINOSAUR", "release_year": 2006, "genre": "Action"}
+
+    token = encode_cursor("genre_years", row)
+
+    assert decode_cursor("genre_years", token) == (2006, "ACADEMY DINOSAUR", 7)
+    assert row_key("keyword", row) == ("ACADEMY DINOSAUR", 7)
+
+
+def test_cursor_is_url_safe():
+    """Курсор можно вставлять в URL без экранирования."""
+    token = encode_cursor("keyword", {"film_id": 1, "title": "A/B+C? Ж"})
+    assert all(ch.isalnum() or ch in "-_" for ch in token)
+
+
+def test_invalid_cursor():
+    """Мусор вместо курсора - ValueError."""
+    with pytest.raises(ValueError):
+        decode_cursor("keyword", "not-a-cursor")
+
+
+def test_cursor_of_other_search_kind():
+    """Курсор от другого вида поиска не принимается."""
+    token = encode_cursor("keyword", {"film_id": 1, "title": "A"})
+    with pytest.raises(ValueError):
+        decode_cursor("genre_years", token)
+
+
+def raw_cursor(payload: dict) -> str:
+    raw = json.dumps(payload).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+@pytest.mark.parametrize("values", [
+    [[2000], "A", 1],
+    [2000, "A", "1"],
+    [2000, 5, 1],
+    [None, "A", 1],
+    [True, "A", 1],
+    [2000.5, "A", 1],
+    [2000, {"x": 1}, 1],
+])
+def test_cursor_with_wrong_value_types(values):
+    """Подделанный курсор с неверными типами значений - ValueError, а не ошибка SQL/кэша."""
+    with pytest.raises(ValueError):
+        decode_cursor("genre_years", raw_cursor({"k": "genre_years", "v": values}))
@@ -0,0 +1,61 @@
+"""
+Unit-тесты для предзагрузки страниц (prefetch.py) и сессии
+соединения mysql_repo.session_connection.
+
+Реальная MySQL не используется: страницы отдаёт fake-функция,
+пул создаётся с fake-соединениями.
+"""
+
+import threading
+from contextlib import nullcontext
+
+from Project import mysql_repo
+from Project.mysql_pool import MySQLPool
+from Project.prefetch import PagePrefetcher
+
+
+def test_next_page_is_fetched_before_it_is_requested():
+    """prefetch() запускает загрузку сразу, get() не делает повторный запрос."""
+    started = threading.Event()
+    calls = []
+
+    def fetch_page(after):
+        calls.append((after, threading.current_thread().name))
+        if after is not None:
+            started.set()
+        return [{"after": after}]
+
+    with PagePrefetcher(fetch_page, session=nullcontext) as pages:
+        assert pages.get(None) == [{"after": None}]
+        pages.prefetch(("A", 1))
+        assert started.wait(1.0)  # загрузка идёт без вызова get()
+        assert pages.get(("A", 1)) == [{"after": ("A", 1)}]
+
+    assert [after for after, _ in calls] == [None, ("A", 1)]
+    # Все страницы загружаются в одном фоновом потоке
+    assert len({name for _, name in calls}) == 1
+    assert calls[0][1] != threading.current_thread().name
+
+
+def test_session_connection_reuses_one_pooled_connection(monkeypatch):
+    """Внутри сессии все запросы потока идут через одно соединение пула."""
+    created = []
+
+    def connect():
+        created.append(object())
+        return created[-1]
+
+    pool = MySQLPool(connect, size=2)
+    monkeypatch.setattr(mysql_repo, "get_pool", lambda: pool)
+
+    with mysql_repo.session_connection():
+        with mysql_repo.get_mysql_connection() as first:
+            pass
+        with mysql_repo.get_mysql_connection() as second:
+            pass
+        assert first is second
+        assert pool.stats()["in_use"] == 1
+
+    assert len(created) == 1
+    assert pool.stats()["in_use"] == 0
+    assert pool.stats()["acquired"] == 1
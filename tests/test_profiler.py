@@ -0,0 +1,83 @@
+"""
+Unit-тесты профилировщика медленных запросов (profiler.py).
+MySQL не используется: EXPLAIN подменяется функцией-заглушкой.
+"""
+
+import threading
+
+from Project import mysql_repo, profiler, queries
+
+
+class FakeCursor:
+    def execute(self, sql, params=None):
+        pass
+
+
+def test_slow_query_log_keeps_last_entries_with_plan():
+    sent = []
+    log = profiler.SlowQueryLog(size=2, sink=sent.append)
+
+    for i in range(3):
+        log.record(f"Q{i}", "SELECT 1", (i,), 1.0, explain=lambda sql, params: [{"table": "film", "type": "ALL"}])
+    log.wait()
+
+    entries = log.entries()
+    assert [e["query"] for e in entries] == ["Q2", "Q1"]
+    assert entries[0]["full_scan"] is True
+    assert entries[0]["explain"] == [{"table": "film", "type": "ALL"}]
+    assert len(sent) == 3
+
+
+def test_run_query_records_slow_queries_with_explain(monkeypatch):
+    explained = []
+    monkeypatch.setattr(profiler, "SLOW_QUERY_THRESHOLD", 1e-9)
+    monkeypatch.setattr(
+        mysql_repo, "explain_query",
+        lambda sql, params: explained.append((sql, params)) or [{"type": "range"}],
+    )
+    mysql_repo.slow_query_log.clear()
+
+    mysql_repo.run_query(FakeCursor(), queries.COUNT_BY_GENRE_YEARS, ("Action", 2005, 2006))
+    mysql_repo.slow_query_log.wait()
+
+    entry = mysql_repo.slow_query_log.entries()[0]
+    assert entry["query"] == "COUNT_BY_GENRE_YEARS"
+    assert entry["params"] == ["Action", 2005, 2006]
+    assert entry["full_scan"] is False
+    assert explained == [(queries.COUNT_BY_GENRE_YEARS, ("Action", 2005, 2006))]
+    mysql_repo.slow_query_log.clear()
+
+
+def test_fast_queries_are_not_recorded(monkeypatch):
+    monkeypatch.setattr(profiler, "SLOW_QUERY_THRESHOLD", 60.0)
+    mysql_repo.slow_query_log.clear()
+
+    mysql_repo.run_query(FakeCursor(), queries.SHOW_GENRES)
+
+    assert mysql_repo.slow_query_log.entries() == []
+
+
+def test_explain_is_rate_limited_per_query():
+    explained = []
+    log = profiler.SlowQueryLog(size=10, explain_interval=60)
+
+    for i in range(3):
+        log.record("Q", "SELECT 1", (i,), 1.0, explain=lambda sql, params: explained.append(params) or [])
+    log.record("OTHER", "SELECT 2", (), 1.0, explain=lambda sql, params: explained.append(params) or [])
+    log.wait()
+
+    assert explained == [(0,), ()]
+    assert [e["explain"] for e in log.entries()] == [[], None, None, []]
+
+
+def test_background_queue_is_bounded():
+    release = threading.Event()
+    log = profiler.SlowQueryLog(size=10, sink=lambda entry: release.wait(5), max_pending=2)
+
+    for i in range(5):
+        log.record(f"Q{i}", "SELECT 1", (i,), 1.0)
+    release.set()
+    log.wait()
+
+    assert log.recorded == 5
+    assert log.skipped == 3
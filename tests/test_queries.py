@@ -39,3 +39,17 @@ def test_queries_not_empty():
     assert "SELECT" in queries.SEARCH_BY_KEYWORD.upper()
     assert "LIMIT" in queries.SEARCH_BY_KEYWORD.upper()
     assert "OFFSET" in queries.SEARCH_BY_KEYWORD.upper()
+
+
+def test_keyset_queries_have_no_offset():
+    """
+    Keyset-запросы (следующая страница после курсора)
+    не должны использовать OFFSET - в этом весь смысл seek-пагинации.
+    """
+    for sql in (
+            queries.SEARCH_BY_KEYWORD_AFTER,
+            queries.SEARCH_BY_GENRE_YEARS_AFTER,
+            queries.SEARCH_BY_YEARS_ALL_GENRES_AFTER,
+    ):
+        assert "LIMIT" in sql.upper()
+        assert "OFFSET" not in sql.upper()
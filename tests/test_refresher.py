@@ -0,0 +1,128 @@
+"""
+Тесты фонового обновления каталога (refresher.py).
+
+На SQLite-фикстуре Sakila (из benchmark.py) строки меняются с более поздним
+last_update, после чего один опрос должен донести изменения до индекса
+названий, подсказок, каталога жанров/лет, справочных данных и кэша результатов.
+"""
+
+import sqlite3
+
+import pytest
+from Project import benchmark, keyword_search, mysql_repo
+from Project.cache import MISSING
+from Project.refresher import CatalogRefresher
+from Project.suggest import suggest_index
+
+LATER = "2999-01-01 00:00:00"
+
+
+@pytest.fixture
+def sakila():
+    """Фикстура с включённым каталогом; отдаёт соединение для изменения данных."""
+    with benchmark.stand_ins(films=120, logs=0, seed=3) as path:
+        with benchmark.patched((mysql_repo.genre_catalog, "enabled", True)):
+            conn = sqlite3.connect(path, isolation_level=None)
+            try:
+                yield conn
+            finally:
+                conn.close()
+
+
+def test_refresh_without_changes_keeps_index(sakila):
+    refresher = CatalogRefresher(interval=0, full_interval=0)
+    refresher.full_refresh()
+    index = keyword_search.get_keyword_backend()._snapshot
+
+    assert refresher.refresh() == {"film": 0, "category": 0, "film_category": 0}
+    assert keyword_search.get_keyword_backend()._snapshot is index
+    assert refresher.stats()["full_refreshes"] == 1
+    assert refresher.stats()["refreshes"] == 1
+
+
+def test_refresh_applies_changed_films_and_genres(sakila):
+    refresher = CatalogRefresher(interval=0, full_interval=0)
+    refresher.full_refresh()
+    action_before = mysql_repo.count_by_genre_years("Action", 1990, 2030)
+    mysql_repo.result_cache.backend.set(("probe",), 1, 60)
+
+    sakila.execute("UPDATE film SET title = 'ZEBRA QUOKKA', last_update = ? WHERE film_id = 5", (LATER,))
+    sakila.execute("INSERT INTO film VALUES (1000, 'AARDVARK QUOKKA', 2030, ?)", (LATER,))
+    sakila.execute("INSERT INTO film_category VALUES (1000, 1, ?)", (LATER,))
+
+    delta = refresher.refresh()
+    assert delta == {"film": 2, "category": 0, "film_category": 1}
+
+    # Индекс названий: порядок ORDER BY title сохранён
+    found = keyword_search.search_titles("quokka", 10)
+    assert [row["film_id"] for row in found] == [1000, 5]
+    assert [s["value"] for s in suggest_index.suggest("quok")] == ["AARDVARK QUOKKA", "ZEBRA QUOKKA"]
+
+    # Каталог жанров и справочные данные видят новый фильм и новый год
+    assert mysql_repo.count_by_genre_years("Action", 1990, 2030) == action_before + 1
+    assert mysql_repo.get_min_max_year()[1] == 2030
+    assert mysql_repo.result_cache.stats()["entries"] == 0
+
+    # Копия совпадает с полной перезагрузкой
+    films, genres = refresher.films, refresher.film_genres
+    refresher.full_refresh()
+    assert films == refresher.films
+    assert {k: sorted(v) for k, v in genres.items()} == {k: sorted(v) for k, v in refresher.film_genres.items()}
+
+
+def test_category_rename_reloads_pairs(sakila):
+    refresher = CatalogRefresher(interval=0, full_interval=0)
+    refresher.full_refresh()
+    action = mysql_repo.count_by_genre_years("Action", 1990, 2025)
+
+    sakila.execute("UPDATE category SET name = 'Adventure', last_update = ? WHERE name = 'Action'", (LATER,))
+    assert refresher.refresh()["category"] == 1
+
+    assert "Adventure" in mysql_repo.get_genres()
+    assert mysql_repo.count_by_genre_years("Adventure", 1990, 2025) == action
+    assert mysql_repo.count_by_genre_years("Action", 1990, 2025) == 0
+
+
+def test_refresh_sees_changes_in_the_watermark_second(sakila):
+    """Строка, изменённая в ту же секунду, что и отметка (уже после опроса), не теряется."""
+    refresher = CatalogRefresher(interval=0, full_interval=0)
+    sakila.execute("UPDATE film SET last_update = ? WHERE film_id = 1", (LATER,))
+    refresher.full_refresh()
+    assert str(refresher.watermark) == LATER
+
+    sakila.execute("UPDATE film SET title = 'ZEBRA QUOKKA', last_update = ? WHERE film_id = 5", (LATER,))
+    assert refresher.refresh() == {"film": 1, "category": 0, "film_category": 0}
+    assert [row["film_id"] for row in keyword_search.search_titles("quokka", 10)] == [5]
+
+    # Строки на отметке уже применены - повторный опрос их не применяет
+    assert refresher.refresh() == {"film": 0, "category": 0, "film_category": 0}
+
+
+def test_refresh_invalidates_only_affected_results(sakila):
+    refresher = CatalogRefresher(interval=0, full_interval=0)
+    refresher.full_refresh()
+    film = next(f for f in refresher.films if f["film_id"] == 5)
+    genre = refresher.film_genres[5][0]
+    other_genre = next(g for g in refresher.genres if g not in refresher.film_genres[5])
+    year = film["release_year"]
+
+    backend = mysql_repo.result_cache.backend
+    keep = [
+        ("count_by_keyword", ("zzzz",), ()),
+        ("count_by_genre_years", (other_genre, 1990, 2030), ()),
+        ("count_by_genre_years", (genre, year + 1, 2030), ()),
+    ]
+    drop = [
+        ("count_by_keyword", (film["title"][:3].lower(),), ()),
+        ("count_by_keyword", ("quokka",), ()),
+        ("count_by_genre_years", (genre, 1990, 2030), ()),
+        ("count_rows_by_years_all_genres", (year, year), ()),
+        ("count_by_keyword_fulltext", ("zzzz",), ()),
+    ]
+    for key in keep + drop:
+        backend.set(key, 1, 60)
+
+    sakila.execute("UPDATE film SET title = 'ZEBRA QUOKKA', last_update = ? WHERE film_id = 5", (LATER,))
+    refresher.refresh()
+
+    assert [key for key in keep + drop if backend.get(key) is not MISSING] == keep
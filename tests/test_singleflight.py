@@ -0,0 +1,189 @@
+"""
+Тесты объединения одинаковых одновременных запросов (singleflight.py).
+
+Ведущий вызов блокируется событием, пока остальные не встанут в ожидание;
+проверяется, что функция выполнилась один раз, все получили один результат
+(или одно исключение), а счётчики по ключу это отражают.
+"""
+
+import asyncio
+import threading
+import time
+
+import pytest
+from Project.cache import ResultCache
+from Project.singleflight import SingleFlight
+
+WAITERS = 5
+
+
+def wait_for(condition, timeout: float = 5.0) -> None:
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.001)
+
+
+def run_threads(target, count: int = WAITERS) -> list:
+    results = [None] * count
+
+    def worker(i):
+        try:
+            results[i] = target()
+        except Exception as exc:
+            results[i] = exc
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    return threads, results
+
+
+def test_concurrent_calls_share_one_execution():
+    flight = SingleFlight()
+    release = threading.Event()
+    calls = []
+
+    def load():
+        calls.append(1)
+        release.wait(5)
+        return ["row"]
+
+    threads, results = run_threads(lambda: flight.do("k", load))
+    wait_for(lambda: flight.coalesced == WAITERS - 1)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert calls == [1]
+    assert results == [["row"]] * WAITERS
+    assert flight.key_stats("k") == {"executions": 1, "coalesced": WAITERS - 1}
+
+    # После завершения следующий вызов выполняется заново
+    assert flight.do("k", lambda: ["new"]) == ["new"]
+    assert flight.stats()["executions"] == 2
+    assert flight.stats()["in_flight"] == 0
+
+
+def test_error_is_shared_with_waiters():
+    flight = SingleFlight()
+    release = threading.Event()
+
+    def load():
+        release.wait(5)
+        raise RuntimeError("db down")
+
+    threads, results = run_threads(lambda: flight.do("k", load))
+    wait_for(lambda: flight.coalesced == WAITERS - 1)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert all(isinstance(r, RuntimeError) for r in results)
+    assert flight.do("k", lambda: 1) == 1
+
+
+def test_async_calls_share_one_execution():
+    flight = SingleFlight()
+    calls = []
+
+    async def load():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return 42
+
+    async def main():
+        return await asyncio.gather(*(flight.do_async("k", load) for _ in range(WAITERS)))
+
+    assert asyncio.run(main()) == [42] * WAITERS
+    assert calls == [1]
+    assert flight.key_stats("k") == {"executions": 1, "coalesced": WAITERS - 1}
+
+
+def test_async_error_is_shared():
+    flight = SingleFlight()
+
+    async def load():
+        await asyncio.sleep(0.01)
+        raise ValueError("bad")
+
+    async def main():
+        return await asyncio.gather(*(flight.do_async("k", load) for _ in range(3)), return_exceptions=True)
+
+    assert all(isinstance(r, ValueError) for r in asyncio.run(main()))
+
+
+def test_result_cache_coalesces_without_backend():
+    """Даже при выключенном кэше одинаковые одновременные поиски идут в базу один раз."""
+    cache = ResultCache(None, single_flight=SingleFlight())
+    release = threading.Event()
+    calls = []
+
+    @cache.cached("search")
+    def search(genre, limit):
+        calls.append(genre)
+        release.wait(5)
+        return [{"title": "A"}]
+
+    threads, results = run_threads(lambda: search("Action", 10))
+    wait_for(lambda: cache.single_flight.coalesced == WAITERS - 1)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert calls == ["Action"]
+    assert results == [[{"title": "A"}]] * WAITERS
+    # Каждый получил свою копию строк
+    assert len({id(r[0]) for r in results}) == WAITERS
+
+    top = cache.stats()["single_flight"]["top_keys"]
+    assert top == [{"key": "search('Action', 10)", "executions": 1, "coalesced": WAITERS - 1}]
+
+
+def test_stats_are_bounded():
+    flight = SingleFlight(max_keys=3)
+    for i in range(10):
+        flight.do(i, lambda: None)
+    assert flight.key_stats(0) == {"executions": 0, "coalesced": 0}
+    assert flight.key_stats(9) == {"executions": 1, "coalesced": 0}
+    assert flight.stats()["executions"] == 10
+
+
+@pytest.mark.parametrize("flight", [None, SingleFlight()])
+def test_result_cache_without_concurrency_is_unchanged(flight):
+    cache = ResultCache(None, single_flight=flight)
+    calls = []
+
+    @cache.cached("count")
+    def count(x):
+        calls.append(x)
+        return x
+
+    assert count(1) == 1 and count(1) == 1
+    assert calls == [1, 1]
+
+
+def test_async_cancelled_caller_does_not_cancel_others():
+    """Отмена ведущего (клиент отключился) не отменяет общий вызов для остальных."""
+    flight = SingleFlight()
+    calls = []
+
+    async def load():
+        calls.append(1)
+        await asyncio.sleep(0.02)
+        return "rows"
+
+    async def main():
+        leader = asyncio.ensure_future(flight.do_async("k", load))
+        await asyncio.sleep(0)
+        follower = asyncio.ensure_future(flight.do_async("k", load))
+        await asyncio.sleep(0)
+        leader.cancel()
+        result = await follower
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return result
+
+    assert asyncio.run(main()) == "rows"
+    assert calls == [1]
+    assert flight.stats()["in_flight"] == 0
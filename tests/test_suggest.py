@@ -0,0 +1,142 @@
+"""
+Тесты подсказок при вводе (suggest.py) и эндпоинта /api/suggest.
+Реальные базы не используются: индекс строится по списку фильмов.
+"""
+
+from fastapi.testclient import TestClient
+
+from Project import suggest, web_app
+from Project.suggest import SuggestIndex, SuggestSnapshot
+
+FILMS = [
+    {"film_id": 1, "title": "ACADEMY DINOSAUR"},
+    {"film_id": 2, "title": "ACE GOLDFINGER"},
+    {"film_id": 3, "title": "DINOSAUR SECRETARY"},
+    {"film_id": 4, "title": "MOON ACADEMY"},
+]
+GENRES = ["Action", "Animation", "Drama"]
+
+
+def values(result):
+    return [(s["kind"], s["value"]) for s in result]
+
+
+def test_prefix_matches_any_word_of_title():
+    index = SuggestSnapshot(FILMS, GENRES)
+
+    assert values(index.suggest("acad", 10)) == [("title", "ACADEMY DINOSAUR"), ("title", "MOON ACADEMY")]
+    assert values(index.suggest("  Dino", 10)) == [("title", "DINOSAUR SECRETARY"), ("title", "ACADEMY DINOSAUR")]
+    assert index.suggest("academy d", 10) == [{"value": "ACADEMY DINOSAUR", "kind": "title"}]
+    assert index.suggest("zzz", 10) == []
+    assert index.suggest("", 10) == []
+
+
+def test_genres_come_first_and_limit_is_respected():
+    index = SuggestSnapshot(FILMS, GENRES)
+
+    assert values(index.suggest("a", 3)) == [("genre", "Action"), ("genre", "Animation"), ("title", "ACADEMY DINOSAUR")]
+    assert len(index.suggest("a", 1)) == 1
+
+
+def test_title_listed_once_per_lookup():
+    index = SuggestSnapshot([{"film_id": 1, "title": "LOVE LOVE"}], [])
+    assert index.suggest("lo", 10) == [{"value": "LOVE LOVE", "kind": "title"}]
+
+
+def test_index_loads_lazily_and_rebuilds():
+    loads = []
+    index = SuggestIndex(lambda: loads.append(1) or FILMS, lambda: GENRES)
+
+    assert not index.built
+    assert index.suggest("moon")[0]["value"] == "MOON ACADEMY"
+    assert loads == [1]
+
+    index.build([{"film_id": 9, "title": "MOONLIGHT"}], GENRES)
+    assert index.suggest("moon") == [{"value": "MOONLIGHT", "kind": "title"}]
+    assert index.stats()["titles"] == 1
+
+
+def test_api_suggest(monkeypatch):
+    index = SuggestIndex(lambda: FILMS, lambda: GENRES)
+    monkeypatch.setattr(web_app, "suggest_index", index)
+    client = TestClient(web_app.app)
+
+    resp = client.get("/api/suggest", params={"prefix": "ac", "limit": 2})
+    assert resp.status_code == 200
+    assert resp.json() == {
+        "prefix": "ac",
+        "suggestions": [{"value": "Action", "kind": "genre"}, {"value": "ACADEMY DINOSAUR", "kind": "title"}],
+    }
+
+    assert client.get("/api/suggest", params={"prefix": "ac", "limit": 1000}).status_code == 422
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+def test_loaded_index_expires_without_refresher(monkeypatch):
+    """Без CatalogRefresher индекс, загруженный из MySQL, перестраивается после ttl."""
+    clock = Clock()
+    monkeypatch.setattr(suggest, "time", clock)
+    films = list(FILMS)
+    index = SuggestIndex(lambda: list(films), lambda: GENRES, ttl=60)
+    index.build()
+
+    films[3] = {"film_id": 4, "title": "MOONLIGHT ACADEMY"}
+    clock.now += 30
+    assert index.fresh
+    assert values(index.suggest("moon")) == [("title", "MOON ACADEMY")]
+
+    clock.now += 31
+    assert not index.fresh
+    assert values(index.suggest("moon")) == [("title", "MOONLIGHT ACADEMY")]
+    assert index.fresh
+
+
+def test_refresher_built_index_does_not_expire(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(suggest, "time", clock)
+    index = SuggestIndex(lambda: [], lambda: [], ttl=60)
+    index.build(FILMS, GENRES)
+
+    clock.now += 3600
+    assert index.fresh
+    assert values(index.suggest("moon")) == [("title", "MOON ACADEMY")]
+
+
+def test_failed_rebuild_keeps_stale_index(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(suggest, "time", clock)
+    films = [FILMS]
+
+    def load_films():
+        if films[0] is None:
+            raise RuntimeError("mysql down")
+        return films[0]
+
+    index = SuggestIndex(load_films, lambda: GENRES, ttl=60)
+    index.build()
+    films[0] = None
+    clock.now += 61
+
+    assert values(index.suggest("moon")) == [("title", "MOON ACADEMY")]
+    assert index.fresh
+
+
+def test_api_suggest_rebuilds_stale_index(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(suggest, "time", clock)
+    films = list(FILMS)
+    index = SuggestIndex(lambda: list(films), lambda: GENRES, ttl=60)
+    index.build()
+    monkeypatch.setattr(web_app, "suggest_index", index)
+    client = TestClient(web_app.app)
+
+    del films[3]
+    clock.now += 61
+    assert client.get("/api/suggest", params={"prefix": "moon"}).json()["suggestions"] == []
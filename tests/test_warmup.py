@@ -0,0 +1,65 @@
+"""
+Тесты прогрева кэша результатов (warmup.py).
+
+На SQLite-фикстуре и mongomock-логе (из benchmark.py) прогрев должен
+положить в кэш первые страницы и количества самых частых поисков
+с теми же ключами, что используют веб-обработчики, и уважать бюджет времени.
+"""
+
+import pytest
+from Project import benchmark, mongo, mysql_repo, warmup
+from Project.cache import MemoryLRUBackend
+
+
+@pytest.fixture
+def sakila():
+    backend = mysql_repo.result_cache.backend
+    mysql_repo.result_cache.set_backend(MemoryLRUBackend(1000, 16 * 1024 * 1024))
+    try:
+        with benchmark.stand_ins(films=100, logs=200, seed=11):
+            yield
+    finally:
+        mysql_repo.result_cache.set_backend(backend)
+
+
+def test_warm_cache_fills_first_pages_and_counts(sakila):
+    report = warmup.warm_cache(top=5, budget=30, page_size=10)
+
+    assert report["queries"] == 5
+    assert report["warmed"] == 5
+    assert report["failed"] == 0 and report["out_of_budget"] is False
+
+    # Самый частый поиск по жанру теперь отвечает из кэша
+    genre_search = next(d for d in mongo.top_queries(50) if d["search_type"] == "genre__years_range")
+    report = warmup.warm_cache(top=50, budget=30, page_size=10)
+    assert report["warmed"] == report["queries"]
+
+    calls = warmup.warmup_calls(genre_search["search_type"], genre_search["params"], 10)
+    hits = mysql_repo.result_cache.hits
+    for func, args, kwargs in calls:
+        func(*args, **kwargs)
+    assert mysql_repo.result_cache.hits == hits + len(calls)
+
+
+def test_warm_cache_respects_budget(sakila):
+    report = warmup.warm_cache(top=5, budget=0, page_size=10)
+    assert report["warmed"] == 0
+    assert report["skipped"] == 5
+    assert report["out_of_budget"] is True
+
+
+def test_warm_cache_skips_when_cache_disabled(sakila):
+    mysql_repo.result_cache.set_backend(None)
+    assert warmup.warm_cache(top=5, budget=30)["queries"] == 0
+
+
+def test_warmup_calls_match_web_arguments():
+    """Аргументы совпадают с вызовами web_app.run_*_search на первой странице."""
+    calls = warmup.warmup_calls("genre__years_range", {"genre": "All", "years_range": "2000-2005"}, 10)
+    assert [(f.__name__, a, k) for f, a, k in calls] == [
+        ("search_by_years_all_genres_with_total", (2000, 2005, 10), {"offset": 0}),
+        ("count_rows_by_years_all_genres", (2000, 2005), {}),
+    ]
+    assert warmup.warmup_calls("genre__years_range", {"genre": "Action", "years_range": "bad"}, 10) == []
+    assert warmup.warmup_calls("keyword", {"keyword": " "}, 10) == []
+    assert warmup.warmup_calls("unknown", {}, 10) == []
@@ -5,14 +5,20 @@
 """
 
 
+from datetime import datetime, timezone
+
+import pytest
+from fastapi.responses import JSONResponse
 from fastapi.testclient import TestClient
-from Project import web_app
+from Project import benchmark, mysql_repo, web_app
 
 
 def test_index_page(monkeypatch):
     # Подменяем функции, которые идут в MySQL
-    monkeypatch.setattr(web_app, "get_genres", lambda: ["Action", "Comedy"])
-    monkeypatch.setattr(web_app, "get_min_max_year", lambda: (1990, 2025))
+    monkeypatch.setattr(
+        web_app, "get_reference_data",
+        lambda: mysql_repo.ReferenceData(("Action", "Comedy"), frozenset({"Action", "Comedy"}), 1990, 2025),
+    )
 
     client = TestClient(web_app.app)
     resp = client.get("/")
@@ -26,4 +32,279 @@ def test_stats_page(monkeypatch):
 
     client = TestClient(web_app.app)
     resp = client.get("/stats")
-    assert resp.status_code == 200
\ No newline at end of file
+    assert resp.status_code == 200
+
+class FakeCursor:
+    """Курсор-заглушка: запоминает выполненные SQL и возвращает одну строку."""
+
+    description = [("film_id",), ("title",), ("release_year",)]
+
+    def __init__(self, executed):
+        self.executed = executed
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+    def execute(self, sql, params=()):
+        self.executed.append((sql, params))
+
+    def fetchall(self):
+        return [(1, "ACADEMY DINOSAUR", 2006)]
+
+    def fetchone(self):
+        return (1,)
+
+
+class FakeConnection:
+    def __init__(self, executed):
+        self.executed = executed
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+    def cursor(self):
+        return FakeCursor(self.executed)
+
+
+def test_keyword_search_uses_cursor(monkeypatch):
+    """
+    Если в URL передан cursor - используется keyset-запрос (без OFFSET),
+    и next_url содержит курсор следующей страницы.
+    """
+    from Project import queries, mysql_repo, keyword_search
+    from Project.pagination import encode_cursor
+
+    executed = []
+    monkeypatch.setattr(mysql_repo, "get_mysql_connection", lambda: FakeConnection(executed))
+    monkeypatch.setattr(web_app, "log_query", lambda *args: None)
+    monkeypatch.setattr(keyword_search, "_backend", keyword_search.SqlLikeBackend())
+    mysql_repo.result_cache.clear()
+
+    token = encode_cursor("keyword", {"film_id": 1, "title": "ACADEMY"})
+    client = TestClient(web_app.app)
+    resp = client.get("/search/keyword", params={"keyword": "academy", "page": 2, "cursor": token})
+
+    assert resp.status_code == 200
+    assert executed[0][0] == queries.SEARCH_BY_KEYWORD_AFTER
+    assert executed[0][1] == ("%academy%", "ACADEMY", 1, web_app.PAGE_SIZE)
+
+
+def test_keyword_search_invalid_cursor(monkeypatch):
+    """Повреждённый курсор - страница с ошибкой, без запросов к MySQL."""
+    from Project import mysql_repo
+
+    executed = []
+    monkeypatch.setattr(mysql_repo, "get_mysql_connection", lambda: FakeConnection(executed))
+
+    client = TestClient(web_app.app)
+    resp = client.get("/search/keyword", params={"keyword": "academy", "cursor": "broken"})
+
+    assert resp.status_code == 200
+    assert executed == []
+
+
+def test_genre_validation_uses_cached_reference(monkeypatch):
+    """Неверный жанр отклоняется по кэшу справочников, без запросов к MySQL."""
+    from Project import mysql_repo
+
+    executed = []
+    monkeypatch.setattr(mysql_repo, "get_mysql_connection", lambda: FakeConnection(executed))
+    monkeypatch.setattr(
+        mysql_repo._reference_cache,
+        "get",
+        lambda: mysql_repo.ReferenceData(("Action",), frozenset({"Action"}), 2000, 2010),
+    )
+
+    client = TestClient(web_app.app)
+    resp = client.get("/search/genre", params={"genre": "Unknown", "year_from": 2000, "year_to": 2005})
+
+    assert resp.status_code == 200
+    assert "Неверный жанр" in resp.text
+    assert executed == []
+
+
+def test_genre_search_page_and_total_in_one_call(monkeypatch):
+    """
+    Первая страница: страница и total приходят одним вызовом (*_with_total),
+    отдельный COUNT не выполняется, total показывается и передаётся в next_url.
+    """
+    from Project import mysql_repo
+
+    rows = [{"film_id": i, "title": f"FILM {i}", "release_year": 2006, "genre": "Action"}
+            for i in range(web_app.PAGE_SIZE)]
+    logged = []
+
+    monkeypatch.setattr(
+        mysql_repo._reference_cache,
+        "get",
+        lambda: mysql_repo.ReferenceData(("Action",), frozenset({"Action"}), 2000, 2010),
+    )
+    monkeypatch.setattr(
+        web_app,
+        "search_by_genre_years_with_total",
+        lambda *args, **kwargs: mysql_repo.SearchPage(rows, 25, 25),
+    )
+    monkeypatch.setattr(web_app, "count_by_genre_years", lambda *args: pytest.fail("extra COUNT"))
+    monkeypatch.setattr(web_app, "log_query", lambda *args: logged.append(args))
+
+    client = TestClient(web_app.app)
+    resp = client.get("/search/genre", params={"genre": "Action", "year_from": 2000, "year_to": 2010})
+
+    assert resp.status_code == 200
+    assert "Page 1 of 3" in resp.text
+    assert "total=25" in resp.text
+    assert logged[0][2] == 25
+
+
+def test_fetch_page_with_total_strips_service_columns():
+    """Служебные колонки total_count / total_films убираются из строк."""
+    from Project import mysql_repo
+
+    class Cursor:
+        description = [("film_id",), ("title",), ("total_count",), ("total_films",)]
+
+        def fetchall(self):
+            return [(1, "A", 3, 2), (2, "B", 3, 2)]
+
+    rows, total, total_films = mysql_repo.fetch_page_with_total(Cursor())
+
+    assert rows == [{"film_id": 1, "title": "A"}, {"film_id": 2, "title": "B"}]
+    assert (total, total_films) == (3, 2)
+
+
+def test_async_data_access_genre_search(monkeypatch):
+    """Режим WEB_ASYNC_DRIVERS: обработчик берёт данные из async_repo."""
+    from Project import async_repo, mysql_repo
+
+    rows = [{"film_id": 1, "title": "FILM 1", "release_year": 2006}]
+    logged = []
+
+    async def reference_data():
+        return mysql_repo.ReferenceData(("Action",), frozenset({"Action"}), 2000, 2010)
+
+    async def page_with_total(*args, **kwargs):
+        return mysql_repo.SearchPage(rows, 1, 1)
+
+    monkeypatch.setattr(async_repo, "get_reference_data", reference_data)
+    monkeypatch.setattr(async_repo, "search_by_genre_years_with_total", page_with_total)
+    monkeypatch.setattr(web_app, "search_by_genre_years_with_total", lambda *a, **k: pytest.fail("sync call"))
+    monkeypatch.setattr(web_app, "log_query", lambda *args: logged.append(args))
+    monkeypatch.setattr(web_app, "data_access", web_app.AsyncDataAccess())
+
+    client = TestClient(web_app.app)
+    resp = client.get("/search/genre", params={"genre": "Action", "year_from": 2000, "year_to": 2010})
+
+    assert resp.status_code == 200
+    assert "FILM 1" in resp.text
+    assert logged[0][2] == 1
+
+
+def test_api_search_genre_returns_rows_total_and_cursor(monkeypatch):
+    """JSON API: строки, total и токен продолжения; проверки - как у HTML-страниц."""
+    from Project import mysql_repo
+    from Project.pagination import decode_cursor
+
+    rows = [{"film_id": i, "title": f"FILM {i}", "release_year": 2006, "genre": "Action"}
+            for i in range(web_app.PAGE_SIZE)]
+
+    monkeypatch.setattr(
+        mysql_repo._reference_cache,
+        "get",
+        lambda: mysql_repo.ReferenceData(("Action",), frozenset({"Action"}), 2000, 2010),
+    )
+    monkeypatch.setattr(
+        web_app,
+        "search_by_genre_years_with_total",
+        lambda *args, **kwargs: mysql_repo.SearchPage(rows, 25, 25),
+    )
+    monkeypatch.setattr(web_app, "log_query", lambda *args: None)
+
+    client = TestClient(web_app.app)
+    data = client.get(
+        "/api/search/genre", params={"genre": "Action", "year_from": 2000, "year_to": 2010}
+    ).json()
+
+    assert data["rows"] == rows
+    assert data["total"] == 25
+    assert decode_cursor("genre_years", data["next_cursor"]) == (2006, "FILM 9", 9)
+    assert data["next_url"].startswith("/api/search/genre?")
+
+    resp = client.get("/api/search/genre", params={"genre": "Nope", "year_from": 2000, "year_to": 2010})
+    assert resp.status_code == 400
+    assert resp.json() == {"error": "Неверный жанр. Выберите жанр из списка."}
+
+
+@pytest.mark.parametrize("response_class", [web_app.APIResponse, JSONResponse])
+def test_api_stats(monkeypatch, response_class):
+    """Статистика (с datetime) сериализуется и с orjson, и без него (JSONResponse)."""
+    monkeypatch.setattr(web_app, "APIResponse", response_class)
+    row = {"_id": "k", "search_type": "keyword", "params": {"keyword": "ace"}, "count": 2}
+    last = {"search_type": "keyword", "params": {"keyword": "ace"},
+            "timestamp": datetime(2026, 1, 21, 12, tzinfo=timezone.utc)}
+    monkeypatch.setattr(web_app, "stats_top5_frequency", lambda: [row])
+    monkeypatch.setattr(web_app, "stats_last5_unique", lambda: [last])
+
+    data = TestClient(web_app.app).get("/api/stats").json()
+
+    assert data == {
+        "top5": [{"search_type": "keyword", "params": {"keyword": "ace"}, "count": 2}],
+        "last5": [{"search_type": "keyword", "params": {"keyword": "ace"}, "timestamp": "2026-01-21T12:00:00+00:00"}],
+    }
+
+
+def test_all_genres_cursor_without_total_reaches_last_row(monkeypatch):
+    """
+    Курсор без total: страницы считаются по строкам (COUNT(*)), а не по фильмам -
+    иначе у фильмов с двумя жанрами последняя страница терялась.
+    """
+    monkeypatch.setattr(web_app, "log_query", lambda *args: None)
+    with benchmark.stand_ins(films=80, logs=0, seed=7):
+        expected = sum(1 for _ in mysql_repo.iter_search_by_genre_years("All", 1990, 2025))
+        assert expected > mysql_repo.count_by_years_all_genres(1990, 2025)
+
+        client = TestClient(web_app.app)
+        params = {"genre": "All", "year_from": 1990, "year_to": 2025}
+        body = client.get("/api/search/genre", params=params).json()
+        seen = len(body["rows"])
+        page = 1
+        while body["next_cursor"]:
+            page += 1
+            body = client.get(
+                "/api/search/genre", params={**params, "page": page, "cursor": body["next_cursor"]}
+            ).json()
+            seen += len(body["rows"])
+
+        assert seen == expected
+
+
+def test_stats_do_not_wait_for_query_log(monkeypatch):
+    """Статистика только просит дописать очередь логов и не ждёт MongoDB."""
+    timeouts = []
+    monkeypatch.setattr(web_app, "flush_query_log", lambda timeout: timeouts.append(timeout))
+    monkeypatch.setattr(web_app, "stats_top5_frequency", lambda: [])
+    monkeypatch.setattr(web_app, "stats_last5_unique", lambda: [])
+
+    assert TestClient(web_app.app).get("/api/stats").status_code == 200
+    assert timeouts == [0]
+
+
+def test_genre_validation_reads_reference_once(monkeypatch):
+    """Жанры и границы лет для проверки - одно чтение справочников на запрос."""
+    reads = []
+
+    def reference_data():
+        reads.append(1)
+        return mysql_repo.ReferenceData(("Action",), frozenset({"Action"}), 1990, 2025)
+
+    monkeypatch.setattr(web_app, "get_reference_data", reference_data)
+    client = TestClient(web_app.app)
+
+    assert client.get("/api/search/genre", params={"genre": "Nope", "year_from": 2000, "year_to": 2010}).status_code == 400
+    assert client.get("/export", params={"genre": "Nope", "year_from": 2000, "year_to": 2010}).status_code == 400
+    assert reads == [1, 1]
@@ -0,0 +1,118 @@
+# warmup.py
+"""
+Прогрев кэша результатов самыми частыми поисками из лога MongoDB.
+
+После каждого деплоя кэш результатов пуст, и первые пользователи популярных
+поисков ждут запросов к MySQL. Прогрев берёт Top N комбинаций
+(search_type, params) - те же, что в статистике "Top 5" (mongo.top_queries) -
+и заранее выполняет для каждой первую страницу и количество с теми же
+аргументами, что и веб-обработчики (ключи кэша совпадают).
+
+Время ограничено бюджетом (секунды): когда он исчерпан, оставшиеся поиски
+пропускаются. Запускается при старте веб-приложения (web_app.lifespan,
+настройки CACHE_WARMUP_QUERIES, CACHE_WARMUP_BUDGET): кэш в памяти живёт
+в своём процессе, поэтому прогревать его отдельной командой бесполезно,
+а CLI (flows.py) листает страницы курсором с другими ключами кэша.
+"""
+
+import logging
+import time
+
+from Project import local_settings, mongo
+from Project.keyword_search import count_titles, search_titles_with_total
+from Project.mysql_repo import (
+    count_by_genre_years,
+    count_rows_by_years_all_genres,
+    result_cache,
+    search_by_genre_years_with_total,
+    search_by_years_all_genres_with_total,
+)
+
+logger = logging.getLogger(__name__)
+
+# Сколько самых частых поисков прогревать при старте (0 - прогрев выключен)
+CACHE_WARMUP_QUERIES = getattr(local_settings, "CACHE_WARMUP_QUERIES", 20)
+
+# Сколько секунд можно потратить на прогрев при старте
+CACHE_WARMUP_BUDGET = getattr(local_settings, "CACHE_WARMUP_BUDGET", 5.0)
+
+# Размер страницы - как web_app.PAGE_SIZE (иначе ключи кэша не совпадут)
+DEFAULT_PAGE_SIZE = 10
+
+
+def warmup_calls(search_type: str, params: dict, page_size: int) -> list[tuple]:
+    """
+    Вызовы (функция, args, kwargs) для первой страницы и количества одного поиска.
+    Пустой список - поиск не распознан (старый формат лога и т.п.).
+    """
+    if search_type == "keyword":
+        keyword = (params.get("keyword") or "").strip()
+        if not keyword:
+            return []
+        return [
+            (search_titles_with_total, (keyword, page_size), {"offset": 0}),
+            (count_titles, (keyword,), {}),
+        ]
+
+    if search_type == "genre__years_range":
+        genre = (params.get("genre") or "").strip()
+        try:
+            year_from, year_to = (int(y) for y in params.get("years_range", "").split("-"))
+        except ValueError:
+            return []
+        if not genre:
+            return []
+        if genre == "All":
+            return [
+                (search_by_years_all_genres_with_total, (year_from, year_to, page_size), {"offset": 0}),
+                (count_rows_by_years_all_genres, (year_from, year_to), {}),
+            ]
+        return [
+            (search_by_genre_years_with_total, (genre, year_from, year_to, page_size), {"offset": 0}),
+            (count_by_genre_years, (genre, year_from, year_to), {}),
+        ]
+
+    return []
+
+
+def warm_cache(
+        top: int = CACHE_WARMUP_QUERIES,
+        budget: float = CACHE_WARMUP_BUDGET,
+        page_size: int = DEFAULT_PAGE_SIZE,
+) -> dict:
+    """
+    Выполняет первые страницы и количества Top N поисков, пока не истёк budget.
+    Ошибка одного поиска не останавливает прогрев. Возвращает отчёт.
+    """
+    started = time.monotonic()
+    deadline = started + budget
+    report = {"queries": 0, "warmed": 0, "skipped": 0, "failed": 0, "out_of_budget": False}
+
+    if top <= 0 or result_cache.backend is None:
+        report["elapsed"] = 0.0
+        return report
+
+    searches = mongo.top_queries(top)
+    report["queries"] = len(searches)
+    for pos, doc in enumerate(searches):
+        if time.monotonic() >= deadline:
+            report["out_of_budget"] = True
+            report["skipped"] += len(searches) - pos
+            break
+
+        calls = warmup_calls(doc.get("search_type"), doc.get("params") or {}, page_size)
+        if not calls:
+            report["skipped"] += 1
+            continue
+        try:
+            for func, args, kwargs in calls:
+                func(*args, **kwargs)
+        except Exception:
+            logger.warning("Cache warm-up failed for %s %s", doc.get("search_type"), doc.get("params"),
+                           exc_info=True)
+            report["failed"] += 1
+            continue
+        report["warmed"] += 1
+
+    report["elapsed"] = round(time.monotonic() - started, 3)
+    return report
@@ -4,8 +4,17 @@ FastAPI web-приложение для поиска фильмов (MySQL) и 
 
 Функциональность:
 - Главная страница: поиск по keyword + поиск по genre и диапазону лет
-- Результаты: пагинация (PAGE_SIZE)
+- Результаты: пагинация (PAGE_SIZE); по умолчанию keyset - next_url содержит
+  непрозрачный курсор (cursor) последней строки, OFFSET остаётся запасным вариантом
 - Статистика: Top 5 по частоте и Last 5 unique (MongoDB)
+- Экспорт: полный результат поиска в CSV / NDJSON потоком (/export)
+- JSON API: /api/search/keyword, /api/search/genre, /api/stats,
+  /api/suggest (подсказки при вводе из индекса в памяти)
+  (те же проверки и логирование, что и у HTML-страниц)
+- Метрики: задержки маршрутов, запросов к базам и шаблонов (/metrics, формат Prometheus)
+
+Обработчики страниц - async def, доступ к данным через data_access
+(пул потоков или неблокирующие драйверы, настройка WEB_ASYNC_DRIVERS).
 
 Логирование:
 - 1 запись на 1 поиск (ТОЛЬКО при page == 1)
@@ -17,299 +26,817 @@ FastAPI web-приложение для поиска фильмов (MySQL) и 
 - years: проверяем, что переданы оба года, порядок и границы (min_y..max_y)
 """
 
+import asyncio
+from contextlib import asynccontextmanager
+import logging
 from pathlib import Path
-import re
-
-import mysql.connector
-from fastapi import FastAPI, Request
-from fastapi.responses import HTMLResponse
+import time
+from typing import NamedTuple
+from urllib.parse import urlencode
+
+from fastapi import FastAPI, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import HTMLResponse, PlainTextResponse, StreamingResponse
 from fastapi.templating import Jinja2Templates
 
-from Project import queries
-from Project.local_settings import dbconfig
+try:
+    # Быстрая сериализация JSON API (orjson - необязательная зависимость)
+    import orjson  # noqa: F401
+    from fastapi.responses import ORJSONResponse as APIResponse
+except ImportError:  # pragma: no cover - зависит от окружения
+    from fastapi.responses import JSONResponse as APIResponse
+
+from Project import async_repo, local_settings
+from Project.metrics import METRICS_ENABLED, observe_template, record_request, render_metrics
+from Project.profiler import slow_query_log
+from Project.refresher import CATALOG_REFRESH_INTERVAL, catalog_refresher, get_refresh_stats
+from Project.suggest import SUGGEST_LIMIT, SUGGEST_MAX_LIMIT, build_suggest_index, suggest_index
+from Project.warmup import CACHE_WARMUP_BUDGET, CACHE_WARMUP_QUERIES, warm_cache
+from Project.pagination import encode_cursor, decode_cursor
+from Project.export import EXPORT_FORMATS, export_keyword, export_genre_years
+from Project.keyword_search import (
+    search_titles,
+    search_titles_with_total,
+    count_titles,
+    build_keyword_index,
+    keyword_error
+)
+from Project.mysql_repo import (
+    ReferenceData,
+    get_reference_data,
+    search_by_genre_years,
+    search_by_years_all_genres,
+    search_by_genre_years_with_total,
+    search_by_years_all_genres_with_total,
+    count_by_genre_years,
+    count_by_years_all_genres,
+    count_rows_by_years_all_genres,
+    get_pool_stats,
+    get_result_cache_stats,
+    get_genre_catalog_stats,
+    build_genre_catalog,
+    close_pool
+)
 from Project.mongo import (
+    QUERY_LOG_ASYNC,
     stats_top5_frequency,
     stats_last5_unique,
-    log_query
+    log_query,
+    log_export,
+    flush_query_log,
+    stats_top_and_last,
+    use_stats_facet,
+    ensure_indexes,
+    close_mongo_client
 )
 
+logger = logging.getLogger(__name__)
+
 # Количество результатов на странице (пагинация)
 PAGE_SIZE = 10
 
+# Режим пагинации: "keyset" (курсор в next_url) или "offset" (только номер страницы)
+PAGINATION_MODE = getattr(local_settings, "PAGINATION_MODE", "keyset")
+
+# Доступ к данным из async-обработчиков:
+# False - sync-драйверы (mysql.connector / pymongo) в пуле потоков,
+# True  - неблокирующие драйверы (aiomysql / AsyncMongoClient, см. async_repo.py)
+WEB_ASYNC_DRIVERS = getattr(local_settings, "WEB_ASYNC_DRIVERS", False)
+
 # Абсолютный путь до директории, где лежит web_app.py
 BASE_DIR = Path(__file__).resolve().parent
 
 # Шаблоны находятся в папке templates рядом с web_app.py
 templates = Jinja2Templates(directory=str(BASE_DIR / 'templates'))
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Жизненный цикл приложения:
+    - при старте строим индекс названий для поиска по ключевому слову, индекс подсказок,
+      каталог жанров/лет (если GENRE_CATALOG) и создаём индексы MongoDB для статистики;
+      при CATALOG_REFRESH_INTERVAL индексы и каталог загружает CatalogRefresher и дальше
+      обновляет по изменённым строкам в фоне
+    - прогреваем кэш результатов самыми частыми поисками из лога (warmup.py)
+    - при остановке освобождаем соединения
+    """
+    if WEB_ASYNC_DRIVERS:
+        # Без драйверов async-режим работать не может - падаем сразу при старте
+        async_repo.check_drivers()
+    if CATALOG_REFRESH_INTERVAL:
+        try:
+            # Полная загрузка строит индекс, каталог и справочные данные за один проход
+            catalog_refresher.full_refresh()
+        except Exception:
+            # Следующий опрос фонового потока попробует загрузить всё заново
+            logger.exception("Catalog was not loaded at startup")
+        catalog_refresher.start()
+    else:
+        try:
+            build_keyword_index()
+        except Exception:
+            # Без индекса приложение всё равно работает: он построится при первом поиске
+            logger.exception("Keyword index was not built at startup")
+        try:
+            build_genre_catalog()
+        except Exception:
+            # Без каталога поиск по жанру идёт в MySQL, пока каталог не построится при первом поиске
+            logger.exception("Genre catalog was not built at startup")
+        try:
+            build_suggest_index()
+        except Exception:
+            # Индекс подсказок построится при первом запросе /api/suggest
+            logger.exception("Suggest index was not built at startup")
+    try:
+        ensure_indexes()
+    except Exception:
+        logger.exception("MongoDB indexes were not created at startup")
+    if CACHE_WARMUP_QUERIES:
+        try:
+            # Прогрев сам останавливается по бюджету; wait_for - на случай одного долгого запроса
+            report = await asyncio.wait_for(
+                run_in_threadpool(warm_cache, CACHE_WARMUP_QUERIES, CACHE_WARMUP_BUDGET, PAGE_SIZE),
+                timeout=CACHE_WARMUP_BUDGET + 1.0,
+            )
+            logger.info("Result cache warm-up: %s", report)
+        except asyncio.TimeoutError:
+            logger.warning("Result cache warm-up did not finish within %ss", CACHE_WARMUP_BUDGET)
+        except Exception:
+            logger.exception("Result cache was not warmed at startup")
+    yield
+    catalog_refresher.stop()
+    # Дожидаемся фоновых EXPLAIN, пока пул ещё открыт
+    slow_query_log.wait()
+    if WEB_ASYNC_DRIVERS:
+        await async_repo.close()
+    close_pool()
+    close_mongo_client()
+
+
 # Экземпляр FastAPI-приложения
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
+
+
+if METRICS_ENABLED:
+    @app.middleware("http")
+    async def metrics_middleware(request: Request, call_next):
+        """Время, статус и ошибки каждого запроса (метка - шаблон маршрута, а не URL)."""
+        started = time.perf_counter()
+        status = 500
+        try:
+            response = await call_next(request)
+            status = response.status_code
+            return response
+        finally:
+            route = request.scope.get("route")
+            record_request(
+                route.path if route is not None else "unmatched",
+                request.method,
+                status,
+                time.perf_counter() - started,
+            )
 
 
 # -------------------------
-# MySQL helpers
+# Data access
 # -------------------------
 
-def get_mysql_connection():
-    """Создаёт подключение к MySQL."""
-    return mysql.connector.connect(**dbconfig, autocommit=True)
+class ThreadedDataAccess:
+    """
+    Sync-функции репозиториев, вызванные в пуле потоков:
+    event loop не блокируется, но число одновременных запросов
+    ограничено размером пула потоков.
+    Имена функций берутся из модуля в момент вызова (их можно подменить в тестах).
+    """
+
+    async def reference_data(self) -> ReferenceData:
+        """Жанры и границы лет одним чтением (из кэша справочников)."""
+        return await run_in_threadpool(get_reference_data)
+
+    async def search_titles(self, keyword, limit, offset=0, after=None):
+        return await run_in_threadpool(search_titles, keyword, limit, offset=offset, after=after)
+
+    async def search_titles_with_total(self, keyword, limit, offset=0):
+        return await run_in_threadpool(search_titles_with_total, keyword, limit, offset=offset)
+
+    async def count_titles(self, keyword):
+        return await run_in_threadpool(count_titles, keyword)
+
+    async def search_by_genre_years(self, genre, year_from, year_to, limit, offset=0, after=None):
+        return await run_in_threadpool(
+            search_by_genre_years, genre, year_from, year_to, limit, offset=offset, after=after
+        )
+
+    async def search_by_years_all_genres(self, year_from, year_to, limit, offset=0, after=None):
+        return await run_in_threadpool(
+            search_by_years_all_genres, year_from, year_to, limit, offset=offset, after=after
+        )
+
+    async def search_by_genre_years_with_total(self, genre, year_from, year_to, limit, offset=0):
+        return await run_in_threadpool(
+            search_by_genre_years_with_total, genre, year_from, year_to, limit, offset=offset
+        )
+
+    async def search_by_years_all_genres_with_total(self, year_from, year_to, limit, offset=0):
+        return await run_in_threadpool(
+            search_by_years_all_genres_with_total, year_from, year_to, limit, offset=offset
+        )
+
+    async def count_by_genre_years(self, genre, year_from, year_to):
+        return await run_in_threadpool(count_by_genre_years, genre, year_from, year_to)
+
+    async def count_by_years_all_genres(self, year_from, year_to):
+        return await run_in_threadpool(count_by_years_all_genres, year_from, year_to)
+
+    async def count_rows_by_years_all_genres(self, year_from, year_to):
+        return await run_in_threadpool(count_rows_by_years_all_genres, year_from, year_to)
+
+    async def stats_top5_frequency(self):
+        return await run_in_threadpool(stats_top5_frequency)
+
+    async def stats_last5_unique(self):
+        return await run_in_threadpool(stats_last5_unique)
+
+    async def stats_top_and_last(self) -> tuple[list[dict], list[dict]]:
+        """Top 5 и Last 5: одним $facet или двумя запросами одновременно."""
+        if use_stats_facet():
+            return await self._stats_facet()
+        top5, last5 = await asyncio.gather(self.stats_top5_frequency(), self.stats_last5_unique())
+        return top5, last5
+
+    async def _stats_facet(self):
+        return await run_in_threadpool(stats_top_and_last)
+
+    def request_log_flush(self) -> None:
+        """Просит фоновый writer дописать очередь логов, не дожидаясь записи."""
+        flush_query_log(timeout=0)
 
+    async def log_query(self, search_type, params, results_count):
+        if QUERY_LOG_ASYNC:
+            # Только кладёт запись в очередь фонового writer-а - не блокирует
+            log_query(search_type, params, results_count)
+        else:
+            await run_in_threadpool(log_query, search_type, params, results_count)
 
-def fetch_all(cursor) -> list[dict]:
+
+class AsyncDataAccess(ThreadedDataAccess):
     """
-    Преобразует результат cursor.fetchall() в список словарей:
-    [{col1: val1, col2: val2, ...}, ...]
+    MySQL и MongoDB через неблокирующие драйверы (async_repo.py):
+    один worker обслуживает много одновременных поисков.
+    Логирование и flush остаются как в ThreadedDataAccess (очередь writer-а).
     """
-    cols = [d[0] for d in cursor.description]
-    return [dict(zip(cols, row)) for row in cursor.fetchall()]
 
+    async def reference_data(self) -> ReferenceData:
+        return await async_repo.get_reference_data()
+
+    async def search_titles(self, keyword, limit, offset=0, after=None):
+        return await async_repo.search_titles(keyword, limit, offset=offset, after=after)
+
+    async def search_titles_with_total(self, keyword, limit, offset=0):
+        return await async_repo.search_titles_with_total(keyword, limit, offset=offset)
+
+    async def count_titles(self, keyword):
+        return await async_repo.count_titles(keyword)
+
+    async def search_by_genre_years(self, genre, year_from, year_to, limit, offset=0, after=None):
+        return await async_repo.search_by_genre_years(
+            genre, year_from, year_to, limit, offset=offset, after=after
+        )
+
+    async def search_by_years_all_genres(self, year_from, year_to, limit, offset=0, after=None):
+        return await async_repo.search_by_years_all_genres(
+            year_from, year_to, limit, offset=offset, after=after
+        )
+
+    async def search_by_genre_years_with_total(self, genre, year_from, year_to, limit, offset=0):
+        return await async_repo.search_by_genre_years_with_total(
+            genre, year_from, year_to, limit, offset=offset
+        )
+
+    async def search_by_years_all_genres_with_total(self, year_from, year_to, limit, offset=0):
+        return await async_repo.search_by_years_all_genres_with_total(
+            year_from, year_to, limit, offset=offset
+        )
 
-def get_genres() -> list[str]:
-    """Возвращает список жанров из MySQL."""
-    with get_mysql_connection() as conn:
-        with conn.cursor() as cursor:
-            cursor.execute(queries.SHOW_GENRES)
-            return [r[0] for r in cursor.fetchall()]
+    async def count_by_genre_years(self, genre, year_from, year_to):
+        return await async_repo.count_by_genre_years(genre, year_from, year_to)
 
+    async def count_by_years_all_genres(self, year_from, year_to):
+        return await async_repo.count_by_years_all_genres(year_from, year_to)
 
-def get_min_max_year() -> tuple[int, int]:
-    """Возвращает минимальный и максимальный год релиза в базе."""
-    with get_mysql_connection() as conn:
-        with conn.cursor() as cursor:
-            cursor.execute(queries.MIN_MAX_YEAR)
-            row = cursor.fetchone()
-            return int(row[0]), int(row[1])
+    async def count_rows_by_years_all_genres(self, year_from, year_to):
+        return await async_repo.count_rows_by_years_all_genres(year_from, year_to)
+
+    async def stats_top5_frequency(self):
+        return await async_repo.stats_top5_frequency()
+
+    async def stats_last5_unique(self):
+        return await async_repo.stats_last5_unique()
+
+    async def _stats_facet(self):
+        return await async_repo.stats_top_and_last()
+
+
+data_access = AsyncDataAccess() if WEB_ASYNC_DRIVERS else ThreadedDataAccess()
 
 
 # -------------------------
-# Routes (страницы)
+# Helpers
 # -------------------------
 
-@app.get("/", response_class=HTMLResponse)
-def index(request: Request):
-    """Главная страница с формой поиска"""
-    genres = ["All"] + get_genres()
-    min_y, max_y = get_min_max_year()
+def render(name: str, context: dict):
+    """TemplateResponse с замером времени рендеринга шаблона."""
+    with observe_template(name):
+        return templates.TemplateResponse(name, context)
 
-    return templates.TemplateResponse(
-        "index.html",
-        {"request": request, "genres": genres, "min_y": min_y, "max_y": max_y},
+
+def build_next_url(path: str, params: dict, kind: str, rows: list[dict], page: int) -> str:
+    """
+    Ссылка на следующую страницу.
+    В режиме keyset добавляем курсор последней строки текущей страницы;
+    page передаётся всегда (по нему работает OFFSET-режим и логирование page == 1).
+    """
+    query = {k: v for k, v in params.items() if v is not None}
+    query["page"] = page + 1
+    if PAGINATION_MODE == "keyset" and rows:
+        query["cursor"] = encode_cursor(kind, rows[-1])
+    return f"{path}?{urlencode(query)}"
+
+
+def error_page(request: Request, title: str, error: str):
+    """Страница результатов с сообщением об ошибке ввода."""
+    return render(
+        "results.html",
+        {
+            "request": request,
+            "title": title,
+            "rows": [],
+            "page": 1,
+            "has_more": False,
+            "next_url": "",
+            "back_url": "/",
+            "error": error,
+        },
     )
 
 
-@app.get("/search/keyword", response_class=HTMLResponse)
-def search_keyword(request: Request, keyword: str = "", page: int = 1):
+def check_genre_years(
+        genre: str,
+        year_from: int,
+        year_to: int,
+        valid_genres: frozenset[str],
+        min_y: int,
+        max_y: int,
+) -> tuple[int, int, str | None]:
     """
-    Поиск по ключевому слову (title).
+    Серверная валидация поиска по жанру и годам (защита от подмены URL).
+    Возвращает годы в правильном порядке и текст ошибки (None - всё в порядке).
+    """
+    # Жанр должен существовать (или All)
+    if genre and genre != "All" and genre not in valid_genres:
+        return year_from, year_to, "Неверный жанр. Выберите жанр из списка."
+
+    # Оба года должны реально прийти (если год не пришёл - будет 0)
+    if genre and (year_from <= 0 or year_to <= 0):
+        return year_from, year_to, "Укажите оба года: year_from и year_to."
+
+    # Если пользователь ввёл наоборот - исправляем порядок
+    if year_from and year_to and year_from > year_to:
+        year_from, year_to = year_to, year_from
+
+    # Годы должны быть в диапазоне базы
+    if year_from and year_to and (year_from < min_y or year_to > max_y):
+        return year_from, year_to, f"Неверный диапазон лет. Допустимо: {min_y}–{max_y}."
+
+    return year_from, year_to, None
+
+
+def count_pages(total: int | None) -> int:
+    """Количество страниц по общему числу результатов (0 - если total неизвестен)."""
+    if not total:
+        return 0
+    return (total + PAGE_SIZE - 1) // PAGE_SIZE
+
+
+# -------------------------
+# Поиск (общая часть HTML- и JSON-роутов)
+# -------------------------
+
+class SearchError(ValueError):
+    """Ошибка пользовательского ввода (текст показывается пользователю)."""
+
+
+class SearchOutcome(NamedTuple):
+    """
+    Результат одной страницы поиска.
+    params - параметры поиска для ссылки на следующую страницу (вместе с total),
+    kind - вид курсора keyset-пагинации (см. pagination.KEY_COLUMNS).
+    """
+    rows: list[dict]
+    page: int
+    total: int | None
+    has_more: bool
+    params: dict
+    kind: str
+
+
+async def run_keyword_search(keyword: str, page: int, cursor: str, total: int | None) -> SearchOutcome:
+    """
+    Поиск по ключевому слову (title): проверки, страница, total и лог.
     Защита: keyword должен содержать хотя бы одну латинскую букву.
+    Бросает SearchError при неверном вводе.
     """
     keyword = keyword.strip()
 
-    # Анти-мусор: запрещаем цифры/кириллицу/пустое, чтобы не засорять статистику
-    if keyword and not re.search(r"[a-zA-Z]", keyword):
-        return templates.TemplateResponse(
-            "results.html",
-            {
-                "request": request,
-                "title": "Search by keyword",
-                "rows": [],
-                "page": 1,
-                "has_more": False,
-                "next_url": "",
-                "back_url": "/",
-                "error": "Введите ключевое слово латиницей (a-z).",
-            },
-        )
+    # Анти-мусор: запрещаем цифры/кириллицу, чтобы не засорять статистику
+    error = keyword_error(keyword)
+    if error:
+        raise SearchError(error)
+
+    after = None
+    if cursor:
+        try:
+            after = decode_cursor("keyword", cursor)
+        except ValueError:
+            raise SearchError("Неверная ссылка на страницу результатов.") from None
 
     offset = (page - 1) * PAGE_SIZE
     rows: list[dict] = []
     has_more = False
 
+    # На первой странице total всегда считаем сами (он идёт в статистику)
+    if page == 1:
+        total = None
+
     if keyword:
-        like_value = f"%{keyword.lower()}%"
-
-        with get_mysql_connection() as conn:
-            with conn.cursor() as cursor:
-                # 1) Текущая страница
-                cursor.execute(
-                    queries.SEARCH_BY_KEYWORD,
-                    (like_value, PAGE_SIZE, offset)
+        # 1) Текущая страница (keyset по курсору или OFFSET) через backend поиска
+        if total is not None:
+            rows = await data_access.search_titles(keyword, PAGE_SIZE, offset=offset, after=after)
+        elif after is None:
+            # Страница и total одним запросом
+            result = await data_access.search_titles_with_total(keyword, PAGE_SIZE, offset=offset)
+            rows, total = result.rows, result.total
+        else:
+            # Ссылка с курсором, но без total (например, старая) - считаем отдельно
+            rows = await data_access.search_titles(keyword, PAGE_SIZE, offset=offset, after=after)
+            total = await data_access.count_titles(keyword)
+
+        # 2) Логируем 1 раз на поиск: только page == 1, results_count = total_count
+        if page == 1:
+            await data_access.log_query("keyword", {"keyword": keyword}, total)
+
+        has_more = len(rows) == PAGE_SIZE and page * PAGE_SIZE < total
+
+    return SearchOutcome(rows, page, total, has_more, {"keyword": keyword, "total": total}, "keyword")
+
+
+async def run_genre_search(
+        genre: str,
+        year_from: int,
+        year_to: int,
+        page: int,
+        cursor: str,
+        total: int | None,
+) -> SearchOutcome:
+    """
+    Поиск по жанру и диапазону лет: проверки, страница, total и лог.
+    Защита: жанр должен существовать (или All), годы должны быть в диапазоне базы.
+    Бросает SearchError при неверном вводе.
+    """
+    genre = genre.strip()
+    offset = (page - 1) * PAGE_SIZE
+    cursor_kind = "years_all_genres" if genre == "All" else "genre_years"
+
+    rows: list[dict] = []
+    has_more = False
+
+    # Серверная валидация (защита от подмены URL)
+    # Жанры и границы лет берутся из кэша справочников - без запросов к БД
+    ref = await data_access.reference_data()
+
+    # 1) Жанр, оба года, порядок и диапазон лет
+    year_from, year_to, error = check_genre_years(
+        genre, year_from, year_to, ref.genre_set, ref.min_year, ref.max_year
+    )
+    if error:
+        raise SearchError(error)
+
+    # 2) Проверка курсора страницы
+    after = None
+    if cursor:
+        try:
+            after = decode_cursor(cursor_kind, cursor)
+        except ValueError:
+            raise SearchError("Неверная ссылка на страницу результатов.") from None
+
+    # На первой странице total всегда считаем сами (он идёт в статистику)
+    if page == 1:
+        total = None
+
+    # 3) Основной поиск (через mysql_repo - с кэшем результатов)
+    if genre and year_from and year_to:
+        if genre == "All":
+            # 1) Страница результатов (keyset по курсору или OFFSET) + total
+            if total is not None or after is not None:
+                rows = await data_access.search_by_years_all_genres(
+                    year_from, year_to, PAGE_SIZE, offset=offset, after=after
                 )
-                rows = fetch_all(cursor)
+                if total is None:
+                    # Страницы считаются по строкам (фильм с двумя жанрами - две строки)
+                    total = await data_access.count_rows_by_years_all_genres(year_from, year_to)
+                # Число фильмов нужно только для лога (page == 1)
+                total_films = (
+                    await data_access.count_by_years_all_genres(year_from, year_to) if page == 1 else total
+                )
+            else:
+                # Страница и total одним запросом
+                rows, total, total_films = await data_access.search_by_years_all_genres_with_total(
+                    year_from, year_to, PAGE_SIZE, offset=offset
+                )
+        else:
+            if total is not None or after is not None:
+                rows = await data_access.search_by_genre_years(
+                    genre, year_from, year_to, PAGE_SIZE, offset=offset, after=after
+                )
+                if total is None:
+                    total = await data_access.count_by_genre_years(genre, year_from, year_to)
+                total_films = total
+            else:
+                rows, total, total_films = await data_access.search_by_genre_years_with_total(
+                    genre, year_from, year_to, PAGE_SIZE, offset=offset
+                )
+
+        # 2) Логируем 1 раз на поиск (page == 1) + количество найденных фильмов
+        if page == 1:
+            await data_access.log_query(
+                "genre__years_range",
+                {"genre": genre, "years_range": f"{year_from}-{year_to}"},
+                total_films,
+            )
 
-                # 2) Логируем 1 раз на поиск: только page == 1, results_count = total_count
-                if page == 1:
-                    cursor.execute(queries.COUNT_BY_KEYWORD, (like_value,))
-                    total_count = int(cursor.fetchone()[0])
-                    log_query("keyword", {"keyword": keyword}, total_count)
+        has_more = len(rows) == PAGE_SIZE and page * PAGE_SIZE < total
 
-        has_more = len(rows) == PAGE_SIZE
+    params = {"genre": genre, "year_from": year_from, "year_to": year_to, "total": total}
+    return SearchOutcome(rows, page, total, has_more, params, cursor_kind)
 
-    return templates.TemplateResponse(
+
+def results_page(request: Request, title: str, path: str, outcome: SearchOutcome):
+    """HTML-страница результатов поиска."""
+    export_params = {k: v for k, v in outcome.params.items() if k != "total"}
+    return render(
         "results.html",
         {
             "request": request,
-            "title": "Search by keyword",
-            "rows": rows,
-            "page": page,
-            "has_more": has_more,
-            "next_url": f"/search/keyword?keyword={keyword}&page={page + 1}",
+            "title": title,
+            "rows": outcome.rows,
+            "page": outcome.page,
+            "total": outcome.total,
+            "pages": count_pages(outcome.total),
+            "has_more": outcome.has_more,
+            "next_url": build_next_url(path, outcome.params, outcome.kind, outcome.rows, outcome.page),
+            "export_url": f"/export?{urlencode(export_params)}" if outcome.rows else "",
             "back_url": "/",
         },
     )
 
 
+def api_results(path: str, outcome: SearchOutcome):
+    """
+    Компактный JSON результата поиска:
+    rows, total, page и токен продолжения (курсор keyset) со ссылкой на следующую страницу.
+    """
+    next_cursor = None
+    next_url = None
+    if outcome.has_more:
+        next_cursor = encode_cursor(outcome.kind, outcome.rows[-1])
+        next_url = build_next_url(path, outcome.params, outcome.kind, outcome.rows, outcome.page)
+    return APIResponse({
+        "rows": outcome.rows,
+        "total": outcome.total,
+        "page": outcome.page,
+        "next_cursor": next_cursor,
+        "next_url": next_url,
+    })
+
+
+def api_error(error: str):
+    return APIResponse({"error": error}, status_code=400)
+
+
+# -------------------------
+# Routes (страницы)
+# -------------------------
+
+@app.get("/", response_class=HTMLResponse)
+async def index(request: Request):
+    """Главная страница с формой поиска"""
+    # Жанры и границы лет - одним чтением справочников
+    ref = await data_access.reference_data()
+    genres = ["All"] + list(ref.genres)
+
+    return render(
+        "index.html",
+        {"request": request, "genres": genres, "min_y": ref.min_year, "max_y": ref.max_year},
+    )
+
+
+@app.get("/search/keyword", response_class=HTMLResponse)
+async def search_keyword(
+        request: Request,
+        keyword: str = "",
+        page: int = 1,
+        cursor: str = "",
+        total: int | None = None,
+):
+    """
+    Поиск по ключевому слову (title).
+    cursor - курсор keyset-пагинации (если нет - используется OFFSET по page).
+    total - общее количество результатов, посчитанное на первой странице
+    (передаётся в next_url, чтобы не считать его заново на каждой странице).
+    """
+    try:
+        outcome = await run_keyword_search(keyword, page, cursor, total)
+    except SearchError as exc:
+        return error_page(request, "Search by keyword", str(exc))
+    return results_page(request, "Search by keyword", "/search/keyword", outcome)
+
+
 @app.get("/search/genre", response_class=HTMLResponse)
-def search_genre(
+async def search_genre(
         request: Request,
         genre: str = "",
         year_from: int = 0,
         year_to: int = 0,
         page: int = 1,
+        cursor: str = "",
+        total: int | None = None,
 ):
     """
     Поиск по жанру и диапазону лет.
-    Защита: жанр должен существовать (или All), годы должны быть в диапазоне базы.
+    cursor - курсор keyset-пагинации (если нет - используется OFFSET по page).
+    total - общее количество строк результата с первой страницы (из next_url).
     """
-    genre = genre.strip()
-    offset = (page - 1) * PAGE_SIZE
+    try:
+        outcome = await run_genre_search(genre, year_from, year_to, page, cursor, total)
+    except SearchError as exc:
+        return error_page(request, "Search by genre & years", str(exc))
+    return results_page(request, "Search by genre & years", "/search/genre", outcome)
 
-    rows: list[dict] = []
-    has_more = False
 
-    # Серверная валидация (защита от подмены URL)
-    valid_genres = ["All"] + get_genres()
-    min_y, max_y = get_min_max_year()
-
-    # 1) Проверка жанра
-    if genre and genre not in valid_genres:
-        return templates.TemplateResponse(
-            "results.html",
-            {
-                "request": request,
-                "title": "Search by genre & years",
-                "rows": [],
-                "page": 1,
-                "has_more": False,
-                "next_url": "",
-                "back_url": "/",
-                "error": "Неверный жанр. Выберите жанр из списка.",
-            },
-        )
+# -------------------------
+# JSON API
+# -------------------------
 
-    # 2) Проверка, что оба года реально пришли (если год не пришёл — будет 0)
-    if genre and (year_from <= 0 or year_to <= 0):
-        return templates.TemplateResponse(
-            "results.html",
-            {
-                "request": request,
-                "title": "Search by genre & years",
-                "rows": [],
-                "page": 1,
-                "has_more": False,
-                "next_url": "",
-                "back_url": "/",
-                "error": "Укажите оба года: year_from и year_to.",
-            },
-        )
+@app.get("/api/search/keyword")
+async def api_search_keyword(keyword: str = "", page: int = 1, cursor: str = "", total: int | None = None):
+    """Поиск по ключевому слову в JSON (параметры - как у /search/keyword)."""
+    try:
+        outcome = await run_keyword_search(keyword, page, cursor, total)
+    except SearchError as exc:
+        return api_error(str(exc))
+    return api_results("/api/search/keyword", outcome)
 
-    # 3) Если пользователь ввёл наоборот — исправляем порядок
-    if year_from and year_to and year_from > year_to:
-        year_from, year_to = year_to, year_from
 
-    # 4) Проверка диапазона лет
-    if year_from and year_to:
-        if year_from < min_y or year_to > max_y:
-            return templates.TemplateResponse(
-                "results.html",
-                {
-                    "request": request,
-                    "title": "Search by genre & years",
-                    "rows": [],
-                    "page": 1,
-                    "has_more": False,
-                    "next_url": "",
-                    "back_url": "/",
-                    "error": f"Неверный диапазон лет. Допустимо: {min_y}–{max_y}.",
-                },
-            )
+@app.get("/api/search/genre")
+async def api_search_genre(
+        genre: str = "",
+        year_from: int = 0,
+        year_to: int = 0,
+        page: int = 1,
+        cursor: str = "",
+        total: int | None = None,
+):
+    """Поиск по жанру и годам в JSON (параметры - как у /search/genre)."""
+    try:
+        outcome = await run_genre_search(genre, year_from, year_to, page, cursor, total)
+    except SearchError as exc:
+        return api_error(str(exc))
+    return api_results("/api/search/genre", outcome)
+
+
+@app.get("/api/suggest")
+async def api_suggest(prefix: str = "", limit: int = Query(SUGGEST_LIMIT, ge=1, le=SUGGEST_MAX_LIMIT)):
+    """Подсказки при вводе: жанры и названия фильмов, начинающиеся с prefix (из памяти)."""
+    if suggest_index.fresh:
+        suggestions = suggest_index.suggest(prefix, limit)
+    else:
+        # Первое обращение и устаревший индекс загружают данные из MySQL - не в event loop
+        suggestions = await run_in_threadpool(suggest_index.suggest, prefix, limit)
+    return APIResponse({"prefix": prefix, "suggestions": suggestions})
+
+
+@app.get("/api/stats")
+async def api_stats():
+    """Top 5 по частоте и Last 5 unique в JSON."""
+    data_access.request_log_flush()
+    top5, last5 = await data_access.stats_top_and_last()
+
+    # _id - служебный ключ группировки/счётчика, в API не нужен;
+    # timestamp (datetime) - в строку ISO: JSONResponse сам datetime не сериализует
+    return APIResponse(jsonable_encoder({
+        "top5": [{k: v for k, v in r.items() if k != "_id"} for r in top5],
+        "last5": [{k: v for k, v in r.items() if k != "_id"} for r in last5],
+    }))
+
+
+@app.get("/export")
+async def export(
+        keyword: str = "",
+        genre: str = "",
+        year_from: int = 0,
+        year_to: int = 0,
+        fmt: str = Query("csv", alias="format"),
+):
+    """
+    Полный результат поиска (по keyword или по genre + годам) в CSV / NDJSON.
+    Строки идут из MySQL потоком и отдаются кусками (StreamingResponse),
+    в лог пишется одна запись на весь экспорт.
+    """
+    if fmt not in EXPORT_FORMATS:
+        return PlainTextResponse(f"Unknown format. Allowed: {', '.join(EXPORT_FORMATS)}.", status_code=400)
 
-    # 5) Основной поиск
-    if genre and year_from and year_to:
-        with get_mysql_connection() as conn:
-            with conn.cursor() as cursor:
-                if genre == "All":
-                    # 1) Страница результатов
-                    cursor.execute(
-                        queries.SEARCH_BY_YEARS_ALL_GENRES,
-                        (year_from, year_to, PAGE_SIZE, offset),
-                    )
-                    rows = fetch_all(cursor)
-
-                    # 2) Логируем 1 раз на поиск (page == 1) + total_count
-                    if page == 1:
-                        cursor.execute(
-                            queries.COUNT_BY_YEARS_ALL_GENRES,
-                            (year_from, year_to)
-                        )
-                        total_count = int(cursor.fetchone()[0])
-                        log_query(
-                            "genre__years_range",
-                            {"genre": genre, "years_range": f"{year_from}-{year_to}"},
-                            total_count,
-                        )
-                else:
-                    # 1) Страница результатов
-                    cursor.execute(
-                        queries.SEARCH_BY_GENRE_YEARS,
-                        (genre, year_from, year_to, PAGE_SIZE, offset),
-                    )
-                    rows = fetch_all(cursor)
-
-                    # 2) Логируем 1 раз на поиск (page == 1) + total_count
-                    if page == 1:
-                        cursor.execute(queries.COUNT_BY_GENRE_YEARS, (
-                            genre, year_from, year_to)
-                                       )
-                        total_count = int(cursor.fetchone()[0])
-                        log_query(
-                            "genre__years_range",
-                            {"genre": genre, "years_range": f"{year_from}-{year_to}"},
-                            total_count,
-                        )
-
-        has_more = len(rows) == PAGE_SIZE
-
-    next_url = (
-        f"/search/genre?genre={genre}&year_from={year_from}"
-        f"&year_to={year_to}&page={page + 1}"
-    )
+    keyword = keyword.strip()
+    genre = genre.strip()
 
-    return templates.TemplateResponse(
-        "results.html",
-        {
-            "request": request,
-            "title": "Search by genre & years",
-            "rows": rows,
-            "page": page,
-            "has_more": has_more,
-            "next_url": next_url,
-            "back_url": "/",
-        },
+    if keyword:
+        error = keyword_error(keyword)
+        if error:
+            return PlainTextResponse(error, status_code=400)
+        chunks = export_keyword(keyword, fmt, log=log_export)
+        filename = f"films_keyword.{fmt}"
+    elif genre:
+        # Та же валидация, что и у /search/genre
+        ref = await data_access.reference_data()
+        year_from, year_to, error = check_genre_years(
+            genre, year_from, year_to, ref.genre_set, ref.min_year, ref.max_year
+        )
+        if error:
+            return PlainTextResponse(error, status_code=400)
+        chunks = export_genre_years(genre, year_from, year_to, fmt, log=log_export)
+        filename = f"films_genre_{year_from}-{year_to}.{fmt}"
+    else:
+        return PlainTextResponse("Укажите keyword или genre, year_from и year_to.", status_code=400)
+
+    # Sync-генератор: Starlette читает его в пуле потоков, не блокируя event loop
+    return StreamingResponse(
+        chunks,
+        media_type=EXPORT_FORMATS[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
     )
 
 
 @app.get("/stats", response_class=HTMLResponse)
-def stats(request: Request):
+async def stats(request: Request):
     """
     Страница статистики:
     - Top 5 по частоте (часто повторяющиеся запросы)
     - Last 5 unique (последние уникальные запросы)
     """
-    top5 = stats_top5_frequency()
-    last5 = stats_last5_unique()
+    # Логи из фоновой очереди дописываются без ожидания: запрос статистики
+    # не ждёт MongoDB, последние поиски появятся не позже QUERY_LOG_FLUSH_INTERVAL
+    data_access.request_log_flush()
+
+    top5, last5 = await data_access.stats_top_and_last()
 
-    return templates.TemplateResponse(
+    return render(
         "stats.html",
         {"request": request, "top5": top5, "last5": last5},
     )
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    """Метрики задержек и ошибок в текстовом формате Prometheus."""
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+
+@app.get("/stats/pool")
+def pool_stats():
+    """Состояние пула MySQL-соединений (JSON) - для подбора размера пула."""
+    return get_pool_stats()
+
+
+@app.get("/stats/slow-queries")
+def slow_queries():
+    """Последние медленные SQL-запросы с параметрами и планом EXPLAIN (JSON)."""
+    return slow_query_log.entries()
+
+
+@app.get("/stats/cache")
+def cache_stats():
+    """Попадания / промахи / размер кэша результатов поиска (JSON)."""
+    return get_result_cache_stats()
+
+
+@app.get("/stats/catalog")
+def catalog_stats():
+    """Размер каталога жанров/лет в памяти (JSON)."""
+    return get_genre_catalog_stats()
+
+
+@app.get("/stats/refresh")
+def refresh_stats():
+    """Фоновое обновление каталога: отметка last_update, размер дельты, отставание (JSON)."""
+    return get_refresh_stats()